@@ -4,13 +4,14 @@ import datetime
 from PIL import Image
 import plotly.express as px
 import plotly.graph_objects as go
+from cvd.excel import read_excel
 #pip freeze > requirements.txt
 # cd "D:\curso\streamlit\09_app_multipage"
 # streamlit run 01_🎈_main_app.py   
 
 print("Hello Learners")
 # reading the data from excel file
-df = pd.read_excel(r"D:\curso\streamlit\09_app_multipage\data\Adidas.xlsx")
+df = read_excel(r"D:\curso\streamlit\09_app_multipage\data\Adidas.xlsx")
 st.set_page_config(layout="wide")
 st.markdown('<style>div.block-container{padding-top:1rem;}</style>', unsafe_allow_html=True)
 image = Image.open(r"D:\curso\streamlit\09_app_multipage\data\NF3.jpg")
@@ -0,0 +1,83 @@
+"""比較各 Excel 引擎讀取多工作表 CVD 工作簿的時間。
+
+產生一份與實際工作簿規模相近的多工作表檔案（AKT / Jusung 欄位），
+再以每個已安裝的引擎開啟並解析全部工作表。
+
+用法::
+
+    python benchmarks/excel_engines.py --sheets 40 --rows 5000
+    python benchmarks/excel_engines.py --workbook data/CVD_20250104.xlsx
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from cvd.excel import available_engines, open_workbook  # noqa: E402
+from cvd.vendors import AKT_COLUMNS, JUSUNG_COLUMNS, JUSUNG_SHEET_MARKER  # noqa: E402
+
+TEXT_COLUMNS = {"CHAMBERID", "GLASSID", "TOOLID", "RECIPEID", "OPERATION", "PRODUCT", "step_name", "CHAMBER_CODE", "SIN"}
+
+
+def make_sheet(columns, rows, rng):
+    data = {}
+    for col in columns:
+        if col == "TSTAMP":
+            data[col] = 2025010100 + rng.integers(0, 24, rows)
+        elif col in TEXT_COLUMNS:
+            data[col] = rng.choice([f"{col[:3]}{i:03d}" for i in range(20)], rows)
+        else:
+            data[col] = rng.random(rows) * 100
+    return pd.DataFrame(data)
+
+
+def generate_workbook(path, sheets, rows, seed=0):
+    """產生 AKT 與 Jusung 工作表各半的測試工作簿。"""
+    rng = np.random.default_rng(seed)
+    with pd.ExcelWriter(path) as writer:
+        for i in range(sheets):
+            if i % 2:
+                make_sheet(JUSUNG_COLUMNS, rows, rng).to_excel(writer, sheet_name=f"{JUSUNG_SHEET_MARKER}_{i:02d}", index=False)
+            else:
+                make_sheet(AKT_COLUMNS, rows, rng).to_excel(writer, sheet_name=f"2ACV{i:02d}00", index=False)
+
+
+def time_engine(path, engine):
+    start = time.perf_counter()
+    with open_workbook(path, engine) as workbook:
+        opened = time.perf_counter()
+        rows = sum(len(workbook.parse(sheet)) for sheet in workbook.sheet_names)
+    end = time.perf_counter()
+    return opened - start, end - start, rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workbook", help="使用既有工作簿（不指定則產生測試工作簿）")
+    parser.add_argument("--sheets", type=int, default=40)
+    parser.add_argument("--rows", type=int, default=5000)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.workbook
+        if path is None:
+            path = Path(tmp) / "CVD_benchmark.xlsx"
+            print(f"產生測試工作簿：{args.sheets} 個工作表 × {args.rows} 列 ...")
+            generate_workbook(path, args.sheets, args.rows)
+
+        print(f"{'engine':<10} {'open (s)':>10} {'total (s)':>10} {'rows':>10}")
+        for engine in available_engines():
+            if engine == "pyxlsb" and Path(path).suffix.lower() != ".xlsb":
+                continue
+            opened, total, rows = time_engine(path, engine)
+            print(f"{engine:<10} {opened:>10.2f} {total:>10.2f} {rows:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""比較 YYYYMMDDHH 格式 TSTAMP 的解析方式。
+
+- ``apply``：各頁面原本的 ``convert_timestamp``（逐列組字串）再以 ``pd.to_datetime`` 解析
+- ``strptime``：轉為字串後以固定格式 ``%Y%m%d%H`` 解析（先前 ``parse_tstamp`` 的做法）
+- ``parse_tstamp``：``cvd.schema.parse_tstamp`` 的整數運算版本
+
+用法::
+
+    python benchmarks/tstamp_parse.py --rows 2000000
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from cvd.schema import parse_tstamp  # noqa: E402
+
+
+def convert_timestamp(ts):
+    try:
+        ts = str(ts)
+        if len(ts) >= 10:
+            return f"{ts[:4]}/{ts[4:6]}/{ts[6:8]} {ts[8:10]}:00"
+        return None
+    except Exception:
+        return None
+
+
+def parse_apply(values):
+    return pd.to_datetime(values.apply(convert_timestamp), format="%Y/%m/%d %H:%M", errors="coerce")
+
+
+def parse_strptime(values):
+    return pd.to_datetime(values.astype("Int64").astype(str), format="%Y%m%d%H", errors="coerce")
+
+
+METHODS = {"apply": parse_apply, "strptime": parse_strptime, "parse_tstamp": parse_tstamp}
+
+
+def make_tstamps(rows, bad_ratio=0.01, seed=0):
+    """產生一年內的逐時 TSTAMP，並混入少量不合法的值（如 24 時、NaN）。"""
+    rng = np.random.default_rng(seed)
+    hours = pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 366 * 24, rows), unit="h")
+    values = pd.Series(hours.strftime("%Y%m%d%H").astype(np.int64), dtype=np.float64)
+    bad = rng.random(rows) < bad_ratio
+    values[bad] = rng.choice([2024013124.0, 2024022930.0, np.nan], bad.sum())
+    return values
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--skip-apply", action="store_true", help="略過最慢的逐列版本")
+    args = parser.parse_args(argv)
+
+    values = make_tstamps(args.rows)
+    expected = baseline = None
+    print(f"{'method':<14} {'seconds':>10} {'NaT':>10}")
+    for name, method in METHODS.items():
+        if name == "apply" and args.skip_apply:
+            continue
+        start = time.perf_counter()
+        result = method(values)
+        elapsed = time.perf_counter() - start
+        if expected is None:
+            expected, baseline = result, name
+        elif not result.equals(expected):
+            print(f"{name}: 結果與 {baseline} 不一致")
+        print(f"{name:<14} {elapsed:>10.3f} {result.isna().sum():>10}")
+
+
+if __name__ == "__main__":
+    main()
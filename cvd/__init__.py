@@ -0,0 +1,99 @@
+"""CVD NF3 儀表板共用的資料存取模組。"""
+
+from cvd.corrstats import CorrStats, build_corr_stats, corr_stats_for, load_corr_stats
+from cvd.cube import NF3Cube, build_cube, cube_for, load_cube
+from cvd.dates import DateIndex, daily_kpis, date_index
+from cvd.enrich import DERIVED_COLUMNS, enrich
+from cvd.filters import FilterIndex, filter_index
+from cvd.hierarchy import HierarchyIndex, hierarchy_index
+from cvd.hll import GlassSketches, build_glass_sketches, count_glasses, glass_sketches_for, load_glass_sketches
+from cvd.loader import (
+    DATA_DIR,
+    MERGED_CSV,
+    MERGED_DATASET,
+    MERGED_PARQUET,
+    load_csv_data,
+    load_merged_data,
+    load_merged_window,
+    load_recent_data,
+    recent_window,
+)
+from cvd.metrics import Metric, aggregate, distinct, in_units, ratio, total
+from cvd.outliers import fleet_outliers, outlier_bounds, outlier_mask
+from cvd.rolling import RollingState, rolling_state
+from cvd.rollup import daily_ratios, grouping_sets
+from cvd.schema import CANONICAL_COLUMNS, apply_schema, parse_tstamp
+from cvd.sketch import build_sketches, merge_sketches, sketch_bounds, sketch_quantiles, sketches_for
+from cvd.store import append_cube, write_merged_parquet, write_merged_partitions
+from cvd.timeindex import sort_by_time, time_slice
+from cvd.units import convert_flow, convert_flows, flow_factor
+from cvd.uploads import load_uploaded_data
+from cvd.vendors import concat_canonical, to_canonical
+from cvd.xcorr import lagged_xcorr
+
+__all__ = [
+    "CorrStats",
+    "build_corr_stats",
+    "corr_stats_for",
+    "load_corr_stats",
+    "NF3Cube",
+    "build_cube",
+    "cube_for",
+    "load_cube",
+    "DateIndex",
+    "daily_kpis",
+    "date_index",
+    "DERIVED_COLUMNS",
+    "enrich",
+    "FilterIndex",
+    "filter_index",
+    "HierarchyIndex",
+    "hierarchy_index",
+    "GlassSketches",
+    "build_glass_sketches",
+    "count_glasses",
+    "glass_sketches_for",
+    "load_glass_sketches",
+    "DATA_DIR",
+    "MERGED_CSV",
+    "MERGED_DATASET",
+    "MERGED_PARQUET",
+    "load_csv_data",
+    "load_merged_data",
+    "load_merged_window",
+    "load_recent_data",
+    "recent_window",
+    "Metric",
+    "aggregate",
+    "distinct",
+    "in_units",
+    "ratio",
+    "total",
+    "fleet_outliers",
+    "outlier_bounds",
+    "outlier_mask",
+    "RollingState",
+    "rolling_state",
+    "daily_ratios",
+    "grouping_sets",
+    "CANONICAL_COLUMNS",
+    "apply_schema",
+    "parse_tstamp",
+    "build_sketches",
+    "merge_sketches",
+    "sketch_bounds",
+    "sketch_quantiles",
+    "sketches_for",
+    "append_cube",
+    "write_merged_parquet",
+    "write_merged_partitions",
+    "sort_by_time",
+    "time_slice",
+    "convert_flow",
+    "convert_flows",
+    "flow_factor",
+    "load_uploaded_data",
+    "concat_canonical",
+    "to_canonical",
+    "lagged_xcorr",
+]
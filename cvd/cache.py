@@ -0,0 +1,71 @@
+"""以資料框底層陣列識別的快取。
+
+頁面每次 rerun 拿到的是快取資料框的淺複製，欄位的底層陣列仍是同一個物件。
+篩選索引、日期查詢表等由欄位內容推導的結構，以這些陣列的識別作為快取鍵，
+並以 weakref 確認陣列仍是同一個物件（避免 id 被回收後重複使用）。
+"""
+import threading
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+
+
+def _backing_array(values):
+    """擴充陣列（datetime、categorical 等）底層的 numpy 陣列；無法取得時回傳原物件。"""
+    backing = getattr(values, "_ndarray", None)
+    return backing if isinstance(backing, np.ndarray) else values
+
+
+def array_owner(values):
+    """欄位底層陣列的擁有者。
+
+    numpy 欄位由二維區塊切出，每次取出都是新的 view，以其 ``base`` 作為識別；
+    datetime、categorical 等擴充陣列的包裝物件在每次淺複製時都會重建，改以其底層 numpy 陣列識別。
+    """
+    values = _backing_array(values)
+    base = getattr(values, "base", None)
+    return base if isinstance(base, np.ndarray) else values
+
+
+def array_identity(values):
+    """回傳 ``(擁有者, 識別鍵)``：擁有者的 id 加上 view 的起始位址、長度與步長（同一陣列的不同切片不會相同）。"""
+    owner = array_owner(values)
+    backing = _backing_array(values)
+    if isinstance(backing, np.ndarray):
+        view = (backing.__array_interface__["data"][0], len(backing), backing.strides)
+    else:
+        view = (len(values),)
+    # categorical 的 codes 可能與重新命名類別後的陣列共用，類別一併作為識別
+    categories = getattr(values, "categories", None)
+    return owner, (id(owner), *view, id(categories) if categories is not None else None)
+
+
+class ArrayCache:
+    """LRU 快取；項目以 ``(key, 欄位陣列)`` 識別，陣列被回收或替換後自動失效。"""
+
+    def __init__(self, size):
+        self.size = size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, frame, columns, key, build):
+        """回傳 ``frame`` 在 ``columns`` 上、參數為 ``key`` 的快取結果；沒有時呼叫 ``build()`` 建立。"""
+        identities = [array_identity(frame[col]._values) for col in columns]
+        arrays = [owner for owner, _ in identities]
+        full_key = (key, tuple(columns), len(frame), tuple(ident for _, ident in identities))
+        with self._lock:
+            entry = self._entries.get(full_key)
+            if entry is not None and all(ref() is a for ref, a in zip(entry[0], arrays)):
+                self._entries.move_to_end(full_key)
+                return entry[1]
+        value = build()
+        with self._lock:
+            self._entries[full_key] = ([weakref.ref(a) for a in arrays], value)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
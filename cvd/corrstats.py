@@ -0,0 +1,200 @@
+"""相關係數的充分統計量，依日期 × 步驟 × CHAMBERID 存放於彙總資料。
+
+相關性頁面原本對選取日期的原始資料列執行 ``data[parameters].corr()``。
+Pearson 相關係數只需要各參數兩兩的筆數、和、平方和與交叉乘積，這些量可以相加：
+匯入時對每個分組計算四個 p×p 矩陣（與 NF3 cube 一起寫出，見 ``cvd.store``），
+任意日期範圍、機台或步驟的相關係數只需加總範圍內的小矩陣，不受範圍長短影響。
+
+缺值與 ``DataFrame.corr`` 相同採成對刪除：矩陣 (i, j) 只累計 i、j 兩個參數都有值的列。
+以 float64 累計原始值的和，平均值遠大於標準差（> 1e4 倍）的參數會有數值誤差。
+"""
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from cvd.cache import ArrayCache
+from cvd.cube import _concat, covers_partitions, list_cube_files
+from cvd.loader import _file_key, _prune_partitions, load_merged_data
+from cvd.outliers import _group_codes, _group_labels
+from cvd.timeindex import time_bounds
+
+STATS_PREFIX = "corr"
+# 相關性分析頁面的參數
+CORR_PARAMETERS = [
+    "ΔTime", "pressure", "load_pwr", "rfl_pwr", "mon_vpp", "vdc",
+    "N2_Flow", "NH3_Flow", "SiH4_Flow", "H2_Flow", "PH3_Flow",
+    "Ar_Flow", "NF3_Flow", "N2O_Flow",
+]
+# 統計量的分組（另加 TSTAMP 的日期）與只保留的步驟
+CORR_GROUPS = ["step_name", "CHAMBERID"]
+CORR_STEPS = ["CLN1", "CLN2", "CLN3"]
+# 各分組的四個矩陣：(i, j) 皆有值的筆數、i 的和、i 的平方和、i·j 的和
+STATS = ("N", "Sx", "Sxx", "Sxy")
+# 由原始資料建立的統計量最多保留數（每份資料一個）
+CORR_CACHE_SIZE = 2
+
+_cache = ArrayCache(CORR_CACHE_SIZE)
+
+
+def _group_stats(values, groups, size):
+    """各分組的 ``(N, Sx, Sxx, Sxy)``，回傳形狀為 (size, 4, p, p) 的陣列。"""
+    order = np.argsort(groups, kind="stable")
+    values = values[order]
+    bounds = np.searchsorted(groups[order], np.arange(size + 1))
+    valid = ~np.isnan(values)
+    present = valid.astype(np.float64)
+    filled = np.where(valid, values, 0.0)
+    stats = np.zeros((size, len(STATS), values.shape[1], values.shape[1]))
+    for group, (start, stop) in enumerate(zip(bounds[:-1], bounds[1:])):
+        x, m = filled[start:stop], present[start:stop]
+        stats[group, 0] = m.T @ m
+        stats[group, 1] = x.T @ m
+        stats[group, 2] = (x * x).T @ m
+        stats[group, 3] = x.T @ x
+    return stats
+
+
+def _pearson(totals):
+    """由加總後的 ``(..., 4, p, p)`` 統計量計算相關係數矩陣 ``(..., p, p)``；筆數不足或變異為 0 時為 NaN。"""
+    count, sums, squares, products = (totals[..., i, :, :] for i in range(len(STATS)))
+    transpose = lambda matrix: np.swapaxes(matrix, -1, -2)
+    covariance = count * products - sums * transpose(sums)
+    variance = count * squares - sums * sums
+    with np.errstate(invalid="ignore", divide="ignore"):
+        corr = covariance / np.sqrt(variance * transpose(variance))
+    corr[(count < 1) | (variance <= 0) | (transpose(variance) <= 0)] = np.nan
+    return np.clip(corr, -1, 1)
+
+
+class CorrStats:
+    """各分組的充分統計量與查詢介面。
+
+    ``keys`` 為各分組的 TSTAMP（日期）、步驟、CHAMBERID 與原始列數 Rows，依 TSTAMP 排序；
+    ``stats`` 為對應的 (分組數, 4, p, p) 陣列。
+    """
+
+    def __init__(self, keys, stats, parameters):
+        order = np.argsort(keys["TSTAMP"].to_numpy(), kind="stable")
+        self.keys = keys.iloc[order].reset_index(drop=True)
+        self.stats = stats[order]
+        self.parameters = list(parameters)
+
+    @classmethod
+    def from_table(cls, table):
+        """由儲存用的長表格（每個分組 4 × p 列）還原。"""
+        parameters = [col for col in table.columns if col not in ("TSTAMP", *CORR_GROUPS, "Rows", "Stat", "Parameter")]
+        block = len(STATS) * len(parameters)
+        keys = table.iloc[::block][["TSTAMP", *CORR_GROUPS, "Rows"]].reset_index(drop=True) if block else table.iloc[0:0]
+        stats = table[parameters].to_numpy(dtype=np.float64).reshape(-1, len(STATS), len(parameters), len(parameters))
+        return cls(keys, stats, parameters)
+
+    def to_table(self):
+        """轉為儲存用的長表格：各分組依 Stat、Parameter 展開為 4 × p 列，各參數為欄位。"""
+        groups, size = len(self.keys), len(STATS) * len(self.parameters)
+        table = self.keys.iloc[np.repeat(np.arange(groups), size)].reset_index(drop=True)
+        table["Stat"] = pd.Categorical(np.tile(np.repeat(STATS, len(self.parameters)), groups), categories=STATS)
+        table["Parameter"] = pd.Categorical(np.tile(self.parameters, len(STATS) * groups), categories=self.parameters)
+        values = self.stats.reshape(-1, len(self.parameters))
+        return pd.concat([table, pd.DataFrame(values, columns=self.parameters)], axis=1)
+
+    def _select(self, start, end, where):
+        """回傳符合條件的分組位置；``where`` 為 ``{欄位: 值的列表}``。"""
+        lower, upper = time_bounds(self.keys, start, end)
+        keys = self.keys.iloc[lower:upper]
+        mask = np.ones(len(keys), dtype=bool)
+        for col, values in (where or {}).items():
+            mask &= keys[col].isin(values).to_numpy()
+        return np.flatnonzero(mask) + lower
+
+    def count(self, start=None, end=None, where=None):
+        """符合條件的原始列數。"""
+        return int(self.keys["Rows"].to_numpy()[self._select(start, end, where)].sum())
+
+    def corr(self, columns=None, start=None, end=None, where=None):
+        """符合條件的資料列的 Pearson 相關係數矩陣（與 ``data[columns].corr()`` 相同）。
+
+        ``start``、``end`` 為日期範圍（含兩端），``where`` 為 ``{欄位: 值的列表}``，例如 ``{"step_name": ["CLN1"]}``。
+        """
+        columns = list(columns or self.parameters)
+        positions = [self.parameters.index(col) for col in columns]
+        totals = self.stats[self._select(start, end, where)].sum(axis=0)
+        totals = totals[:, positions][:, :, positions]
+        return pd.DataFrame(_pearson(totals), index=columns, columns=columns)
+
+    def matrices(self, columns=None, by=None, start=None, end=None, where=None):
+        """一次計算所有分組的相關係數矩陣，回傳 ``(keys, 形狀為 (分組數, p, p) 的陣列)``。
+
+        預設每個日期 × 步驟 × CHAMBERID 一個矩陣；``by`` 指定時先依這些欄位合併分組
+        （例如 ``["step_name", "CHAMBERID"]`` 為整段期間每個機台每個步驟一個矩陣）。
+        ``keys`` 為各矩陣的分組欄位與原始列數 Rows。
+        """
+        columns = list(columns or self.parameters)
+        positions = [self.parameters.index(col) for col in columns]
+        selected = self._select(start, end, where)
+        keys = self.keys.iloc[selected].reset_index(drop=True)
+        stats = self.stats[selected][:, :, positions][:, :, :, positions]
+        if by is not None:
+            by = list(by)
+            groups, size = _group_codes(keys, by)
+            valid = groups >= 0
+            merged = _group_labels(keys, by, groups)
+            merged["Rows"] = np.bincount(groups[valid], weights=keys["Rows"].to_numpy()[valid], minlength=size).astype(np.int64)
+            totals = np.zeros((size, *stats.shape[1:]))
+            np.add.at(totals, groups[valid], stats[valid])
+            keys, stats = merged, totals
+        return keys, _pearson(stats)
+
+
+def build_corr_stats(frame, parameters=None, steps=None):
+    """由資料建立每個日期 × 步驟 × CHAMBERID 的統計量；只保留 ``steps``（預設 CLN1、CLN2、CLN3）的資料列。"""
+    parameters = [col for col in (parameters or CORR_PARAMETERS) if col in frame.columns]
+    steps = CORR_STEPS if steps is None else steps
+    keep = frame["TSTAMP"].notna().to_numpy() & frame["step_name"].isin(steps).to_numpy()
+    frame = frame[keep]
+    keys = frame[CORR_GROUPS].assign(TSTAMP=frame["TSTAMP"].dt.normalize())[["TSTAMP", *CORR_GROUPS]]
+    groups, size = _group_codes(keys, list(keys.columns))
+    valid = groups >= 0
+    labels = _group_labels(keys, list(keys.columns), groups)
+    labels["Rows"] = np.bincount(groups[valid], minlength=size).astype(np.int64)
+    values = frame[parameters].to_numpy(dtype=np.float64)[valid]
+    return CorrStats(labels, _group_stats(values, groups[valid], size), parameters)
+
+
+@lru_cache(maxsize=4)
+def _read_stats_cached(file_keys):
+    parts = [CorrStats.from_table(pd.read_parquet(path, engine="pyarrow")) for path, _, _ in file_keys]
+    keys = _concat([part.keys for part in parts])
+    return CorrStats(keys, np.concatenate([part.stats for part in parts]), parts[0].parameters)
+
+
+def load_corr_stats(start=None, end=None, root=None):
+    """讀取匯入時寫出的統計量，只開啟涵蓋 [start, end] 的年月。
+
+    尚未建立，或有年月分區沒有對應的統計量時回傳 None（與 ``load_cube`` 相同）。
+    """
+    start = pd.Timestamp(start) if start is not None else None
+    end = pd.Timestamp(end) if end is not None else None
+    files = list_cube_files(root, STATS_PREFIX)
+    if not covers_partitions(files, root):
+        return None
+    paths = _prune_partitions(files, start, end)
+    if not paths:
+        # 時間窗內沒有任何年月，回傳參數相同、沒有分組的統計量
+        return CorrStats.from_table(pd.read_parquet(files[-1][2], engine="pyarrow").iloc[0:0])
+    return _read_stats_cached(tuple(_file_key(path) for path in paths))
+
+
+def corr_stats_for(frame=None, start=None, end=None, root=None):
+    """取得相關係數的統計量。
+
+    未指定 ``frame`` 時使用匯入時寫出的統計量（只讀取涵蓋 [start, end] 的年月），沒有時由 ``load_merged_data()`` 建立；
+    指定 ``frame`` 時由該資料建立。由資料建立的統計量同一份資料只建立一次。
+    """
+    if frame is None:
+        stats = load_corr_stats(start, end, root)
+        if stats is not None:
+            return stats
+        frame = load_merged_data()
+    columns = [col for col in ["TSTAMP", *CORR_GROUPS, *CORR_PARAMETERS] if col in frame.columns]
+    return _cache.get(frame, columns, None, lambda: build_corr_stats(frame))
@@ -0,0 +1,212 @@
+"""NF3 用量的預先彙總 cube（小時粒度）。
+
+各頁面的 NF3 圖表幾乎都是「依日期 / 月份與 CHAMBERID、TOOLID、LAYER、OPERATION、SIN、
+RECIPEID、step_name 的某個子集合，加總 NF3_total_Flow 並計算 GLASSID 片數」。
+原本每個圖表都要掃描數百萬筆原始資料；這裡在匯入時先彙總成兩張小表：
+
+- flow：每小時 × 各維度組合的 NF3_total_Flow 合計與原始列數；
+- glasses：每小時 × 各維度組合出現的 GLASSID（去重），用於計算片數（片數不可相加，需保留 GLASSID）。
+
+兩張表隨分區資料集一起寫出（``cvd.store``），依年月存放在 ``_cube/year=YYYY/month=MM/``；
+頁面以 ``cube_for`` 取得 cube，再以 ``NF3Cube.query`` 依任意維度子集合彙總，只需處理數千筆資料。
+"""
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from cvd.cache import ArrayCache
+from cvd.enrich import date_of, year_month_of
+from cvd.loader import MERGED_DATASET, _file_key, _freeze, list_partitions, load_merged_data
+from cvd.metrics import aggregations, derive
+from cvd.rollup import _codes_of
+from cvd.timeindex import sort_by_time, time_slice
+
+CUBE_DIMENSIONS = ["CHAMBERID", "TOOLID", "LAYER", "OPERATION", "SIN", "RECIPEID", "step_name"]
+CUBE_VALUE = "NF3_total_Flow"
+CUBE_DIR = "_cube"
+FLOW_PREFIX = "flow"
+GLASS_PREFIX = "glass"
+# 由原始資料建立的 cube 最多保留數（每份資料一個）
+CUBE_CACHE_SIZE = 2
+
+_cache = ArrayCache(CUBE_CACHE_SIZE)
+
+
+def _decode(coded, labels):
+    """將整數代碼欄位轉回類別欄位（代碼 0 為缺值）。"""
+    return {
+        col: pd.Categorical.from_codes(coded[col].to_numpy() - 1, categories=labels[col])
+        for col in labels
+    }
+
+
+def build_cube(frame):
+    """由已套用 schema 並補上衍生欄位的資料建立 ``(flow, glasses)`` 兩張表。
+
+    資料中不存在的維度略過；TSTAMP 為缺值的列不計入。
+    """
+    frame = frame[frame["TSTAMP"].notna().to_numpy()]
+    dims = [col for col in CUBE_DIMENSIONS if col in frame.columns]
+    coded, labels = {}, {}
+    for col in dims:
+        coded[col], labels[col] = _codes_of(frame[col])
+    hours = frame["TSTAMP"].dt.floor("H").to_numpy().view("i8")
+    keys = pd.DataFrame({"TSTAMP": hours, **coded})
+
+    flows = np.nan_to_num(frame[CUBE_VALUE].to_numpy(dtype=np.float64), nan=0.0)
+    flow = (
+        keys.assign(**{CUBE_VALUE: flows, "rows": 1})
+        .groupby(["TSTAMP", *dims], sort=True)
+        .sum()
+        .reset_index()
+    )
+    glass_codes, glass_labels = _codes_of(frame["GLASSID"])
+    glasses = keys.assign(GLASSID=glass_codes).drop_duplicates().sort_values(["TSTAMP", *dims, "GLASSID"])
+
+    flow = pd.DataFrame({
+        "TSTAMP": flow["TSTAMP"].to_numpy().view("M8[ns]"),
+        **_decode(flow, labels),
+        CUBE_VALUE: flow[CUBE_VALUE].to_numpy(),
+        "rows": flow["rows"].to_numpy(dtype=np.int64),
+    })
+    glasses = pd.DataFrame({
+        "TSTAMP": glasses["TSTAMP"].to_numpy().view("M8[ns]"),
+        **_decode(glasses, {**labels, "GLASSID": glass_labels}),
+    })
+    return flow, glasses
+
+
+class NF3Cube:
+    """NF3 用量 cube 的查詢介面。"""
+
+    def __init__(self, flow, glasses):
+        self.flow = _freeze(self._with_dates(flow))
+        self.glasses = _freeze(self._with_dates(glasses))
+
+    @staticmethod
+    def _with_dates(table):
+        table = sort_by_time(table)
+        table["Date"] = date_of(table["TSTAMP"])
+        table["YearMonth"] = year_month_of(table["Date"])
+        return table
+
+    @property
+    def latest(self):
+        """cube 中最新的 TSTAMP（小時）。"""
+        return self.flow["TSTAMP"].max()
+
+    @staticmethod
+    def _filter(table, where, start, end):
+        table = time_slice(table, start, end)
+        if not where:
+            return table
+        mask = np.ones(len(table), dtype=bool)
+        for col, condition in where.items():
+            values = table[col]
+            mask &= np.asarray(condition(values) if callable(condition) else values.isin(condition), dtype=bool)
+        return table[mask]
+
+    def query(self, by, where=None, start=None, end=None, glass_count=False):
+        """依 ``by`` 彙總 NF3_total_Flow（與原始列數 rows），回傳與 ``groupby(by).sum().reset_index()`` 相同的資料框。
+
+        ``by`` 可使用各維度與 TSTAMP（小時）、Date、YearMonth；
+        ``where`` 為 ``{欄位: 值的列表或 Series → 布林遮罩的函數}``；``start``、``end`` 限定 TSTAMP 範圍。
+        ``glass_count`` 為 True 時另加 GLASSID 欄位（不重複的 GLASSID 數）。
+        """
+        by = list(by)
+        flow = self._filter(self.flow, where, start, end)
+        result = flow.groupby(by, observed=True)[[CUBE_VALUE, "rows"]].sum().reset_index()
+        if glass_count:
+            glasses = self._filter(self.glasses, where, start, end)
+            counts = glasses.groupby(by, observed=True)["GLASSID"].nunique().reset_index()
+            result = result.merge(counts, on=by, how="left")
+        return result
+
+    def aggregate(self, by, metrics, where=None, start=None, end=None, decimals=None):
+        """依 ``by`` 計算 ``cvd.metrics`` 宣告的指標（參數同 ``query``），回傳與 ``cvd.metrics.aggregate`` 相同的資料框。
+
+        NF3_total_Flow、rows 的合計由 flow 表彙總，GLASSID 的不重複數由 glasses 表彙總。
+        """
+        by = list(by)
+        specs = aggregations(metrics)
+        flow_specs = {name: spec for name, spec in specs.items() if spec != ("GLASSID", "nunique")}
+        for name, (column, agg) in flow_specs.items():
+            if column not in (CUBE_VALUE, "rows") or agg != "sum":
+                raise ValueError(f"Metric {name!r} ({agg} of {column}) is not available from the cube")
+        # 只有片數時仍由 flow 表決定分組（多出的 rows 欄位不會輸出）
+        flow_specs = flow_specs or {"rows": ("rows", "sum")}
+        table = self._filter(self.flow, where, start, end).groupby(by, observed=True).agg(**flow_specs)
+        glass_specs = {name: spec for name, spec in specs.items() if spec == ("GLASSID", "nunique")}
+        if glass_specs:
+            counts = self._filter(self.glasses, where, start, end).groupby(by, observed=True).agg(**glass_specs)
+            # glasses 的分組都出現在 flow 中，依分組索引對齊即可
+            for name in glass_specs:
+                table[name] = counts[name].reindex(table.index)
+        return derive(table, metrics, decimals)
+
+
+def _cube_dir(root):
+    return Path(root or MERGED_DATASET) / CUBE_DIR
+
+
+def list_cube_files(root=None, prefix=FLOW_PREFIX):
+    """列出 cube 檔案，回傳依時間排序的 ``[(year, month, path), ...]``。"""
+    files = []
+    for path in _cube_dir(root).glob(f"year=*/month=*/{prefix}-*.parquet"):
+        year = int(path.parent.parent.name.split("=", 1)[1])
+        month = int(path.parent.name.split("=", 1)[1])
+        files.append((year, month, path))
+    return sorted(files)
+
+
+def covers_partitions(files, root=None):
+    """``list_cube_files`` 的結果是否恰好涵蓋資料集的每個年月分區（沒有分區時為 False）。"""
+    months = {(year, month) for year, month, _ in list_partitions(root)}
+    return bool(months) and {(year, month) for year, month, _ in files} == months
+
+
+def _concat(frames):
+    """合併各年月的 cube 檔案；類別欄位以聯集（排序後）的類別合併。"""
+    merged = pd.concat(frames, ignore_index=True)
+    for col in merged.columns:
+        if all(isinstance(f[col].dtype, pd.CategoricalDtype) for f in frames):
+            merged[col] = union_categoricals([f[col] for f in frames], sort_categories=True)
+    return merged
+
+
+@lru_cache(maxsize=2)
+def _read_cube_cached(flow_keys, glass_keys):
+    def read(file_keys):
+        return _concat([pd.read_parquet(path, engine="pyarrow") for path, _, _ in file_keys])
+
+    return NF3Cube(read(flow_keys), read(glass_keys))
+
+
+def load_cube(root=None):
+    """讀取匯入時寫出的 cube；尚未建立，或有年月分區沒有對應的 cube 時回傳 None。"""
+    flow_files = list_cube_files(root, FLOW_PREFIX)
+    glass_files = list_cube_files(root, GLASS_PREFIX)
+    if not covers_partitions(flow_files, root) or not covers_partitions(glass_files, root):
+        return None
+    return _read_cube_cached(
+        tuple(_file_key(path) for _, _, path in flow_files),
+        tuple(_file_key(path) for _, _, path in glass_files),
+    )
+
+
+def cube_for(frame=None, root=None):
+    """取得 NF3 用量 cube。
+
+    未指定 ``frame`` 時使用匯入時寫出的 cube，沒有時由 ``load_merged_data()`` 建立；
+    指定 ``frame``（例如上傳的檔案）時由該資料建立。由資料建立的 cube 同一份資料只建立一次。
+    """
+    if frame is None:
+        cube = load_cube(root)
+        if cube is not None:
+            return cube
+        frame = load_merged_data()
+    columns = [col for col in ["TSTAMP", *CUBE_DIMENSIONS, "GLASSID", CUBE_VALUE] if col in frame.columns]
+    return _cache.get(frame, columns, None, lambda: NF3Cube(*build_cube(frame)))
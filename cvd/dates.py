@@ -0,0 +1,108 @@
+"""選取日期的查詢表。
+
+監控頁面的側邊欄選擇日期後，原本每次 rerun 都要以 ``df[df['Date'] == selected_date]``
+掃描整份資料，再以 groupby 重算每日 / 每月用量與增減，才取出選取日期的一列。
+這裡對同一份資料只建立一次：
+
+- ``DateIndex``：日期 → 列範圍。資料已依 TSTAMP 排序（見 ``cvd.timeindex``）時
+  每個日期是連續的列，取出選取日期只需切片；
+- ``daily_kpis``：每個日期的當日用量、日增減、當月用量與月增減，以日期為索引。
+
+切換日期只需查表。
+"""
+import numpy as np
+import pandas as pd
+
+from cvd.cache import ArrayCache
+from cvd.loader import _freeze
+from cvd.units import convert_flow
+
+# 最多保留的查詢表數（每份資料一個）
+DATE_CACHE_SIZE = 4
+
+_cache = ArrayCache(DATE_CACHE_SIZE)
+
+
+class DateIndex:
+    """Date 欄位的日期 → 列範圍查詢表；資料框本身不被保留。"""
+
+    def __init__(self, dates):
+        categorical = dates.array if isinstance(dates.dtype, pd.CategoricalDtype) else pd.Categorical(dates)
+        codes = categorical.codes
+        counts = np.bincount(codes[codes >= 0], minlength=len(categorical.categories))
+        missing = int(np.count_nonzero(codes < 0))
+        # 依日期排序的資料每個日期都是連續的列，不需要倒排列表
+        if missing == 0 and np.all(codes[1:] >= codes[:-1]):
+            self._order = None
+        else:
+            self._order = np.argsort(codes, kind="stable").astype(np.int32)
+        starts = np.concatenate([[0], np.cumsum(counts)]) + missing
+        self._ranges = {
+            day: (int(start), int(stop))
+            for day, start, stop in zip(categorical.categories, starts[:-1], starts[1:])
+            if stop > start
+        }
+        self.dates = sorted(self._ranges)
+
+    def __contains__(self, day):
+        return day in self._ranges
+
+    def rows_of(self, day):
+        """回傳 ``day`` 的列位置（slice 或已排序的列號）；沒有資料時為空的 slice。"""
+        start, stop = self._ranges.get(day, (0, 0))
+        if self._order is None:
+            return slice(start, stop)
+        return np.sort(self._order[start:stop])
+
+    def take(self, frame, day):
+        """取出 ``day`` 的資料列；連續時為不複製資料的切片。"""
+        rows = self.rows_of(day)
+        if isinstance(rows, slice):
+            return frame.iloc[rows].copy(deep=False)
+        return frame.take(rows)
+
+
+def date_index(frame, column="Date"):
+    """取得資料框 ``column`` 的日期查詢表；同一份資料重複使用已建立的查詢表。"""
+    return _cache.get(frame, [column], None, lambda: DateIndex(frame[column]))
+
+
+def _kpi_table(dates, values):
+    categorical = dates.array if isinstance(dates.dtype, pd.CategoricalDtype) else pd.Categorical(dates)
+    codes = categorical.codes
+    valid = codes >= 0
+    totals = np.bincount(codes[valid], weights=values[valid], minlength=len(categorical.categories))
+    present = np.bincount(codes[valid], minlength=len(categorical.categories)) > 0
+
+    table = pd.DataFrame(
+        {"Daily_Flow": totals[present]},
+        index=pd.Index(categorical.categories[present], name="Date"),
+    )
+    # 與前一個有資料的日期比較（%）
+    table["Previous_Day"] = table["Daily_Flow"].shift(1)
+    table["Day_Change"] = ((table["Daily_Flow"] - table["Previous_Day"]) / table["Previous_Day"] * 100).round(2)
+    table["Cumulative_Flow"] = table["Daily_Flow"].cumsum()
+
+    # 當月用量為整個月份的合計，與前一個有資料的月份比較（%）
+    table["Month"] = pd.PeriodIndex(pd.to_datetime(table.index), freq="M")
+    monthly = table.groupby("Month")["Daily_Flow"].sum()
+    previous_month = monthly.shift(1)
+    month_change = ((monthly - previous_month) / previous_month * 100).round(2)
+    table["Month_Flow"] = table["Month"].map(monthly)
+    table["Previous_Month"] = table["Month"].map(previous_month)
+    table["Month_Change"] = table["Month"].map(month_change)
+    return table
+
+
+def daily_kpis(frame, column="NF3_total_Flow", unit="kg/day", decimals=2):
+    """每個日期的用量 KPI 表（以 Date 為索引），同一份資料只計算一次。
+
+    ``column`` 先換算為 ``unit`` 並逐列四捨五入到 ``decimals`` 位（與頁面的 ``Daily_Flow_kg`` 相同）
+    再加總。欄位：Daily_Flow、Previous_Day、Day_Change、Cumulative_Flow、
+    Month、Month_Flow、Previous_Month、Month_Change；增減以 % 表示。回傳唯讀表格的淺複製。
+    """
+    def build():
+        values = convert_flow(frame[column], unit).round(decimals).to_numpy(dtype=np.float64)
+        return _freeze(_kpi_table(frame["Date"], values))
+
+    return _cache.get(frame, ["Date", column], (unit, decimals), build).copy(deep=False)
@@ -0,0 +1,136 @@
+"""匯入時預先計算的衍生欄位。
+
+各頁面原本在每次 rerun 時都重新計算 LAYER、GLASSID/PRODUCT/RECIPEID 前四碼、Date 與 YearMonth，
+且各頁面的 LAYER 規則不一致。這些欄位改在寫入資料集時計算一次並一併儲存，
+載入時若缺少（例如舊版資料或上傳的 CSV）再補算；頁面只需選取欄位。
+
+類別欄位只對類別值（而非每一列）做字串運算，再依 codes 對應回各列。
+"""
+import numpy as np
+import pandas as pd
+
+from cvd.schema import parse_tstamp
+
+# RECIPEID 中依優先順序比對的製程層別（不分大小寫；同時包含多個時取順序在前者）
+LAYERS = ["BP", "PFA", "AS"]
+LAYER_OTHER = "OTHER"
+LAYER_UNKNOWN = "Unknown"
+PREFIX_LENGTH = 4
+# 前四碼欄位：來源欄位 → 衍生欄位
+PREFIX_COLUMNS = {
+    "GLASSID": "GLASSID_prefix",
+    "PRODUCT": "PRODUCT_prefix",
+    "RECIPEID": "RECIPEID_prefix",
+}
+DERIVED_COLUMNS = ["LAYER", *PREFIX_COLUMNS.values(), "Date", "YearMonth"]
+
+
+def _as_categorical(values):
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.array
+    return pd.Categorical(values)
+
+
+def _map_categories(values, func):
+    """對類別值套用 ``func``（回傳與類別等長的陣列），再依 codes 展開為各列的結果。"""
+    categorical = _as_categorical(values)
+    mapped = np.asarray(func(pd.Series(categorical.categories)))
+    # 缺值（code -1）以 func 對 NaN 的結果表示
+    missing = np.asarray(func(pd.Series([np.nan], dtype=object)))
+    return np.concatenate([mapped, missing])[categorical.codes]
+
+
+def _layer_names(recipe_ids):
+    upper = recipe_ids.astype(str).str.upper()
+    layers = np.full(len(upper), LAYER_OTHER, dtype=object)
+    for layer in reversed(LAYERS):
+        layers[upper.str.contains(layer, regex=False).to_numpy()] = layer
+    layers[recipe_ids.isna().to_numpy()] = LAYER_UNKNOWN
+    return layers
+
+
+def layer_of(recipe_ids):
+    """由 RECIPEID 取出製程層別：依 BP、PFA、AS 的順序比對（不分大小寫），都不符合為 OTHER，缺值為 Unknown。"""
+    codes, uniques = pd.factorize(_map_categories(recipe_ids, _layer_names), sort=True)
+    return pd.Series(pd.Categorical.from_codes(codes, categories=uniques), index=recipe_ids.index, name="LAYER")
+
+
+def prefix_columns(frame):
+    """各 ID 欄位的前四碼，回傳 ``{衍生欄位: Series}``；只對存在的來源欄位計算。
+
+    與原本的 ``values.astype(str).str[:4]`` 一致，缺值視為字串 "nan"。各欄位為共用同一組類別的
+    類別欄位，``frame["GLASSID_prefix"] == frame["PRODUCT_prefix"]`` 只比較 codes。
+    """
+    prefixes = {}
+    for source, target in PREFIX_COLUMNS.items():
+        if source not in frame.columns:
+            continue
+        categorical = _as_categorical(frame[source])
+        labels = categorical.categories.astype(str).str[:PREFIX_LENGTH].to_numpy(dtype=object)
+        codes = categorical.codes
+        if (codes < 0).any():
+            labels, codes = np.append(labels, "nan"), np.where(codes < 0, len(labels), codes)
+        prefixes[target] = (labels, codes)
+    categories = pd.Index(sorted(set().union(*(labels for labels, _ in prefixes.values()))), dtype=object)
+    return {
+        target: pd.Series(
+            pd.Categorical.from_codes(categories.get_indexer(labels)[codes], categories=categories), index=frame.index
+        )
+        for target, (labels, codes) in prefixes.items()
+    }
+
+
+def _shares_categories(frame, columns):
+    if not all(_is_categorical(frame, col) for col in columns):
+        return False
+    first = frame[columns[0]].cat.categories
+    return all(frame[col].cat.categories.equals(first) for col in columns[1:])
+
+
+def date_of(tstamp):
+    """以 TSTAMP 的日期（``datetime.date``）建立類別欄位，類別依日期排序。"""
+    codes, days = pd.factorize(tstamp.dt.normalize(), sort=True)
+    return pd.Series(
+        pd.Categorical.from_codes(codes, categories=pd.Index(days.date, dtype=object)),
+        index=tstamp.index,
+        name="Date",
+    )
+
+
+def year_month_of(dates):
+    """由 Date 類別欄位建立 ``YYYY/MM`` 類別欄位。"""
+    categorical = dates.array
+    months = pd.Series(pd.to_datetime(categorical.categories).strftime("%Y/%m"))
+    codes, uniques = pd.factorize(months, sort=True)
+    codes = np.append(codes, -1)[categorical.codes]
+    return pd.Series(pd.Categorical.from_codes(codes, categories=uniques), index=dates.index, name="YearMonth")
+
+
+def _is_categorical(frame, column):
+    return column in frame.columns and isinstance(frame[column].dtype, pd.CategoricalDtype)
+
+
+def enrich(frame):
+    """補上缺少的衍生欄位，回傳新資料框；已存在且型別正確的欄位不重算。
+
+    來源欄位不存在時略過對應的衍生欄位（例如只讀取部分欄位時）。
+    """
+    frame = frame.copy(deep=False)
+    # 新規則不會產生缺值；含缺值的 LAYER 為舊規則寫入的資料，需重算
+    if "RECIPEID" in frame.columns and (not _is_categorical(frame, "LAYER") or frame["LAYER"].hasnans):
+        frame["LAYER"] = layer_of(frame["RECIPEID"])
+    # 前四碼欄位須共用同一組類別才能互相比較；分區合併或舊版資料（整數雜湊）時重算
+    targets = [target for source, target in PREFIX_COLUMNS.items() if source in frame.columns]
+    if targets and not _shares_categories(frame, targets):
+        for target, prefix in prefix_columns(frame).items():
+            frame[target] = prefix
+    if "TSTAMP" in frame.columns:
+        frame["TSTAMP"] = parse_tstamp(frame["TSTAMP"])
+        # Parquet 以 date32 儲存 Date，讀回為 object，由 TSTAMP 重建為類別欄位較快
+        if not _is_categorical(frame, "Date"):
+            frame["Date"] = date_of(frame["TSTAMP"])
+    elif "Date" in frame.columns and not _is_categorical(frame, "Date"):
+        frame["Date"] = pd.Series(pd.Categorical(frame["Date"]), index=frame.index)
+    if "Date" in frame.columns and not _is_categorical(frame, "YearMonth"):
+        frame["YearMonth"] = year_month_of(frame["Date"])
+    return frame
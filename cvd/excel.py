@@ -0,0 +1,131 @@
+"""可切換引擎的 Excel 讀取器。
+
+pandas 預設以 openpyxl 讀取 .xlsx，開啟大型工作簿時相當慢。若環境中安裝了較快的引擎
+（calamine：``pip install python-calamine``；.xlsb 則可用 pyxlsb），這裡會優先使用，
+未安裝時自動退回 pandas 預設引擎。也可用環境變數 ``CVD_EXCEL_ENGINE`` 強制指定引擎。
+
+pandas 1.5 尚未內建 calamine 引擎，因此 calamine 直接透過 python-calamine 讀取，
+並將儲存格轉成與 ``pd.read_excel`` 相同的欄位型別（整數、浮點數、日期時間、字串）。
+"""
+import datetime
+import os
+from importlib.util import find_spec
+from pathlib import Path
+
+import pandas as pd
+
+try:
+    from python_calamine import CalamineWorkbook
+except ImportError:
+    CalamineWorkbook = None
+
+# 依優先順序排列；"openpyxl" 為 pandas 預設，永遠可用
+ENGINES = ("calamine", "pyxlsb", "openpyxl")
+
+
+def available_engines():
+    """回傳目前環境可用的引擎。"""
+    engines = []
+    if CalamineWorkbook is not None:
+        engines.append("calamine")
+    if find_spec("pyxlsb") is not None:
+        engines.append("pyxlsb")
+    engines.append("openpyxl")
+    return engines
+
+
+def pick_engine(path, engine=None):
+    """決定讀取 ``path`` 使用的引擎：明確指定 > 環境變數 > 可用的最快引擎。
+
+    ``path`` 也可以是具 ``name`` 屬性的檔案物件（例如 Streamlit 的上傳檔案）。
+    """
+    engine = engine or os.environ.get("CVD_EXCEL_ENGINE")
+    available = available_engines()
+    if engine:
+        if engine not in available:
+            raise ValueError(f"Excel engine '{engine}' is not installed; available: {available}")
+        return engine
+    suffix = Path(getattr(path, "name", path)).suffix.lower()
+    if suffix == ".xlsb":
+        return "pyxlsb" if "pyxlsb" in available else "calamine" if "calamine" in available else None
+    if "calamine" in available:
+        return "calamine"
+    # 交給 pandas 依副檔名選擇（.xlsx → openpyxl、.xls → xlrd）
+    return None
+
+
+def _select_columns(header, usecols):
+    if usecols is None:
+        return list(range(len(header)))
+    if callable(usecols):
+        return [i for i, name in enumerate(header) if usecols(name)]
+    wanted = set(usecols)
+    return [i for i, name in enumerate(header) if name in wanted]
+
+
+def _convert_column(values):
+    """將 calamine 回傳的儲存格值轉為與 pandas 相同的欄位型別。"""
+    values = values.mask(values.eq("")).infer_objects()
+    if values.dtype == object:
+        non_null = values.dropna()
+        if len(non_null) and non_null.map(lambda v: isinstance(v, (datetime.date, datetime.datetime))).all():
+            return pd.to_datetime(values)
+        # 與 pandas 的 TextParser 一致：全為數字字串的欄位轉成數值
+        try:
+            values = pd.to_numeric(values)
+        except (ValueError, TypeError):
+            return values
+    # Excel 的數字一律以浮點數儲存，整數欄位轉回 int64（與 openpyxl 引擎一致）
+    if values.dtype.kind == "f" and len(values) and values.notna().all() and (values % 1 == 0).all():
+        return values.astype("int64")
+    return values
+
+
+class _CalamineWorkbook:
+    """以 python-calamine 讀取的工作簿，介面與 ``pd.ExcelFile`` 相同的子集。"""
+
+    def __init__(self, path):
+        if hasattr(path, "read"):
+            self._workbook = CalamineWorkbook.from_filelike(path)
+        else:
+            self._workbook = CalamineWorkbook.from_path(str(path))
+        self.sheet_names = list(self._workbook.sheet_names)
+
+    def parse(self, sheet_name=0, usecols=None):
+        if isinstance(sheet_name, int):
+            sheet_name = self.sheet_names[sheet_name]
+        rows = self._workbook.get_sheet_by_name(sheet_name).to_python(skip_empty_area=False)
+        if not rows:
+            return pd.DataFrame()
+        header = [str(name) if name != "" else f"Unnamed: {i}" for i, name in enumerate(rows[0])]
+        indices = _select_columns(header, usecols)
+        body = rows[1:]
+        return pd.DataFrame({
+            header[i]: _convert_column(pd.Series([row[i] if i < len(row) else "" for row in body], dtype=object))
+            for i in indices
+        })
+
+    def close(self):
+        close = getattr(self._workbook, "close", None)
+        if close is not None:
+            close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_workbook(path, engine=None):
+    """開啟工作簿，回傳具 ``sheet_names``、``parse(sheet, usecols=...)`` 的物件（可用於 with）。"""
+    engine = pick_engine(path, engine)
+    if engine == "calamine":
+        return _CalamineWorkbook(path)
+    return pd.ExcelFile(path, engine=engine)
+
+
+def read_excel(path, sheet_name=0, usecols=None, engine=None):
+    """讀取單一工作表，等同 ``pd.read_excel``，但會使用可用的最快引擎。"""
+    with open_workbook(path, engine) as workbook:
+        return workbook.parse(sheet_name, usecols=usecols)
@@ -0,0 +1,101 @@
+"""多維度篩選的倒排索引。
+
+頁面的側邊欄有多個 multiselect，原本依序對每個維度做一次 ``isin``，
+每一步都會產生一個新的資料框。這裡為每個維度建立一次：
+
+- 各列的類別代碼（categorical 的 codes）與各值的列數；
+- 依需要建立的倒排列表（每個值對應的已排序列號）。
+
+查詢時先處理最有選擇性的維度：選到的列很少時由倒排列表取出候選列，
+再以查找表檢查其餘維度；否則對每個維度以查找表產生 bitmap 後逐一 AND。
+最後只做一次 ``take`` 取出結果列。
+"""
+import numpy as np
+import pandas as pd
+
+from cvd.cache import ArrayCache
+
+# 選到的列數少於總列數的 1/SPARSE_RATIO 時改用倒排列表
+SPARSE_RATIO = 32
+# 最多保留的索引數（每份資料一個）
+INDEX_CACHE_SIZE = 4
+
+_cache = ArrayCache(INDEX_CACHE_SIZE)
+
+
+class FilterIndex:
+    """資料框在指定欄位上的篩選索引；資料框本身不被保留。"""
+
+    def __init__(self, frame, columns):
+        self.length = len(frame)
+        self.columns = list(columns)
+        self._codes = {}
+        self._values = {}
+        self._counts = {}
+        self._postings = {}
+        for col in self.columns:
+            values = frame[col]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                codes, uniques = values.array.codes, values.cat.categories
+            else:
+                codes, uniques = pd.factorize(values)
+            self._codes[col] = codes
+            self._values[col] = pd.Index(uniques)
+            self._counts[col] = np.bincount(codes[codes >= 0], minlength=len(uniques))
+
+    def _codes_of(self, col, selected):
+        codes = self._values[col].get_indexer(list(selected))
+        return np.unique(codes[codes >= 0])
+
+    def _lookup(self, col, codes):
+        # 最後一格對應缺值（code -1），永遠不會被選到
+        table = np.zeros(len(self._values[col]) + 1, dtype=bool)
+        table[codes] = True
+        return table
+
+    def rows_of(self, col, codes):
+        """回傳 ``col`` 的值為 ``codes`` 之一的列號（已排序）。"""
+        if col not in self._postings:
+            column_codes = self._codes[col]
+            order = np.argsort(column_codes, kind="stable").astype(np.int32)
+            starts = np.concatenate([[0], np.cumsum(self._counts[col])]) + np.count_nonzero(column_codes < 0)
+            self._postings[col] = order, starts
+        order, starts = self._postings[col]
+        if len(codes) == 1:
+            return order[starts[codes[0]]:starts[codes[0] + 1]]
+        return np.sort(np.concatenate([order[starts[c]:starts[c + 1]] for c in codes]))
+
+    def select(self, selections):
+        """回傳符合所有篩選條件的列號；``selections`` 為 ``{欄位: 選取的值}``，沒有條件時回傳 None。"""
+        active = []
+        for col, selected in selections.items():
+            codes = self._codes_of(col, selected)
+            active.append((int(self._counts[col][codes].sum()), col, codes))
+        if not active:
+            return None
+        active.sort(key=lambda item: item[0])
+        count, col, codes = active[0]
+        if count == 0:
+            return np.empty(0, dtype=np.int64)
+        if count * SPARSE_RATIO <= self.length:
+            rows = self.rows_of(col, codes)
+            for _, col, codes in active[1:]:
+                rows = rows[self._lookup(col, codes)[self._codes[col][rows]]]
+            return rows
+        mask = self._lookup(col, codes)[self._codes[col]]
+        for _, col, codes in active[1:]:
+            mask &= self._lookup(col, codes)[self._codes[col]]
+        return np.flatnonzero(mask)
+
+    def apply(self, frame, selections):
+        """依篩選條件取出資料列（單次 ``take``）。"""
+        rows = self.select(selections)
+        if rows is None:
+            return frame.copy(deep=False)
+        return frame.take(rows)
+
+
+def filter_index(frame, columns):
+    """取得資料框的篩選索引；同一份資料（頁面 rerun 時的淺複製）重複使用已建立的索引。"""
+    columns = list(columns)
+    return _cache.get(frame, columns, None, lambda: FilterIndex(frame, columns))
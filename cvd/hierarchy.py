@@ -0,0 +1,134 @@
+"""階層篩選（Region → State → City）的索引。
+
+Superstore EDA 頁面的側邊欄依序選擇 Region、State、City，原本每次 rerun 都要：
+先以日期區間篩選整份資料，再對篩選後的資料各做一次 ``unique()`` 產生選項，
+最後以 ``isin`` 的 if/elif 組合取出資料列。這裡對同一份資料只建立一次：
+
+- 各層的值（依出現順序）與每個葉節點（各層值的組合，例如某個 City）的各層代碼；
+- 每個葉節點的倒排列表（已排序的列號）；
+- 時間欄位解析後的排序，日期區間以 ``searchsorted`` 取得列號。
+
+選項只需查詢葉節點表（筆數為城市數），篩選結果由選到的葉節點合併倒排列表取得。
+"""
+import numpy as np
+import pandas as pd
+
+from cvd.cache import ArrayCache
+
+# 最多保留的索引數（每份資料一個）
+INDEX_CACHE_SIZE = 4
+
+_cache = ArrayCache(INDEX_CACHE_SIZE)
+
+
+class HierarchyIndex:
+    """資料框在階層欄位上的索引；資料框本身不被保留。
+
+    ``levels`` 由上而下排列（例如 ``["Region", "State", "City"]``）；
+    ``time_column`` 指定時一併建立日期區間的索引，解析後的時間在 ``times``。
+    """
+
+    def __init__(self, frame, levels, time_column=None):
+        self.length = len(frame)
+        self.levels = list(levels)
+        self._values = {}
+        row_codes = {}
+        combined = np.zeros(self.length, dtype=np.int64)
+        for level in self.levels:
+            codes, uniques = pd.factorize(frame[level])
+            row_codes[level] = codes
+            self._values[level] = pd.Index(uniques)
+            # 缺值（code -1）視為獨立的一個值
+            combined = combined * (len(uniques) + 1) + (codes + 1)
+        leaves, _ = pd.factorize(combined)
+        self._leaf_of_row = leaves.astype(np.int32)
+        counts = np.bincount(leaves, minlength=leaves.max() + 1 if len(leaves) else 0)
+        self._order = np.argsort(leaves, kind="stable").astype(np.int32)
+        self._starts = np.concatenate([[0], np.cumsum(counts)])
+        # 葉節點依出現順序編號，其第一列即倒排列表的第一個元素
+        self._first_row = self._order[self._starts[:-1]]
+        self._leaf_codes = {level: codes[self._first_row] for level, codes in row_codes.items()}
+
+        self.times = None
+        if time_column is not None:
+            self.times = pd.to_datetime(frame[time_column])
+            times = self.times.to_numpy()
+            self._time_order = np.argsort(times, kind="stable").astype(np.int32)
+            # NaT 排在最後，不會落在任何日期區間內
+            self._sorted_times = times[self._time_order]
+
+    def rows_between(self, start, end):
+        """回傳時間在 [start, end] 內的列號（已排序）；涵蓋所有列時回傳 None。"""
+        lower = np.searchsorted(self._sorted_times, np.datetime64(start, "ns"), side="left")
+        upper = np.searchsorted(self._sorted_times, np.datetime64(end, "ns"), side="right")
+        if upper - lower == self.length:
+            return None
+        return np.sort(self._time_order[lower:upper])
+
+    def _leaf_mask(self, selections):
+        mask = np.ones(len(self._first_row), dtype=bool)
+        for level, selected in selections.items():
+            if not selected:
+                continue
+            codes = self._values[level].get_indexer(list(selected))
+            # 最後一格對應缺值（code -1），永遠不會被選到
+            table = np.zeros(len(self._values[level]) + 1, dtype=bool)
+            table[codes[codes >= 0]] = True
+            mask &= table[self._leaf_codes[level]]
+        return mask
+
+    def _first_rows(self, rows):
+        """各葉節點在 ``rows`` 中第一次出現的先後（只用於排序）；未出現者為 ``length``。"""
+        if rows is None:
+            return self._first_row
+        first = np.full(len(self._first_row), self.length, dtype=np.int64)
+        # rows 已排序，pd.unique 依出現順序回傳葉節點（雜湊，不需排序）
+        leaves = pd.unique(self._leaf_of_row[rows])
+        first[leaves] = np.arange(len(leaves))
+        return first
+
+    def options(self, level, selections=None, rows=None):
+        """回傳 ``level`` 在上層篩選條件下的選項，順序與 ``unique()`` 相同（依第一次出現）。
+
+        ``selections`` 為 ``{上層欄位: 選取的值}``，空的選取視為不篩選；
+        ``rows`` 限定列號範圍（例如 ``rows_between`` 的結果）。缺值不列入選項。
+        """
+        first = self._first_rows(rows)
+        leaves = np.flatnonzero(self._leaf_mask(selections or {}) & (first < self.length))
+        codes = self._leaf_codes[level][leaves]
+        valid = codes >= 0
+        codes, first = codes[valid], first[leaves][valid]
+        order = np.full(len(self._values[level]), self.length, dtype=np.int64)
+        np.minimum.at(order, codes, first)
+        present = np.flatnonzero(order < self.length)
+        return list(self._values[level][present[np.argsort(order[present], kind="stable")]])
+
+    def select(self, selections, rows=None):
+        """回傳符合所有非空篩選條件、且在 ``rows`` 內的列號（已排序）；沒有任何條件時回傳 ``rows``。"""
+        if not any(selections.values()):
+            return rows
+        leaves = np.flatnonzero(self._leaf_mask(selections))
+        if len(leaves) == 0:
+            return np.empty(0, dtype=np.int64)
+        postings = [self._order[self._starts[leaf]:self._starts[leaf + 1]] for leaf in leaves]
+        selected = postings[0] if len(postings) == 1 else np.sort(np.concatenate(postings))
+        if rows is not None:
+            selected = np.intersect1d(selected, rows, assume_unique=True)
+        return selected
+
+    def take(self, frame, rows):
+        """依列號取出資料列；``rows`` 為 None 時回傳淺複製。"""
+        if rows is None:
+            return frame.copy(deep=False)
+        return frame.take(rows)
+
+
+def hierarchy_index(frame, levels, time_column=None):
+    """取得資料框的階層索引；同一份資料（頁面 rerun 時的淺複製）重複使用已建立的索引。
+
+    須在頁面改寫欄位之前呼叫（改寫後的欄位是新的陣列）。
+    """
+    columns = [*levels, time_column] if time_column is not None else list(levels)
+    return _cache.get(
+        frame, columns, (tuple(levels), time_column), lambda: HierarchyIndex(frame, levels, time_column)
+    )
@@ -0,0 +1,204 @@
+"""GLASSID 不重複數的 HyperLogLog 摘要。
+
+各頁面以 ``GLASSID.nunique()`` 計算片數，每種分組都要對原始資料列建立雜湊集合。
+這裡在匯入時對每個日期 × CHAMBERID × 配方類型（GLASSID 與 PRODUCT / RECIPEID 前四碼是否相同、
+RECIPEID 是否為 RPSC）建立 HyperLogLog 暫存器（與 NF3 cube 一起寫出，見 ``cvd.store``）。
+暫存器可以取最大值合併，任意時間窗或機台組合的片數只需合併範圍內的暫存器：
+
+- GLASSID 以 ``pd.util.hash_array`` 雜湊為 64 位元（類別欄位只雜湊類別值），
+  前 ``HLL_PRECISION`` 位元決定暫存器，其餘位元的前導零個數 + 1 為暫存器的值；
+- 估計值為標準的 HyperLogLog（小基數時改用 linear counting）。
+
+誤差：``HLL_PRECISION = 12``（4096 個暫存器）的相對標準誤差約 1.04 / √4096 ≈ 1.6%。
+摘要以日期為單位，時間窗的起訖以整天計算。需要精確值時以 ``exact=True``
+（或設定環境變數 ``CVD_EXACT_GLASS_COUNT=1``）改由原始資料計算 ``nunique``。
+"""
+import os
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from cvd.cache import ArrayCache
+from cvd.cube import _concat, covers_partitions, list_cube_files
+from cvd.enrich import _as_categorical, _map_categories, prefix_columns
+from cvd.loader import _file_key, _prune_partitions, load_merged_data, load_merged_window
+from cvd.outliers import _group_codes, _group_labels
+from cvd.timeindex import time_bounds, time_slice
+
+HLL_PREFIX = "hll"
+HLL_PRECISION = 12
+HLL_REGISTERS = 1 << HLL_PRECISION
+# 摘要的分組（另加 TSTAMP 的日期）
+HLL_GROUPS = ["CHAMBERID", "Product_Match", "Recipe_Match", "RPSC_Recipe"]
+# 預設是否以原始資料精確計算
+GLASS_COUNT_EXACT = os.environ.get("CVD_EXACT_GLASS_COUNT", "") not in ("", "0")
+# 由原始資料建立的摘要最多保留數（每份資料一個）
+HLL_CACHE_SIZE = 2
+
+_cache = ArrayCache(HLL_CACHE_SIZE)
+
+
+def glass_keys(frame):
+    """各列的摘要分組：TSTAMP（日期）、CHAMBERID 與三個配方類型旗標。
+
+    Product_Match 與 Recipe_Match 為 GLASSID 前四碼是否與 PRODUCT、RECIPEID 相同，
+    RPSC_Recipe 為 RECIPEID 是否以 RPSC 開頭。
+    """
+    # 前四碼共用同一組類別，比較 codes 即可
+    prefixes = {col: prefix.cat.codes.to_numpy() for col, prefix in prefix_columns(frame).items()}
+    return pd.DataFrame({
+        "TSTAMP": frame["TSTAMP"].dt.normalize(),
+        "CHAMBERID": frame["CHAMBERID"],
+        "Product_Match": prefixes["GLASSID_prefix"] == prefixes["PRODUCT_prefix"],
+        "Recipe_Match": prefixes["GLASSID_prefix"] == prefixes["RECIPEID_prefix"],
+        "RPSC_Recipe": _map_categories(frame["RECIPEID"], lambda cats: cats.str.startswith("RPSC", na=False)).astype(bool),
+    }, index=frame.index)
+
+
+def _glass_hashes(glass_ids):
+    """GLASSID 的 64 位元雜湊（只雜湊類別值）與是否有值的遮罩。"""
+    categorical = _as_categorical(glass_ids)
+    hashes = pd.util.hash_array(np.asarray(categorical.categories.astype(str), dtype=object))
+    codes = categorical.codes
+    return hashes[np.maximum(codes, 0)], codes >= 0
+
+
+def _registers(groups, size, hashes):
+    """各分組的 HyperLogLog 暫存器 (size, HLL_REGISTERS)。"""
+    index = (hashes >> np.uint64(64 - HLL_PRECISION)).astype(np.int64)
+    rest = hashes & np.uint64((1 << (64 - HLL_PRECISION)) - 1)
+    # frexp 的指數即 rest 的位元長度（rest < 2**52，以 float64 表示沒有誤差）
+    _, bit_length = np.frexp(rest.astype(np.float64))
+    rank = (64 - HLL_PRECISION - bit_length + 1).astype(np.uint8)
+    registers = np.zeros(size * HLL_REGISTERS, dtype=np.uint8)
+    np.maximum.at(registers, groups * HLL_REGISTERS + index, rank)
+    return registers.reshape(size, HLL_REGISTERS)
+
+
+def _estimate(registers):
+    """各列暫存器的 HyperLogLog 估計值。"""
+    m = HLL_REGISTERS
+    alpha = 0.7213 / (1 + 1.079 / m)
+    raw = alpha * m * m / np.sum(np.ldexp(1.0, -registers.astype(np.int64)), axis=1)
+    zeros = np.count_nonzero(registers == 0, axis=1)
+    with np.errstate(divide="ignore"):
+        linear = m * np.log(m / np.maximum(zeros, 1))
+    return np.where((raw <= 2.5 * m) & (zeros > 0), linear, raw)
+
+
+class GlassSketches:
+    """各分組的 HyperLogLog 暫存器與查詢介面；``keys`` 依 TSTAMP 排序。"""
+
+    def __init__(self, keys, registers):
+        order = np.argsort(keys["TSTAMP"].to_numpy(), kind="stable")
+        self.keys = keys.iloc[order].reset_index(drop=True)
+        self.registers = registers[order]
+
+    @classmethod
+    def from_table(cls, table):
+        """由儲存用的表格（Registers 欄位為各分組暫存器的位元組）還原。"""
+        registers = np.frombuffer(b"".join(table["Registers"]), dtype=np.uint8).reshape(-1, HLL_REGISTERS)
+        return cls(table.drop(columns="Registers"), registers)
+
+    def to_table(self):
+        """轉為儲存用的表格：每個分組一列，暫存器存為位元組。"""
+        return self.keys.assign(Registers=[row.tobytes() for row in self.registers])
+
+    def count(self, by=None, start=None, end=None, where=None):
+        """符合條件的 GLASSID 不重複數（估計值）。
+
+        ``by`` 為 None 時回傳整數，否則回傳 ``by`` 欄位與 GLASSID（片數）的資料框；
+        ``start``、``end`` 為日期範圍（含兩端），``where`` 為 ``{欄位: 值的列表}``。
+        """
+        lower, upper = time_bounds(self.keys, pd.Timestamp(start).normalize() if start is not None else None, end)
+        keys = self.keys.iloc[lower:upper]
+        mask = np.ones(len(keys), dtype=bool)
+        for col, values in (where or {}).items():
+            mask &= keys[col].isin(values).to_numpy()
+        keys, registers = keys[mask], self.registers[lower:upper][mask]
+        if not by:
+            return int(round(_estimate(registers.max(axis=0, initial=0)[None, :])[0]))
+        groups, size = _group_codes(keys, list(by))
+        merged = np.zeros((size, HLL_REGISTERS), dtype=np.uint8)
+        valid = groups >= 0
+        np.maximum.at(merged, groups[valid], registers[valid])
+        result = _group_labels(keys, list(by), groups)
+        result["GLASSID"] = np.round(_estimate(merged)).astype(np.int64)
+        return result
+
+
+def build_glass_sketches(frame):
+    """由資料建立每個日期 × CHAMBERID × 配方類型的 HyperLogLog 暫存器。"""
+    frame = frame[frame["TSTAMP"].notna().to_numpy()]
+    keys = glass_keys(frame)
+    hashes, has_glass = _glass_hashes(frame["GLASSID"])
+    groups, size = _group_codes(keys, ["TSTAMP", *HLL_GROUPS])
+    valid = (groups >= 0) & has_glass
+    labels = _group_labels(keys, ["TSTAMP", *HLL_GROUPS], groups)
+    return GlassSketches(labels, _registers(groups[valid], size, hashes[valid]))
+
+
+@lru_cache(maxsize=4)
+def _read_sketches_cached(file_keys):
+    tables = [pd.read_parquet(path, engine="pyarrow") for path, _, _ in file_keys]
+    return GlassSketches.from_table(_concat(tables))
+
+
+def load_glass_sketches(start=None, end=None, root=None):
+    """讀取匯入時寫出的暫存器，只開啟涵蓋 [start, end] 的年月。
+
+    尚未建立，或有年月分區沒有對應的摘要時回傳 None（與 ``load_cube`` 相同）。
+    """
+    start = pd.Timestamp(start) if start is not None else None
+    end = pd.Timestamp(end) if end is not None else None
+    files = list_cube_files(root, HLL_PREFIX)
+    if not covers_partitions(files, root):
+        return None
+    paths = _prune_partitions(files, start, end)
+    if not paths:
+        # 時間窗內沒有任何年月，回傳沒有分組的摘要
+        return GlassSketches.from_table(pd.read_parquet(files[-1][2], engine="pyarrow").iloc[0:0])
+    return _read_sketches_cached(tuple(_file_key(path) for path in paths))
+
+
+def glass_sketches_for(frame=None, start=None, end=None, root=None):
+    """取得 GLASSID 的 HyperLogLog 摘要。
+
+    未指定 ``frame`` 時使用匯入時寫出的摘要，沒有時由 ``load_merged_data()`` 建立；
+    指定 ``frame`` 時由該資料建立。由資料建立的摘要同一份資料只建立一次。
+    """
+    if frame is None:
+        sketches = load_glass_sketches(start, end, root)
+        if sketches is not None:
+            return sketches
+        frame = load_merged_data()
+    columns = [col for col in ["TSTAMP", "CHAMBERID", "GLASSID", "PRODUCT", "RECIPEID"] if col in frame.columns]
+    return _cache.get(frame, columns, None, lambda: build_glass_sketches(frame))
+
+
+def count_glasses(frame=None, by=None, start=None, end=None, where=None, exact=None, root=None):
+    """GLASSID 不重複數；``by`` 可使用 TSTAMP（日期）、CHAMBERID 與配方類型旗標（見 ``glass_keys``）。
+
+    預設合併匯入時寫出的 HyperLogLog 摘要估計（約 1.6% 標準誤差；指定 ``frame`` 時由該資料建立摘要）；
+    ``exact`` 為 True（或未指定且設定了 ``CVD_EXACT_GLASS_COUNT``），或摘要未涵蓋所有年月時，
+    由原始資料（``frame``，未指定時載入 [start, end] 的資料）精確計算。
+    回傳值與 ``GlassSketches.count`` 相同。
+    """
+    exact = GLASS_COUNT_EXACT if exact is None else exact
+    if not exact:
+        sketches = glass_sketches_for(frame) if frame is not None else load_glass_sketches(start, end, root)
+        if sketches is not None:
+            return sketches.count(by, start, end, where)
+        # 匯入時寫出的摘要未涵蓋所有年月：由資料列建立近似摘要並不比精確計算便宜，改為精確計算
+    if frame is None:
+        frame = load_merged_window(start, end, columns=["TSTAMP", "CHAMBERID", "GLASSID", "PRODUCT", "RECIPEID"], root=root)
+    frame = time_slice(frame, pd.Timestamp(start).normalize() if start is not None else None, end)
+    keys = glass_keys(frame)
+    mask = frame["TSTAMP"].notna().to_numpy()
+    for col, values in (where or {}).items():
+        mask &= keys[col].isin(values).to_numpy()
+    glasses = frame["GLASSID"][mask]
+    if not by:
+        return int(glasses.nunique())
+    return glasses.groupby([keys[col][mask] for col in by], observed=True).nunique().reset_index()
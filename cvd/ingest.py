@@ -0,0 +1,201 @@
+"""CVD 資料的增量匯入。
+
+完整重建（``pages/10_✨_09_app_multipage.py``）每次都會重新合併所有工作簿並改寫整份資料。
+增量模式以各 CHAMBERID 已儲存的最大 TSTAMP（watermark）為界，只保留不早於該小時的資料列
+（TSTAMP 只到小時，watermark 所在的小時可能還有晚到的資料，已儲存過的列再依 ``DEDUP_COLUMNS`` 去除），
+以新檔案追加到對應的年月分區，再更新 watermark 與衍生彙總，
+因此每晚匯入的時間只與新資料量有關，而非整體歷史長度。
+
+用法::
+
+    python -m cvd.ingest data/CVD_20250105.xlsx data/export_20250105.csv
+"""
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from cvd.enrich import enrich
+from cvd.excel import open_workbook
+from cvd.loader import MERGED_DATASET, list_partitions, load_merged_window
+from cvd.schema import apply_schema, parse_tstamp
+from cvd.store import (
+    append_cube,
+    append_partitions,
+    compute_watermarks,
+    merge_watermarks,
+    read_watermarks,
+    write_watermarks,
+)
+from cvd.vendors import (
+    AKT_COLUMNS,
+    JUSUNG_COLUMNS,
+    JUSUNG_SHEET_MARKER,
+    concat_canonical,
+    to_canonical,
+)
+
+# 追加新資料後依序呼叫的衍生彙總更新函數，簽名為 ``update(new_rows, root)``
+AGGREGATE_UPDATERS = (append_cube,)
+
+CSV_CHUNK_SIZE = 200_000
+# watermark 所在小時的資料列以這些欄位判斷是否已儲存
+DEDUP_COLUMNS = ["CHAMBERID", "GLASSID", "TSTAMP", "Sample_Time"]
+
+
+def _parse_sheets(file_path, sheets, engine=None):
+    """在同一個工作簿 handle 上依序解析多個工作表，只讀取該廠牌需要的欄位。
+
+    於子行程中執行；缺少必要欄位的工作表會略過。
+    """
+    parsed = {}
+    with open_workbook(file_path, engine) as excel_file:
+        for sheet in sheets:
+            is_jusung = JUSUNG_SHEET_MARKER in sheet
+            wanted = JUSUNG_COLUMNS if is_jusung else AKT_COLUMNS
+            df = excel_file.parse(sheet, usecols=lambda col: col in wanted)
+            missing = [col for col in wanted if col not in df.columns]
+            if missing:
+                print(f"Missing columns in {'Jusung' if is_jusung else 'AKT'} sheet {sheet}: {missing}")
+                continue
+            parsed[sheet] = df[wanted]
+    return parsed
+
+
+def read_vendor_sheets(file_path, max_workers=None, engine=None):
+    """以行程池平行解析 CVD 工作簿，回傳 ``(akt_data, jusung_data)``。
+
+    工作表以輪替方式分成數批，每個子行程只開啟一次工作簿並解析分到的工作表，
+    避免每個工作表都重新開啟、解壓整份工作簿。``engine`` 見 ``cvd.excel.pick_engine``。
+    """
+    with open_workbook(file_path, engine) as excel_file:
+        sheet_names = excel_file.sheet_names
+    max_workers = max(1, min(max_workers or os.cpu_count() or 1, len(sheet_names)))
+    batches = [sheet_names[i::max_workers] for i in range(max_workers)]
+
+    parsed = {}
+    if max_workers == 1:
+        parsed.update(_parse_sheets(file_path, sheet_names, engine))
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            for result in executor.map(_parse_sheets, [file_path] * len(batches), batches, [engine] * len(batches)):
+                parsed.update(result)
+
+    # 依原工作表順序合併
+    akt_frames = [parsed[s] for s in sheet_names if s in parsed and JUSUNG_SHEET_MARKER not in s]
+    jusung_frames = [parsed[s] for s in sheet_names if s in parsed and JUSUNG_SHEET_MARKER in s]
+    akt_data = pd.concat(akt_frames, ignore_index=True) if akt_frames else pd.DataFrame(columns=AKT_COLUMNS)
+    jusung_data = pd.concat(jusung_frames, ignore_index=True) if jusung_frames else pd.DataFrame(columns=JUSUNG_COLUMNS)
+    return akt_data, jusung_data
+
+
+def merge_vendor_data(akt_data, jusung_data):
+    """將 AKT 與 Jusung 資料各自轉為標準欄位（``cvd.vendors``）後合併。"""
+    return concat_canonical([to_canonical(akt_data, "AKT"), to_canonical(jusung_data, "Jusung")])
+
+
+def read_cvd_workbook(file_path, max_workers=None, engine=None):
+    """讀取 CVD 工作簿，回傳兩家廠牌合併後的標準化資料。"""
+    return merge_vendor_data(*read_vendor_sheets(file_path, max_workers, engine))
+
+
+def _watermarks_of(frame, watermarks):
+    return pd.to_datetime(frame["CHAMBERID"].astype(object).map(watermarks))
+
+
+def filter_new_rows(frame, watermarks):
+    """只保留 TSTAMP 不早於其 CHAMBERID watermark 的資料列；沒有 watermark 的機台全部保留。
+
+    watermark 所在小時的資料列也會保留（可能有晚到的資料），已儲存過的列由 ``drop_stored_rows`` 去除。
+    """
+    tstamp = parse_tstamp(frame["TSTAMP"])
+    marks = _watermarks_of(frame, watermarks)
+    keep = tstamp.notna() & (marks.isna() | (tstamp >= marks))
+    return frame[keep.to_numpy()]
+
+
+def _row_keys(frame):
+    return pd.MultiIndex.from_arrays([
+        frame[col].astype(str) if col in ("CHAMBERID", "GLASSID") else frame[col] for col in DEDUP_COLUMNS
+    ])
+
+
+def drop_stored_rows(frame, watermarks, root=None):
+    """去除 TSTAMP 等於 watermark 小時、且 ``DEDUP_COLUMNS`` 與已儲存資料相同的資料列（``frame`` 需已套用 schema）。"""
+    boundary = (frame["TSTAMP"] == _watermarks_of(frame, watermarks)).to_numpy()
+    if not boundary.any():
+        return frame
+    hours = frame["TSTAMP"][boundary].unique()
+    stored = pd.concat([load_merged_window(hour, hour, columns=DEDUP_COLUMNS, root=root) for hour in hours])
+    duplicated = np.zeros(len(frame), dtype=bool)
+    duplicated[boundary] = _row_keys(frame[boundary]).isin(_row_keys(stored))
+    return frame[~duplicated]
+
+
+def read_export(file_path, watermarks):
+    """分塊讀取 CSV 匯出檔，每塊先依 watermark 過濾，只保留較新的資料列並轉為標準欄位。
+
+    匯出檔可為舊版（AKT 欄位名稱）或新版（已是標準欄位）的 Merged_Data.csv。
+    """
+    frames = []
+    for chunk in pd.read_csv(file_path, encoding="utf-8", chunksize=CSV_CHUNK_SIZE):
+        chunk = filter_new_rows(chunk, watermarks)
+        frames.append(apply_schema(chunk) if "VENDOR" in chunk.columns else to_canonical(chunk, "export"))
+    return concat_canonical(frames)
+
+
+def current_watermarks(root=None):
+    """讀取 watermark；尚無記錄但已有分區資料時，由現有資料計算。"""
+    root = Path(root or MERGED_DATASET)
+    watermarks = read_watermarks(root)
+    if not watermarks and list_partitions(root):
+        watermarks = compute_watermarks(load_merged_window(columns=["CHAMBERID", "TSTAMP"], root=root))
+    return watermarks
+
+
+def incremental_ingest(frame, root=None):
+    """將資料中晚於 watermark（含 watermark 所在小時中尚未儲存）的資料列追加到分區資料集，回傳實際追加的資料列。"""
+    root = Path(root or MERGED_DATASET)
+    watermarks = current_watermarks(root)
+    new_rows = filter_new_rows(frame, watermarks)
+    if new_rows.empty:
+        return new_rows
+    new_rows = drop_stored_rows(enrich(apply_schema(new_rows)), watermarks, root)
+    if new_rows.empty:
+        return new_rows
+    append_partitions(new_rows, root)
+    write_watermarks(merge_watermarks(watermarks, compute_watermarks(new_rows)), root)
+    for update in AGGREGATE_UPDATERS:
+        update(new_rows, root)
+    return new_rows
+
+
+def ingest_files(paths, root=None):
+    """依檔名順序增量匯入工作簿（.xlsx/.xls）或 CSV 匯出檔，回傳追加的總列數。"""
+    root = Path(root or MERGED_DATASET)
+    total = 0
+    for path in sorted(Path(p) for p in paths):
+        if path.suffix.lower() == ".csv":
+            frame = read_export(path, current_watermarks(root))
+        else:
+            frame = read_cvd_workbook(path)
+        appended = incremental_ingest(frame, root)
+        print(f"{path.name}: 追加 {len(appended)} 筆新資料")
+        total += len(appended)
+    return total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="以 TSTAMP watermark 增量匯入 CVD 工作簿或 CSV 匯出檔")
+    parser.add_argument("paths", nargs="+", help="CVD_*.xlsx 工作簿或 CSV 匯出檔")
+    parser.add_argument("--root", default=None, help="分區資料集目錄（預設為 data/Merged_Data）")
+    args = parser.parse_args(argv)
+    total = ingest_files(args.paths, args.root)
+    print(f"共追加 {total} 筆新資料")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""合併資料（Merged_Data）的共用載入器。
+
+各頁面在每次互動時都會重新執行腳本，若在模組層級呼叫 ``pd.read_csv``，
+每次 rerun 都要重新解析整份 CSV。這裡以「路徑 + mtime + 檔案大小」作為快取鍵，
+同一個行程內只解析一次，並回傳唯讀的資料框給各頁面使用。
+若 ETL 已產出 Merged_Data.parquet，預設優先讀取 Parquet；
+只需要某段時間的頁面可用 ``load_merged_window`` / ``load_recent_data`` 只讀取相關的年月分區。
+"""
+import os
+import threading
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from cvd.enrich import enrich
+from cvd.schema import parse_tstamp
+from cvd.timeindex import sort_by_time, time_slice
+
+# 資料目錄（可用環境變數 CVD_DATA_DIR 覆寫）
+DATA_DIR = Path(os.environ.get("CVD_DATA_DIR", Path(__file__).resolve().parent.parent / "data"))
+MERGED_CSV = DATA_DIR / "Merged_Data.csv"
+MERGED_PARQUET = DATA_DIR / "Merged_Data.parquet"
+# 依年月分區的資料集根目錄
+MERGED_DATASET = DATA_DIR / "Merged_Data"
+
+_load_lock = threading.Lock()
+
+
+def _file_key(path):
+    """以絕對路徑、修改時間與檔案大小組成快取鍵。"""
+    path = Path(path).resolve()
+    stat = path.stat()
+    return str(path), stat.st_mtime_ns, stat.st_size
+
+
+def _freeze(frame):
+    """將資料框底層的 numpy 陣列設為唯讀，避免頁面就地修改共用的快取。"""
+    for values in frame._mgr.arrays:
+        # categorical / datetime 等擴充陣列底層也是 numpy 陣列
+        values = getattr(values, "_ndarray", values)
+        if isinstance(values, np.ndarray):
+            values.flags.writeable = False
+    return frame
+
+
+@lru_cache(maxsize=8)
+def _read_cached(path, mtime_ns, size, columns, encoding="utf-8"):
+    # mtime_ns 與 size 只作為快取鍵，檔案更新後自動重新載入
+    columns = list(columns) if columns else None
+    if path.endswith(".parquet"):
+        frame = pd.read_parquet(path, engine="pyarrow", columns=columns)
+    else:
+        frame = pd.read_csv(path, encoding=encoding, usecols=columns)
+    # 舊版資料沒有衍生欄位時在此補算（每個檔案只算一次），並依 TSTAMP 排序供 time_slice 使用
+    return _freeze(sort_by_time(enrich(frame)))
+
+
+def default_merged_path():
+    """有 Parquet 時優先使用 Parquet，否則使用 CSV。"""
+    return MERGED_PARQUET if MERGED_PARQUET.exists() else MERGED_CSV
+
+
+def load_merged_data(path=None, columns=None):
+    """載入合併後的 NF3 資料。
+
+    同一行程內相同檔案（與相同欄位投影）只解析一次；回傳的是淺複製，
+    頁面可自由新增或替換欄位，但對原有欄位的就地寫入（例如 ``df.loc[...] = ...``）會引發錯誤。
+    ``columns`` 指定時只讀取這些欄位。未指定 ``path`` 且已有年月分區資料集時，
+    讀取全部分區（包含增量追加的資料）。
+    """
+    if path is None and list_partitions():
+        return load_merged_window(columns=columns)
+    key = _file_key(path or default_merged_path())
+    with _load_lock:
+        frame = _read_cached(*key, tuple(columns) if columns else None)
+    return frame.copy(deep=False)
+
+
+def load_csv_data(path, encoding="utf-8"):
+    """載入其他 CSV（例如範例資料 Superstore.csv），快取與回傳方式與 ``load_merged_data`` 相同。"""
+    key = _file_key(path)
+    with _load_lock:
+        frame = _read_cached(*key, None, encoding)
+    return frame.copy(deep=False)
+
+
+def list_partitions(root=None):
+    """列出年月分區檔案，回傳依時間排序的 ``[(year, month, path), ...]``。"""
+    root = Path(root or MERGED_DATASET)
+    partitions = []
+    for path in root.glob("year=*/month=*/*.parquet"):
+        year = int(path.parent.parent.name.split("=", 1)[1])
+        month = int(path.parent.name.split("=", 1)[1])
+        partitions.append((year, month, path))
+    return sorted(partitions)
+
+
+def _month_index(timestamp):
+    return timestamp.year * 12 + timestamp.month
+
+
+def _prune_partitions(partitions, start, end):
+    """只保留與 [start, end] 時間窗重疊的年月分區。"""
+    lower = _month_index(start) if start is not None else None
+    upper = _month_index(end) if end is not None else None
+    return [
+        path for year, month, path in partitions
+        if (lower is None or year * 12 + month >= lower) and (upper is None or year * 12 + month <= upper)
+    ]
+
+
+@lru_cache(maxsize=8)
+def _read_partitions_cached(file_keys, columns):
+    # 讀取整個分區後排序；同一組分區內不同的時間窗只需切片，不必重新讀取
+    table = pq.read_table(
+        [path for path, _, _ in file_keys],
+        columns=list(columns) if columns else None,
+        partitioning=None,
+    )
+    return _freeze(sort_by_time(enrich(table.to_pandas())))
+
+
+@lru_cache(maxsize=16)
+def _partition_max_tstamp(path, mtime_ns, size):
+    return pd.read_parquet(path, engine="pyarrow", columns=["TSTAMP"])["TSTAMP"].max()
+
+
+def _drop_unrequested(frame, columns, read_columns):
+    # 只為了時間切片而讀取的 TSTAMP（與由它補算的欄位）不回傳
+    if read_columns is columns:
+        return frame
+    return frame.drop(columns=[col for col in ("TSTAMP", "Date", "YearMonth") if col not in columns], errors="ignore")
+
+
+def load_merged_window(start=None, end=None, columns=None, root=None):
+    """載入 TSTAMP 落在 [start, end] 的資料，只開啟涵蓋時間窗的年月分區。
+
+    尚未建立分區資料集時，退回讀取完整的合併資料再依時間切片。
+    回傳的是已排序資料的連續切片（見 ``cvd.timeindex.time_slice``）。
+    """
+    start = pd.Timestamp(start) if start is not None else None
+    end = pd.Timestamp(end) if end is not None else None
+    # 時間切片需要 TSTAMP，未投影時先一併讀取，切片後再移除
+    read_columns = columns if not columns or "TSTAMP" in columns else [*columns, "TSTAMP"]
+    partitions = list_partitions(root)
+    if not partitions:
+        frame = time_slice(load_merged_data(columns=read_columns), start, end)
+        return _drop_unrequested(frame, columns, read_columns)
+
+    file_keys = tuple(_file_key(path) for path in _prune_partitions(partitions, start, end))
+    if not file_keys:
+        # 時間窗內沒有任何分區，回傳欄位相同的空資料框
+        return pd.read_parquet(partitions[-1][2], engine="pyarrow", columns=columns).iloc[0:0]
+    with _load_lock:
+        frame = _read_partitions_cached(file_keys, tuple(read_columns) if read_columns else None)
+    frame = time_slice(frame, start, end)
+    return _drop_unrequested(frame, columns, read_columns)
+
+
+def recent_window(days=30, root=None):
+    """回傳最新 TSTAMP 往前 ``days`` 天的時間窗 ``(min_date, max_date)``。"""
+    partitions = list_partitions(root)
+    if partitions:
+        # 最新月份可能含多個增量檔案，取其中最大的 TSTAMP
+        latest = partitions[-1][:2]
+        max_date = max(
+            _partition_max_tstamp(*_file_key(path)) for year, month, path in partitions if (year, month) == latest
+        )
+    else:
+        max_date = parse_tstamp(load_merged_data(columns=["TSTAMP"])["TSTAMP"]).max()
+    return max_date - pd.Timedelta(days=days), max_date
+
+
+def load_recent_data(days=30, columns=None, root=None):
+    """載入最新 TSTAMP 往前 ``days`` 天內的資料（對應各頁面的近 30 日檢視）。"""
+    min_date, max_date = recent_window(days, root)
+    return load_merged_window(min_date, max_date, columns=columns, root=root)
@@ -0,0 +1,108 @@
+"""每片玻璃 / 每次 RPSC 用量表格的指標宣告。
+
+各頁面的用量表格都是「加總流量、計算 GLASSID 片數、相除、換算單位」：原本分別做加總與片數的
+groupby 再以 ``pd.merge`` 合併，每個衍生欄位各自 ``.round(2)``。這裡以 ``Metric`` 宣告輸出欄位，
+``aggregate`` 將所有原始欄位的彙總編譯成單一 ``groupby().agg()``，衍生欄位再以整欄運算一次算出，
+最後只四捨五入一次：
+
+- ``total`` / ``distinct``：原始欄位的加總與不重複數（可用任何 groupby 彙總函數建立 ``Metric``）；
+- ``in_units``：sccm 換算為多個單位，欄位名稱為 ``<名稱>_<單位後綴>``（見 ``cvd.units``）；
+- ``ratio``：兩個指標相除；分子換算為多個單位時，各單位分別相除並沿用後綴。
+
+NF3 cube 以 ``NF3Cube.aggregate`` 使用同一組宣告。
+"""
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from cvd.units import UNIT_SUFFIXES, flow_factor
+
+# 頁面表格預設的換算單位
+TABLE_UNITS = ("sccm", "kg/s", "l/s")
+
+
+@dataclass(frozen=True)
+class Metric:
+    """一個輸出指標。
+
+    ``column`` 與 ``agg`` 為原始欄位的彙總；衍生指標則以 ``source``（輸入指標）搭配
+    ``units``（單位換算）或 ``divisor``（分母指標）計算。
+    """
+
+    name: str
+    column: str = None
+    agg: str = None
+    source: str = None
+    units: tuple = ()
+    divisor: str = None
+
+    @property
+    def derived(self):
+        return self.agg is None
+
+
+def total(column="NF3_total_Flow", name=None):
+    """``column`` 的合計。"""
+    return Metric(name or column, column=column, agg="sum")
+
+
+def distinct(column="GLASSID", name=None):
+    """``column`` 的不重複數（預設為片數）。"""
+    return Metric(name or column, column=column, agg="nunique")
+
+
+def in_units(name, source, units=TABLE_UNITS):
+    """將 sccm 的指標 ``source`` 換算為多個單位。"""
+    return Metric(name, source=source, units=tuple(units))
+
+
+def ratio(name, source, divisor):
+    """``source`` / ``divisor``（例如每片玻璃的用量）。"""
+    return Metric(name, source=source, divisor=divisor)
+
+
+def aggregations(metrics):
+    """原始欄位的彙總，回傳 ``groupby().agg()`` 的具名彙總 ``{名稱: (欄位, 函數)}``。"""
+    return {m.name: (m.column, m.agg) for m in metrics if not m.derived}
+
+
+def derive(table, metrics, decimals=None):
+    """由已彙總的表格（以分組欄位為索引）計算衍生指標，依宣告順序排列欄位並四捨五入一次。"""
+    values, suffixes = {}, {}
+    for m in metrics:
+        if not m.derived:
+            values[m.name] = table[m.name]
+            suffixes[m.name] = [""]
+        elif m.units:
+            if len(suffixes[m.source]) != 1:
+                raise ValueError(f"Metric {m.source!r} is already converted to units")
+            factors = np.array([flow_factor(unit) for unit in m.units])
+            values[m.name] = np.asarray(values[m.source], dtype=np.float64).reshape(len(table), 1) * factors
+            suffixes[m.name] = [f"_{UNIT_SUFFIXES[unit]}" for unit in m.units]
+        else:
+            source = np.asarray(values[m.source], dtype=np.float64).reshape(len(table), -1)
+            divisor = np.asarray(values[m.divisor], dtype=np.float64).reshape(len(table), 1)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                values[m.name] = source / divisor
+            suffixes[m.name] = suffixes[m.source]
+    columns = {}
+    for m in metrics:
+        if not m.derived:
+            columns[m.name] = values[m.name]
+        else:
+            for i, suffix in enumerate(suffixes[m.name]):
+                columns[f"{m.name}{suffix}"] = values[m.name][:, i]
+    result = pd.DataFrame(columns, index=table.index)
+    if decimals is not None:
+        result = result.round(decimals)
+    return result.reset_index()
+
+
+def aggregate(frame, by, metrics, decimals=None):
+    """依 ``by`` 計算 ``metrics``：一次 ``groupby().agg()`` 加上整欄的衍生運算，不需合併。
+
+    回傳 ``by`` 欄位與各指標欄位的資料框（與 ``groupby(by, observed=True)`` 相同的分組與排序）。
+    """
+    table = frame.groupby(list(by), observed=True).agg(**aggregations(metrics))
+    return derive(table, metrics, decimals)
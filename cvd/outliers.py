@@ -0,0 +1,137 @@
+"""分組的離群值判斷（IQR、MAD、負值）。
+
+頁面原本對每個維度 / 每張圖各算一次 ``quantile(0.25)``、``quantile(0.75)``。
+這裡對所有分組一次計算：
+
+1. 分組欄位轉成整數代碼（見 ``cvd.rollup``）並組成單一分組鍵；
+2. 以 ``lexsort`` 依（分組, 值）排序一次，各分組的分位數由排序後的位置以線性內插取得
+   （與 ``Series.quantile`` 相同）；
+3. 依各列所屬分組的上下界判斷，回傳與原資料框對齊的布林遮罩。
+
+結果以資料的欄位陣列作為快取鍵，同一份資料只計算一次。
+"""
+import numpy as np
+import pandas as pd
+
+from cvd.cache import ArrayCache
+from cvd.rollup import _codes_of
+
+# 全機台預設的分組：每個 CHAMBERID × RECIPEID × 日期
+FLEET_GROUPS = ["CHAMBERID", "RECIPEID", "Date"]
+# MAD 換算為常態分布標準差的係數
+MAD_SCALE = 1.4826
+# 各方法預設的倍數
+DEFAULT_K = {"iqr": 1.5, "mad": 3.5}
+# 最多保留的計算結果數
+OUTLIER_CACHE_SIZE = 8
+
+_cache = ArrayCache(OUTLIER_CACHE_SIZE)
+
+
+def _group_codes(frame, by):
+    """各列的分組代碼（0..n-1）；任一分組欄位為缺值的列為 -1（與 groupby 的 dropna 相同）。"""
+    if not by:
+        return np.zeros(len(frame), dtype=np.int64), 1
+    key = np.zeros(len(frame), dtype=np.int64)
+    valid = np.ones(len(frame), dtype=bool)
+    for col in by:
+        codes, labels = _codes_of(frame[col])
+        valid &= codes > 0
+        # 每加入一個欄位就重新編號，組合鍵不會溢位
+        key = pd.factorize(key * (len(labels) + 1) + codes)[0].astype(np.int64)
+    groups = np.full(len(frame), -1, dtype=np.int64)
+    groups[valid], uniques = pd.factorize(key[valid])
+    return groups, len(uniques)
+
+
+def _group_labels(frame, by, groups):
+    """各分組代碼對應的分組值（分組代碼依出現順序編號，取每個分組的第一列）。"""
+    grouped = np.flatnonzero(groups >= 0)
+    _, first = np.unique(groups[grouped], return_index=True)
+    return frame[by].iloc[grouped[first]].reset_index(drop=True)
+
+
+def _quantiles(groups, values, size, q):
+    """各分組（忽略缺值）的 ``q`` 分位數，線性內插；沒有值的分組為 NaN。"""
+    valid = (groups >= 0) & ~np.isnan(values)
+    groups, values = groups[valid], values[valid]
+    order = np.lexsort((values, groups))
+    ordered = values[order]
+    counts = np.bincount(groups, minlength=size)
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    present = counts > 0
+    position = (counts[present] - 1) * q
+    lower = np.floor(position).astype(np.int64)
+    upper = np.minimum(lower + 1, counts[present] - 1)
+    fraction = position - lower
+    below, above = ordered[starts[present] + lower], ordered[starts[present] + upper]
+    # 與 numpy 的內插相同：fraction >= 0.5 時由上方的值往回內插
+    diff = above - below
+    interpolated = np.where(fraction >= 0.5, above - diff * (1 - fraction), below + diff * fraction)
+    result = np.full(size, np.nan)
+    result[present] = interpolated
+    return result
+
+
+def _bounds(groups, size, values, method, k):
+    if method == "iqr":
+        q1, q3 = _quantiles(groups, values, size, 0.25), _quantiles(groups, values, size, 0.75)
+        table = {"Q1": q1, "Q3": q3, "IQR": q3 - q1}
+        spread, center_low, center_high = table["IQR"], q1, q3
+    elif method == "mad":
+        median = _quantiles(groups, values, size, 0.5)
+        deviation = np.abs(values - np.where(groups >= 0, median[np.maximum(groups, 0)], np.nan))
+        mad = _quantiles(groups, deviation, size, 0.5)
+        table = {"Median": median, "MAD": mad}
+        spread, center_low, center_high = MAD_SCALE * mad, median, median
+    else:
+        raise ValueError(f"Unknown outlier method: {method!r}")
+    table["Lower"] = center_low - k * spread
+    table["Upper"] = center_high + k * spread
+    return table
+
+
+def _outliers(frame, value, by, method, k, negatives):
+    groups, size = _group_codes(frame, by)
+    values = frame[value].to_numpy(dtype=np.float64)
+    table = _bounds(groups, size, values, method, k)
+    grouped = groups >= 0
+    lower = np.where(grouped, table["Lower"][np.maximum(groups, 0)], np.nan)
+    upper = np.where(grouped, table["Upper"][np.maximum(groups, 0)], np.nan)
+    # 與 NaN 比較為 False：缺值或沒有分組的列不視為離群值
+    with np.errstate(invalid="ignore"):
+        mask = (values < lower) | (values > upper)
+        if negatives:
+            mask |= values < 0
+    mask.flags.writeable = False
+    return mask
+
+
+def outlier_mask(frame, value, by=None, method="iqr", k=None, negatives=False):
+    """回傳 ``frame`` 各列是否為離群值的布林陣列（唯讀，與資料列對齊）。
+
+    ``by`` 為分組欄位（None 表示整份資料一組）；``method`` 為 ``"iqr"``（Q1 - k·IQR、Q3 + k·IQR，
+    預設 k=1.5）或 ``"mad"``（中位數 ± k·1.4826·MAD，預設 k=3.5）；``negatives`` 為 True 時負值也視為離群值。
+    """
+    by = list(by or [])
+    k = DEFAULT_K[method] if k is None and method in DEFAULT_K else k
+    return _cache.get(
+        frame, [*by, value], (method, k, negatives),
+        lambda: _outliers(frame, value, by, method, k, negatives),
+    )
+
+
+def outlier_bounds(frame, value, by=None, method="iqr", k=None):
+    """各分組的上下界表格（Q1、Q3、IQR 或 Median、MAD，以及 Lower、Upper），以分組欄位為索引。"""
+    by = list(by or [])
+    k = DEFAULT_K[method] if k is None and method in DEFAULT_K else k
+    groups, size = _group_codes(frame, by)
+    table = pd.DataFrame(_bounds(groups, size, frame[value].to_numpy(dtype=np.float64), method, k))
+    if by:
+        table.index = pd.MultiIndex.from_frame(_group_labels(frame, by, groups))
+    return table
+
+
+def fleet_outliers(frame, value="NF3_total_Flow", method="iqr", k=None):
+    """全機台每個 CHAMBERID × RECIPEID × 日期分組的離群值遮罩（同一份資料只計算一次）。"""
+    return outlier_mask(frame, value, [col for col in FLEET_GROUPS if col in frame.columns], method, k)
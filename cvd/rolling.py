@@ -0,0 +1,98 @@
+"""每日序列的移動平均、月累積與異常倍數（增量更新）。
+
+儀表板每次互動都對整段每日序列重算 ``rolling(7)``、``rolling(30)``、每月重置的 ``cumsum``
+與 5 日平均的異常倍數。``RollingState`` 保留上一次的結果，新的每日序列進來時
+只從第一個不同的日期開始重算：
+
+- 移動平均只需往前多取 ``window - 1`` 天；
+- 月累積從同月份前面最後一個累積值接續；
+- 異常倍數為當日值 / 對應視窗的移動平均。
+
+狀態依呼叫端給定的鍵（例如篩選條件組合）保存於 ``rolling_state``，資料更新時只處理新增或變動的日期。
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from cvd.loader import _freeze
+
+# 最多保留的狀態數（每個篩選條件組合一個）
+ROLLING_STATE_SIZE = 32
+
+_states = OrderedDict()
+_states_lock = threading.Lock()
+
+
+def _first_change(old, new):
+    """回傳 ``old`` 與 ``new`` 第一個日期或值不同的位置；完全相同時為兩者的共同長度。"""
+    length = min(len(old), len(new))
+    old_values, new_values = old.to_numpy()[:length], new.to_numpy()[:length]
+    same = np.asarray(old.index[:length] == new.index[:length], dtype=bool)
+    same &= (old_values == new_values) | (np.isnan(old_values) & np.isnan(new_values))
+    return length if same.all() else int(np.argmin(same))
+
+
+class RollingState:
+    """單一每日序列的增量計算狀態。
+
+    結果表格以日期為索引，欄位：Value、``MA_<視窗>``（各移動平均，``min_periods=1``）、
+    ``cumulative`` 為 True 時的 Month 與 Cumulative（每月重置），
+    ``ratio_window`` 指定時的 Ratio（Value / 該視窗的移動平均）。
+    """
+
+    def __init__(self, windows=(), cumulative=False, ratio_window=None):
+        self.windows = tuple(sorted(set(windows) | ({ratio_window} if ratio_window else set())))
+        self.cumulative = cumulative
+        self.ratio_window = ratio_window
+        self.table = None
+        self._lock = threading.Lock()
+
+    def _compute(self, daily, start):
+        """計算 ``daily`` 第 ``start`` 天之後的各欄位（沿用 ``self.table`` 前段的結果）。"""
+        values = daily.to_numpy(dtype=np.float64)
+        tail = pd.DataFrame({"Value": values[start:]}, index=daily.index[start:])
+        for window in self.windows:
+            lead = max(0, start - window + 1)
+            means = pd.Series(values[lead:]).rolling(window=window, min_periods=1).mean().to_numpy()
+            tail[f"MA_{window}"] = means[start - lead:]
+        if self.cumulative:
+            tail["Month"] = pd.PeriodIndex(pd.to_datetime(tail.index), freq="M")
+            cumulative = tail.groupby("Month")["Value"].cumsum().to_numpy()
+            if start > 0 and len(tail):
+                # 同月份從前面最後一個累積值接續（缺值的日期沒有累積值）
+                month = tail["Month"].iloc[0]
+                previous = self.table.iloc[max(0, start - 31):start]
+                carried = previous.loc[(previous["Month"] == month).to_numpy(), "Cumulative"].dropna()
+                if len(carried):
+                    cumulative[(tail["Month"] == month).to_numpy()] += carried.iloc[-1]
+            tail["Cumulative"] = cumulative
+        if self.ratio_window:
+            tail["Ratio"] = tail["Value"] / tail[f"MA_{self.ratio_window}"]
+        return tail
+
+    def update(self, daily):
+        """以新的每日序列（依日期遞增排序的 Series）更新狀態，回傳結果表格（唯讀表格的淺複製）。"""
+        with self._lock:
+            start = 0 if self.table is None else _first_change(self.table["Value"], daily)
+            if self.table is None or start < len(daily) or len(self.table) != len(daily):
+                tail = self._compute(daily, start)
+                head = self.table.iloc[:start] if start else None
+                table = pd.concat([head, tail]) if head is not None else tail
+                table.index.name = daily.index.name
+                self.table = _freeze(table)
+            return self.table.copy(deep=False)
+
+
+def rolling_state(key, windows=(), cumulative=False, ratio_window=None):
+    """取得 ``key``（例如篩選條件組合）對應的 ``RollingState``；沒有時建立。"""
+    full_key = (key, tuple(windows), cumulative, ratio_window)
+    with _states_lock:
+        state = _states.get(full_key)
+        if state is None:
+            state = _states[full_key] = RollingState(windows, cumulative, ratio_window)
+        _states.move_to_end(full_key)
+        while len(_states) > ROLLING_STATE_SIZE:
+            _states.popitem(last=False)
+    return state
@@ -0,0 +1,97 @@
+"""多組維度的彙總（類似 SQL 的 GROUPING SETS）。
+
+流量比例頁面對六個維度各做一次 ``groupby([日期, 維度]).sum()`` 與 ``transform``，
+每個維度都要掃描整份資料。這裡只掃描一次：
+
+1. 所有用到的欄位轉成整數代碼（categorical 直接使用 codes），組成單一整數鍵；
+2. 以雜湊將各列歸到最細的組合（cube），並以 ``bincount`` 加總；
+3. 各組維度再由 cube（筆數遠少於資料列）彙總。
+
+結果以資料的欄位陣列作為快取鍵，同一份資料只計算一次。
+"""
+import numpy as np
+import pandas as pd
+
+from cvd.cache import ArrayCache
+from cvd.loader import _freeze
+
+# 最多保留的彙總結果數
+ROLLUP_CACHE_SIZE = 4
+# 組合鍵超過此範圍時改為各組維度分別掃描
+_MAX_KEY = 2 ** 62
+
+_cache = ArrayCache(ROLLUP_CACHE_SIZE)
+
+
+def _codes_of(values):
+    """回傳欄位的整數代碼與對應的值；代碼 0 為缺值，其餘順序與 ``groupby(sort=True)`` 相同。"""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        codes, uniques = values.array.codes, values.cat.categories
+    else:
+        codes, uniques = pd.factorize(values, sort=True)
+    return codes.astype(np.int64) + 1, pd.Index(uniques)
+
+
+def _aggregate(codes, sizes, weights):
+    """依多個代碼欄位加總 ``weights``，回傳出現過的組合（依代碼排序）的各欄位代碼與合計。"""
+    key = np.zeros(len(weights), dtype=np.int64)
+    for column_codes, size in zip(codes, sizes):
+        key = key * size + column_codes
+    groups, uniques = pd.factorize(key, sort=True)
+    totals = np.bincount(groups, weights=weights, minlength=len(uniques))
+    decoded = []
+    for size in reversed(sizes):
+        uniques, remainder = np.divmod(uniques, size)
+        decoded.append(remainder)
+    return decoded[::-1], totals
+
+
+def _grouping_sets(frame, sets, value):
+    columns = list(dict.fromkeys(col for grouping in sets for col in grouping))
+    codes, labels, sizes = {}, {}, {}
+    for col in columns:
+        codes[col], labels[col] = _codes_of(frame[col])
+        sizes[col] = len(labels[col]) + 1
+    # 與 groupby 的 sum 相同，缺值視為 0
+    weights = np.nan_to_num(frame[value].to_numpy(dtype=np.float64), nan=0.0)
+
+    if np.prod([float(size) for size in sizes.values()]) < _MAX_KEY:
+        # 先彙總到所有欄位的最細組合（含缺值），各組維度只需再彙總 cube
+        cube_codes, weights = _aggregate([codes[col] for col in columns], [sizes[col] for col in columns], weights)
+        codes = dict(zip(columns, cube_codes))
+
+    result = {}
+    for grouping in sets:
+        # 維度為缺值的組合不計入該組（與 groupby 的 dropna 相同）
+        valid = np.logical_and.reduce([codes[col] > 0 for col in grouping])
+        decoded, totals = _aggregate(
+            [codes[col][valid] for col in grouping], [sizes[col] for col in grouping], weights[valid]
+        )
+        table = {col: labels[col].take(col_codes - 1) for col, col_codes in zip(grouping, decoded)}
+        table[value] = totals
+        result[grouping] = _freeze(pd.DataFrame(table))
+    return result
+
+
+def grouping_sets(frame, sets, value):
+    """一次計算多組維度的 ``value`` 合計，回傳 ``{維度 tuple: 資料框}``。
+
+    與 ``frame.groupby(list(grouping), observed=True)[value].sum().reset_index()`` 相同：
+    只包含出現過的組合、依各維度排序，維度為缺值的列不計入該組。
+    """
+    sets = [tuple(grouping) for grouping in sets]
+    columns = list(dict.fromkeys([*(col for grouping in sets for col in grouping), value]))
+    result = _cache.get(frame, columns, (tuple(sets), value), lambda: _grouping_sets(frame, sets, value))
+    return {grouping: table.copy(deep=False) for grouping, table in result.items()}
+
+
+def daily_ratios(frame, dimensions, value="NF3_total_Flow", date_column="Date"):
+    """各維度每日的 ``value`` 合計與佔當日合計的比例（Flow_Ratio），回傳 ``{維度: 資料框}``。"""
+    sets = grouping_sets(frame, [(date_column, dim) for dim in dimensions], value)
+    ratios = {}
+    for dim in dimensions:
+        table = sets[(date_column, dim)]
+        daily_total = table.groupby(date_column, observed=True)[value].transform("sum")
+        table["Flow_Ratio"] = table[value] / daily_total
+        ratios[dim] = table
+    return ratios
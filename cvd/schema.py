@@ -0,0 +1,87 @@
+"""合併資料的固定 schema。
+
+TSTAMP 為 datetime、各 ID 欄位為 categorical、感測器與氣體流量為 float32。
+AKT 與 Jusung 的原始欄位由 ``cvd.vendors`` 對應到 ``CANONICAL_COLUMNS``。
+"""
+import numpy as np
+import pandas as pd
+
+# 類別型欄位；step_name 等類別數少於 128 的欄位，其 codes 以 int8 儲存
+CATEGORY_COLUMNS = [
+    "VENDOR", "CHAMBERID", "GLASSID", "TOOLID", "RECIPEID", "OPERATION", "PRODUCT", "step_name", "SIN",
+    "CHAMBER_CODE"
+]
+# 以 float32 儲存的感測器欄位（名稱沿用相關性分析頁面的參數名稱）
+SENSOR_COLUMNS = [
+    "Sample_Time", "pressure", "load_pwr", "rfl_pwr", "mon_vpp", "vdc",
+    "N2_Flow", "NH3_Flow", "SiH4_Flow", "H2_Flow", "PH3_Flow", "Ar_Flow", "NF3_Flow", "N2O_Flow",
+    "ΔTime", "N2_total_Flow", "NH3_total_Flow", "SIH4_total_Flow", "H2_total_Flow", "PH3_total_Flow",
+    "Ar_total_Flow", "NF3_total_Flow", "N2O_total_Flow", "pressure_std_90s"
+]
+# 兩家廠牌共用的欄位與順序
+CANONICAL_COLUMNS = [
+    "VENDOR", "CHAMBERID", "GLASSID", "TSTAMP", "TOOLID", "RECIPEID", "OPERATION", "PRODUCT", "step_name",
+    "CHAMBER_CODE", *SENSOR_COLUMNS, "SIN"
+]
+# 其他以 float32 儲存的流量欄位（依欄位名稱結尾判斷）
+FLOW_COLUMN_SUFFIXES = ("_Flow", "_sccm")
+
+
+def _tstamp_from_numbers(values):
+    """以整數運算將 YYYYMMDDHH 數值陣列轉為 datetime64[ns]，不合法的日期時間為 NaT。"""
+    values = np.asarray(values, dtype=np.float64)
+    finite = np.isfinite(values) & (values >= 0)
+    stamps = np.where(finite, np.floor(values), 0).astype(np.int64)
+    # 超過 10 位數時只取前 10 位（與舊版逐列取字串前 10 碼相同）
+    if (stamps >= 10**10).any():
+        extra = np.where(stamps >= 10**10, np.floor(np.log10(np.maximum(stamps, 1))).astype(np.int64) - 9, 0)
+        stamps = stamps // 10 ** np.minimum(extra, 9)
+
+    year, rest = np.divmod(stamps, 1_000_000)
+    month, rest = np.divmod(rest, 10_000)
+    day, hour = np.divmod(rest, 100)
+    valid = finite & (year >= 1678) & (year <= 2261) & (month >= 1) & (month <= 12) & (hour <= 23)
+
+    # 以月為單位建立月初，再加上日與小時；各月天數由下個月月初相減而得
+    months = np.where(valid, (year - 1970) * 12 + month - 1, 0).astype("datetime64[M]")
+    month_start = months.astype("datetime64[D]")
+    days_in_month = ((months + 1).astype("datetime64[D]") - month_start).astype(np.int64)
+    valid &= (day >= 1) & (day <= days_in_month)
+
+    result = (month_start + (day - 1).astype("timedelta64[D]")).astype("datetime64[ns]")
+    result += hour.astype("timedelta64[h]")
+    result[~valid] = np.datetime64("NaT")
+    return result
+
+
+def parse_tstamp(values):
+    """將 YYYYMMDDHH 格式（整數、浮點數或字串）的 TSTAMP 轉為 datetime，無法解析者為 NaT。
+
+    以整數運算一次轉換整個欄位，不逐列建立字串。
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    values = pd.Series(values)
+    if not pd.api.types.is_numeric_dtype(values) or pd.api.types.is_bool_dtype(values):
+        # 字串先取前 10 碼再轉為數值，非數字者為 NaN
+        values = pd.to_numeric(values.astype(str).str[:10], errors="coerce")
+    return pd.Series(_tstamp_from_numbers(values.to_numpy(dtype=np.float64, na_value=np.nan)),
+                     index=values.index, name=values.name)
+
+
+def apply_schema(frame):
+    """回傳套用固定 schema 後的新資料框，不修改傳入的資料框。"""
+    frame = frame.copy()
+    if "TSTAMP" in frame.columns:
+        frame["TSTAMP"] = parse_tstamp(frame["TSTAMP"])
+    for col in CATEGORY_COLUMNS:
+        if col in frame.columns:
+            values = frame[col]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                continue
+            # 混合型別（例如整數與字串的 OPERATION）統一轉為字串，缺值保留
+            frame[col] = values.where(values.isna(), values.astype(str)).astype("category")
+    for col in frame.columns:
+        if col in SENSOR_COLUMNS or col.endswith(FLOW_COLUMN_SUFFIXES):
+            frame[col] = pd.to_numeric(frame[col], errors="coerce").astype(np.float32)
+    return frame
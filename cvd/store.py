@@ -0,0 +1,154 @@
+"""合併資料的欄式儲存（Parquet）。
+
+ETL 寫出 Merged_Data.csv 之後，儀表板每次載入都得從文字重新推斷型別。
+這裡以固定 schema（見 ``cvd.schema``）另存 Parquet，並一併寫入衍生欄位（見 ``cvd.enrich``），
+讀取時可只投影需要的欄位：
+
+- ``Merged_Data.parquet``：單一檔案，供需要完整歷史的頁面使用。
+- ``Merged_Data/year=YYYY/month=MM/*.parquet``：依年月分區，
+  只看近期資料的頁面只需開啟涵蓋時間窗的分區；增量匯入會在分區內追加新檔案。
+- ``Merged_Data/_watermarks.json``：各 CHAMBERID 已儲存的最大 TSTAMP。
+- ``Merged_Data/_cube/year=YYYY/month=MM/*.parquet``：各年月的 NF3 用量 cube（見 ``cvd.cube``）、
+  相關係數的充分統計量（見 ``cvd.corrstats``）與 GLASSID 不重複數的 HyperLogLog 摘要（見 ``cvd.hll``）。
+"""
+import json
+import os
+from pathlib import Path
+
+import pandas as pd
+
+from cvd.corrstats import STATS_PREFIX, build_corr_stats
+from cvd.cube import CUBE_DIR, FLOW_PREFIX, GLASS_PREFIX, build_cube
+from cvd.enrich import enrich
+from cvd.hll import HLL_PREFIX, build_glass_sketches
+from cvd.loader import MERGED_DATASET, MERGED_PARQUET
+from cvd.schema import apply_schema
+
+PARTITION_FILE = "part-0.parquet"
+WATERMARK_FILE = "_watermarks.json"
+
+
+def write_merged_parquet(frame, path=None):
+    """將合併資料套用 schema、補上衍生欄位後寫成 Parquet，回傳輸出路徑。"""
+    path = Path(path or MERGED_PARQUET)
+    enrich(apply_schema(frame)).to_parquet(path, engine="pyarrow", index=False)
+    return path
+
+
+def partition_dir(root, year, month):
+    """回傳指定年月分區的目錄。"""
+    return Path(root) / f"year={year:04d}" / f"month={month:02d}"
+
+
+def partition_path(root, year, month):
+    """回傳指定年月分區的主檔案路徑。"""
+    return partition_dir(root, year, month) / PARTITION_FILE
+
+
+def cube_partition_dir(root, year, month):
+    """回傳指定年月 cube 的目錄。"""
+    return Path(root) / CUBE_DIR / f"year={year:04d}" / f"month={month:02d}"
+
+
+def _write_atomic(frame, path):
+    # 先寫暫存檔再置換，避免儀表板讀到寫到一半的分區
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    frame.to_parquet(tmp_path, engine="pyarrow", index=False)
+    os.replace(tmp_path, path)
+
+
+def _group_by_month(frame):
+    return frame.groupby([frame["TSTAMP"].dt.year, frame["TSTAMP"].dt.month])
+
+
+def write_merged_partitions(frame, root=None):
+    """將合併資料依 TSTAMP 的年月分區寫出，回傳寫入的分區檔案列表。
+
+    只會覆寫資料中出現的年月分區（包含先前增量追加的檔案），其他分區保持不變，
+    並依寫入的資料更新各 CHAMBERID 的 watermark。
+    """
+    root = Path(root or MERGED_DATASET)
+    frame = enrich(apply_schema(frame)).dropna(subset=["TSTAMP"])
+    written = []
+    for (year, month), part in _group_by_month(frame):
+        path = partition_path(root, year, month)
+        for stale in partition_dir(root, year, month).glob("*.parquet"):
+            if stale != path:
+                stale.unlink()
+        _write_atomic(part.sort_values("TSTAMP"), path)
+        written.append(path)
+        for stale in cube_partition_dir(root, year, month).glob("*.parquet"):
+            stale.unlink()
+        _write_cube(part, root, year, month, "0")
+    write_watermarks(merge_watermarks(read_watermarks(root), compute_watermarks(frame)), root)
+    return written
+
+
+def _write_cube(part, root, year, month, batch_id):
+    flow, glasses = build_cube(part)
+    directory = cube_partition_dir(root, year, month)
+    _write_atomic(flow, directory / f"{FLOW_PREFIX}-{batch_id}.parquet")
+    _write_atomic(glasses, directory / f"{GLASS_PREFIX}-{batch_id}.parquet")
+    _write_atomic(build_corr_stats(part).to_table(), directory / f"{STATS_PREFIX}-{batch_id}.parquet")
+    _write_atomic(build_glass_sketches(part).to_table(), directory / f"{HLL_PREFIX}-{batch_id}.parquet")
+
+
+def append_cube(frame, root=None, batch_id=None):
+    """將新資料的 NF3 cube 以新檔案追加到對應的年月，不改寫既有檔案（增量匯入的衍生彙總）。
+
+    查詢時直接合併各檔案：合計可以相加，片數以 GLASSID 去重，相關係數的統計量可以相加，HyperLogLog 暫存器取最大值合併，不受檔案切分影響。
+    """
+    root = Path(root or MERGED_DATASET)
+    batch_id = batch_id or pd.Timestamp.now().strftime("%Y%m%d%H%M%S%f")
+    for (year, month), part in _group_by_month(frame):
+        _write_cube(part, root, year, month, batch_id)
+
+
+def append_partitions(frame, root=None, batch_id=None):
+    """將新資料以新檔案追加到對應的年月分區，不改寫既有檔案。
+
+    ``frame`` 需已套用 schema 並補上衍生欄位；回傳寫入的檔案列表。
+    """
+    root = Path(root or MERGED_DATASET)
+    batch_id = batch_id or pd.Timestamp.now().strftime("%Y%m%d%H%M%S%f")
+    written = []
+    for (year, month), part in _group_by_month(frame):
+        path = partition_dir(root, year, month) / f"part-{batch_id}.parquet"
+        _write_atomic(part.sort_values("TSTAMP"), path)
+        written.append(path)
+    return written
+
+
+def compute_watermarks(frame):
+    """計算各 CHAMBERID 的最大 TSTAMP。"""
+    latest = frame.dropna(subset=["CHAMBERID", "TSTAMP"]).groupby("CHAMBERID", observed=True)["TSTAMP"].max()
+    return {str(chamber): ts for chamber, ts in latest.items()}
+
+
+def merge_watermarks(current, new):
+    """合併兩組 watermark，各 CHAMBERID 取較晚者。"""
+    merged = dict(current)
+    for chamber, ts in new.items():
+        if chamber not in merged or ts > merged[chamber]:
+            merged[chamber] = ts
+    return merged
+
+
+def read_watermarks(root=None):
+    """讀取各 CHAMBERID 已儲存的最大 TSTAMP，尚無記錄時回傳空字典。"""
+    path = Path(root or MERGED_DATASET) / WATERMARK_FILE
+    if not path.exists():
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return {chamber: pd.Timestamp(ts) for chamber, ts in json.load(f).items()}
+
+
+def write_watermarks(watermarks, root=None):
+    """寫入各 CHAMBERID 的 watermark。"""
+    path = Path(root or MERGED_DATASET) / WATERMARK_FILE
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({chamber: ts.isoformat() for chamber, ts in sorted(watermarks.items())}, f, indent=2)
+    os.replace(tmp_path, path)
@@ -0,0 +1,90 @@
+"""依時間排序的資料框與時間區間切片。
+
+頁面以 ``(df["TSTAMP"] >= start) & (df["TSTAMP"] <= end)`` 篩選時間窗時，每次 rerun
+都要對整欄建立布林遮罩並複製選到的列。載入器回傳的資料框已依 TSTAMP 排序，
+``time_slice`` 以 ``searchsorted`` 找到區間的起訖位置（O(log n)），回傳不複製資料的連續切片。
+
+是否已排序的檢查只對唯讀（載入器快取）的陣列記錄結果，同一份資料只檢查一次；
+其他資料框每次重新檢查（O(n)），未排序時退回布林遮罩。
+"""
+import threading
+import weakref
+
+import numpy as np
+import pandas as pd
+
+from cvd.cache import array_owner
+
+TIME_COLUMN = "TSTAMP"
+
+# (底層陣列 id, 起始位址, 長度, 步長) → (weakref, 是否已排序)
+_sorted_cache = {}
+_sorted_lock = threading.Lock()
+
+
+def sort_by_time(frame, column=TIME_COLUMN):
+    """依 ``column`` 穩定排序（缺值在最後）並重設索引；已排序或沒有該欄位時原樣回傳。"""
+    if column not in frame.columns or _is_sorted(frame[column]):
+        return frame
+    return frame.sort_values(column, kind="stable", na_position="last", ignore_index=True)
+
+
+def _check_sorted(times):
+    # NaT 在 numpy 中排在最後，與 sort_values(na_position="last") 一致
+    valid = ~np.isnat(times)
+    count = int(valid.sum())
+    if not valid[:count].all():
+        return False
+    return bool(np.all(times[1:count] >= times[:count - 1]))
+
+
+def _is_sorted(values):
+    times = np.asarray(values)
+    if times.dtype.kind != "M":
+        return False
+    owner = array_owner(times)
+    if owner.flags.writeable:
+        return _check_sorted(times)
+    key = (id(owner), times.__array_interface__["data"][0], len(times), times.strides)
+    with _sorted_lock:
+        entry = _sorted_cache.get(key)
+        if entry is not None and entry[0]() is owner:
+            return entry[1]
+    result = _check_sorted(times)
+    with _sorted_lock:
+        # 清掉已被回收的陣列
+        for stale in [k for k, (ref, _) in _sorted_cache.items() if ref() is None]:
+            del _sorted_cache[stale]
+        _sorted_cache[key] = (weakref.ref(owner), result)
+    return result
+
+
+def time_bounds(frame, start=None, end=None, column=TIME_COLUMN):
+    """回傳 ``column`` 落在 [start, end] 的列位置 ``(lower, upper)``；資料框須已依時間排序。
+
+    排在最後的 NaT 不在任何區間內（與布林遮罩相同），未指定 ``end`` 時也不包含。
+    """
+    times = frame[column].to_numpy()
+    lower = 0 if start is None else int(np.searchsorted(times, np.datetime64(pd.Timestamp(start), "ns"), side="left"))
+    # numpy 將 NaT 排在最大值之後，searchsorted 回傳第一個 NaT 的位置
+    end = np.datetime64("NaT") if end is None else np.datetime64(pd.Timestamp(end), "ns")
+    upper = int(np.searchsorted(times, end, side="left" if np.isnat(end) else "right"))
+    return lower, max(lower, upper)
+
+
+def time_slice(frame, start=None, end=None, column=TIME_COLUMN):
+    """取出 ``column`` 落在 [start, end] 的資料列（``None`` 表示不限）。
+
+    已排序時回傳連續切片（與原資料框共用底層陣列）；否則以布林遮罩篩選。
+    """
+    if _is_sorted(frame[column]):
+        lower, upper = time_bounds(frame, start, end, column)
+        # 淺複製避免切片被標記為 view，頁面新增欄位時不會出現 SettingWithCopyWarning
+        return frame.iloc[lower:upper].copy(deep=False)
+    times = frame[column]
+    mask = times.notna()
+    if start is not None:
+        mask &= times >= pd.Timestamp(start)
+    if end is not None:
+        mask &= times <= pd.Timestamp(end)
+    return frame[mask]
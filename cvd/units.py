@@ -0,0 +1,61 @@
+"""NF3 流量單位換算。
+
+原始資料的流量單位為 sccm（標準狀態下每分鐘立方公分）。各頁面過去各自定義換算常數，
+且彼此不一致（例如 kg/s 少除 1000、kg/day 把「每分鐘 → 每日」寫成除以 1440）。
+所有換算係數都在這裡由同一組物理常數推導，並以整欄（或整個資料框）相乘的方式換算。
+"""
+import numpy as np
+import pandas as pd
+
+# 物理常數
+NF3_DENSITY_KG_PER_M3 = 3.04  # NF3 在標準狀態下的密度
+NF3_GWP = 17200  # NF3 的全球暖化潛勢（kg CO2e / kg）
+CM3_PER_M3 = 1_000_000
+CM3_PER_LITER = 1000
+SECONDS_PER_MINUTE = 60
+MINUTES_PER_DAY = 24 * 60
+
+_KG_PER_SCCM_MINUTE = NF3_DENSITY_KG_PER_M3 / CM3_PER_M3
+
+# 每 1 sccm 換算成各單位的係數
+FLOW_UNITS = {
+    "sccm": 1.0,
+    "l/s": 1 / CM3_PER_LITER / SECONDS_PER_MINUTE,
+    "kg/s": _KG_PER_SCCM_MINUTE / SECONDS_PER_MINUTE,
+    "kg/day": _KG_PER_SCCM_MINUTE * MINUTES_PER_DAY,
+    "kg CO2e/day": _KG_PER_SCCM_MINUTE * MINUTES_PER_DAY * NF3_GWP,
+}
+# 換算結果的欄位名稱後綴（例如 Daily_Flow_kg）
+UNIT_SUFFIXES = {
+    "sccm": "sccm",
+    "l/s": "l",
+    "kg/s": "kg",
+    "kg/day": "kg_day",
+    "kg CO2e/day": "CO2e",
+}
+
+
+def flow_factor(unit):
+    """回傳 1 sccm 換算為 ``unit`` 的係數。"""
+    try:
+        return FLOW_UNITS[unit]
+    except KeyError:
+        raise ValueError(f"Unknown flow unit '{unit}'; expected one of {list(FLOW_UNITS)}") from None
+
+
+def convert_flow(values, unit):
+    """將 sccm 的陣列、Series 或資料框換算為 ``unit``。"""
+    return values * flow_factor(unit)
+
+
+def convert_flows(values, units=tuple(FLOW_UNITS)):
+    """一次將 sccm 的 Series 或資料框換算為多個單位。
+
+    以一次廣播相乘算出所有欄位 × 單位，回傳的資料框欄位名稱為 ``<原欄位>_<單位後綴>``，
+    例如 ``convert_flows(df["Daily_Flow"], ["kg/s", "l/s"])`` 的欄位為 ``Daily_Flow_kg``、``Daily_Flow_l``。
+    """
+    frame = values.to_frame() if isinstance(values, pd.Series) else values
+    factors = np.array([flow_factor(unit) for unit in units])
+    converted = frame.to_numpy(dtype=np.float64)[:, :, None] * factors
+    columns = [f"{col}_{UNIT_SUFFIXES[unit]}" for col in frame.columns for unit in units]
+    return pd.DataFrame(converted.reshape(len(frame), -1), index=frame.index, columns=columns)
@@ -0,0 +1,61 @@
+"""上傳檔案的解析快取。
+
+Streamlit 每次互動都會重新執行頁面腳本，``st.file_uploader`` 回傳的檔案若每次都重新
+``pd.read_csv``，上傳 200 MB 的匯出檔後每拉一次滑桿就要再解析一次。
+這裡以檔案內容的雜湊作為快取鍵，同一份內容只解析一次，並以 LRU 淘汰舊的項目；
+回傳值與 ``load_merged_data`` 相同，是唯讀資料框的淺複製。
+"""
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import pandas as pd
+
+from cvd.enrich import enrich
+from cvd.excel import read_excel
+from cvd.loader import _freeze
+from cvd.timeindex import sort_by_time
+
+# 最多保留的已解析上傳檔案數
+UPLOAD_CACHE_SIZE = 4
+EXCEL_SUFFIXES = (".xlsx", ".xls", ".xlsb")
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def content_key(data):
+    """以檔案內容計算快取鍵。"""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _parse_upload(uploaded_file, data, encoding):
+    if Path(uploaded_file.name).suffix.lower() in EXCEL_SUFFIXES:
+        uploaded_file.seek(0)
+        return read_excel(uploaded_file)
+    return pd.read_csv(io.BytesIO(data), encoding=encoding)
+
+
+def load_uploaded_data(uploaded_file, encoding="utf-8"):
+    """解析上傳的 CSV / Excel 檔（直接讀取記憶體中的內容），相同內容只解析一次。"""
+    data = uploaded_file.getvalue()
+    key = (content_key(data), Path(uploaded_file.name).suffix.lower(), encoding)
+    with _cache_lock:
+        frame = _cache.get(key)
+        if frame is not None:
+            _cache.move_to_end(key)
+    if frame is None:
+        frame = _freeze(sort_by_time(enrich(_parse_upload(uploaded_file, data, encoding))))
+        with _cache_lock:
+            _cache[key] = frame
+            _cache.move_to_end(key)
+            while len(_cache) > UPLOAD_CACHE_SIZE:
+                _cache.popitem(last=False)
+    return frame.copy(deep=False)
+
+
+def clear_upload_cache():
+    with _cache_lock:
+        _cache.clear()
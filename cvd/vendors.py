@@ -0,0 +1,130 @@
+"""AKT 與 Jusung 機台資料的廠牌轉接層。
+
+兩家廠牌的原始欄位名稱與內容不同（例如 AKT 的 ``NF3_Flow`` 對應 Jusung 的
+``NF3_FlowAct_sccm``），過去以欄位名稱取交集合併，Jusung 的感測器資料幾乎全部遺失。
+各廠牌在此宣告原始欄位與對應規則，``to_canonical`` 將其轉為 ``CANONICAL_COLUMNS``
+的固定欄位與型別，兩家廠牌的資料因此可放在同一個精簡的資料框中。
+"""
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from cvd.schema import CANONICAL_COLUMNS, apply_schema
+
+# 定義 AKT 和 Jusung 的欄位
+AKT_COLUMNS = [
+    "CHAMBERID", "GLASSID", "TSTAMP", "TOOLID", "RECIPEID", "OPERATION", "PRODUCT", "step_name",
+    "CHAMBER_CODE", "Sample_Time", "pressure", "load_pwr_mon", "rflt_pwr_mon", "vpp", "vdc",
+    "N2_Flow", "NH3_Flow", "SIH4_Flow", "H2_Flow", "PH3_Flow", "Ar_Flow", "NF3_Flow", "N2O_Flow",
+    "ΔTime", "N2_total_Flow", "NH3_total_Flow", "SIH4_total_Flow", "H2_total_Flow", "PH3_total_Flow",
+    "Ar_total_Flow", "NF3_total_Flow", "N2O_total_Flow", "pressure_std_90s", "SIN"
+]
+
+JUSUNG_COLUMNS = [
+    "CHAMBERID", "GLASSID", "TSTAMP", "TOOLID", "RECIPEID", "OPERATION", "PRODUCT", "step_name", "EVENTID", "TRACEID",
+    "CHAMBER_CODE", "Sample_Time", "CVG01_Drv_ReadPressre_torr", "PrssCtrl_Drv_ReadPressure_torr",
+    "PrssCtrl_Drv_SetPoint", "PrssCtrl_Drv_ReadPosition_P", "Chuck_ActProcPosn_mil",
+    "RFMatcher_Drv_ActTunePosn_P", "RFMatcher_Drv_ActLoadPosn_P", "RFGen_Drv_PowerSet_watt",
+    "RFGen_Drv_ActForwardPwr_watt", "RFGen_Drv_ActBackwardPwr_watt", "RFMatcher_Drv_ActVdc_V",
+    "RFMatcher_Drv_ActVpp_V", "RFMatcher_Drv_ActIpp_A", "N2_1_FlowAct_sccm", "NF3_FlowAct_sccm",
+    "Ar_FlowAct_sccm", "SiH4_FlowAct_sccm", "PH3_H2_FlowAct_sccm", "H2_FlowAct_sccm",
+    "NH3_FlowAct_sccm", "N2_2_FlowAct_sccm", "ChuckHtr_Cntl_IN1_ActTemp_C",
+    "ChuckHtr_Cntl_IN2_ActTemp_C", "RPSC_BackwardPwr_watt", "ΔTime", "N2_1_total_sccm",
+    "NF3_total_Flow", "Ar_total_Flow", "SIH4_total_Flow", "PH3_total_Flow", "H2_total_Flow",
+    "NH3_total_Flow", "N2_2_total_sccm", "N2_total_Flow", "pressure", "SIN"
+]
+
+# Jusung 工作表名稱包含此字串，其餘為 AKT
+JUSUNG_SHEET_MARKER = "2ACXDD00"
+
+
+@dataclass(frozen=True)
+class VendorAdapter:
+    """單一廠牌的欄位對應規則。
+
+    ``rename`` 為原始欄位 → 標準欄位；``sums`` 為由多個原始欄位相加而得的標準欄位；
+    其餘與標準欄位同名的原始欄位直接沿用，找不到來源的標準欄位補缺值。
+    """
+
+    vendor: object
+    columns: list
+    rename: dict = field(default_factory=dict)
+    sums: dict = field(default_factory=dict)
+
+    def source_of(self, column):
+        for source, target in self.rename.items():
+            if target == column:
+                return source
+        return column
+
+    def to_canonical(self, frame):
+        data = {}
+        for col in CANONICAL_COLUMNS:
+            if col == "VENDOR":
+                data[col] = pd.Series(self.vendor, index=frame.index, dtype=object)
+            elif col in self.sums:
+                sources = [frame[s] for s in self.sums[col] if s in frame.columns]
+                data[col] = (
+                    pd.concat(sources, axis=1).apply(pd.to_numeric, errors="coerce").sum(axis=1, min_count=1)
+                    if sources else pd.Series(np.nan, index=frame.index, dtype=np.float32)
+                )
+            elif self.source_of(col) in frame.columns:
+                data[col] = frame[self.source_of(col)]
+            else:
+                data[col] = pd.Series(np.nan, index=frame.index, dtype=np.float32)
+        return apply_schema(pd.DataFrame(data, index=frame.index))
+
+
+AKT = VendorAdapter(
+    vendor="AKT",
+    columns=AKT_COLUMNS,
+    rename={
+        "load_pwr_mon": "load_pwr",
+        "rflt_pwr_mon": "rfl_pwr",
+        "vpp": "mon_vpp",
+        "SIH4_Flow": "SiH4_Flow",
+    },
+)
+
+JUSUNG = VendorAdapter(
+    vendor="Jusung",
+    columns=JUSUNG_COLUMNS,
+    rename={
+        "RFGen_Drv_ActForwardPwr_watt": "load_pwr",
+        "RFGen_Drv_ActBackwardPwr_watt": "rfl_pwr",
+        "RFMatcher_Drv_ActVpp_V": "mon_vpp",
+        "RFMatcher_Drv_ActVdc_V": "vdc",
+        "NF3_FlowAct_sccm": "NF3_Flow",
+        "NH3_FlowAct_sccm": "NH3_Flow",
+        "SiH4_FlowAct_sccm": "SiH4_Flow",
+        "H2_FlowAct_sccm": "H2_Flow",
+        "PH3_H2_FlowAct_sccm": "PH3_Flow",
+        "Ar_FlowAct_sccm": "Ar_Flow",
+    },
+    # Jusung 有兩路 N2
+    sums={"N2_Flow": ("N2_1_FlowAct_sccm", "N2_2_FlowAct_sccm")},
+)
+
+# 舊版 Merged_Data.csv（AKT 欄位名稱，未記錄廠牌）的匯出檔
+MERGED_EXPORT = VendorAdapter(vendor=None, columns=AKT_COLUMNS, rename=AKT.rename)
+
+VENDOR_ADAPTERS = {"AKT": AKT, "Jusung": JUSUNG, "export": MERGED_EXPORT}
+
+
+def to_canonical(frame, vendor):
+    """將單一廠牌的原始資料轉為標準欄位與型別。``vendor`` 為 ``VENDOR_ADAPTERS`` 的鍵。"""
+    return VENDOR_ADAPTERS[vendor].to_canonical(frame)
+
+
+def concat_canonical(frames):
+    """合併多個標準化資料框；類別欄位以聯集類別合併，避免退回 object 型別。"""
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return apply_schema(pd.DataFrame(columns=CANONICAL_COLUMNS))
+    merged = pd.concat(frames, ignore_index=True)
+    for col in CANONICAL_COLUMNS:
+        if all(isinstance(f[col].dtype, pd.CategoricalDtype) for f in frames):
+            merged[col] = union_categoricals([f[col] for f in frames])
+    return merged
@@ -5,6 +5,13 @@ import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
 from matplotlib import font_manager
 import matplotlib as mpl
+from cvd.cube import CUBE_DIMENSIONS, cube_for
+from cvd.filters import filter_index
+from cvd.hll import count_glasses
+from cvd.loader import load_merged_data
+from cvd.outliers import outlier_mask
+from cvd.rolling import rolling_state
+from cvd.units import convert_flow, convert_flows, flow_factor
 #pip freeze > requirements.txt
 # activate finlab
 # cd "C:\Users\USER\Desktop\finlab_course2019\streamlit\09_app_multipage"
@@ -43,27 +50,16 @@ def setup_chinese_font():
 setup_chinese_font()
 
 # 載入資料
-data = pd.read_csv(r"D:\curso\streamlit\09_app_multipage\data\Merged_Data.csv")
-# 新增 LAYER 欄位
-data['LAYER'] = data['RECIPEID'].str.extract('(BP|PFA|AS)')
+data = load_merged_data()
+# LAYER 與各 ID 前四碼已於匯入時計算（cvd.enrich）
 # 將 TSTAMP 轉換為日期時間格式以便處理
 data['TSTAMP'] = pd.to_datetime(data['TSTAMP'], format='%Y%m%d%H')
 
-# 定義單位轉換常數
-SCCM_TO_KG = 3.04 / (1000 * 60)  # 轉換為 kg/s，NF3 密度 3.04 kg/m³
-SCCM_TO_LITER = 1 / 60000  # 轉換為 l/s
-SCCM_TO_SCCM = 1  # 單位保持不變
 
 
-
-# 定義使用 IQR 檢測離群值的函數
+# 定義使用 IQR 檢測離群值的函數（見 cvd.outliers）
 def detect_outliers(df, col):
-    Q1 = df[col].quantile(0.25)
-    Q3 = df[col].quantile(0.75)
-    IQR = Q3 - Q1
-    lower_bound = Q1 - 1.5 * IQR
-    upper_bound = Q3 + 1.5 * IQR
-    return df[(df[col] < lower_bound) | (df[col] > upper_bound)]
+    return df[outlier_mask(df, col)]
 
 # 計算 RPSC_GLASSID 數量
 def calculate_rpsc_glassid(data):
@@ -79,16 +75,9 @@ def main():
     st.sidebar.header("選擇累積流量的單位")
     flow_unit = st.sidebar.radio("單位:", ("kg/s", "l/s", "sccm"))
 
-    # 確定單位轉換係數與標籤
-    if flow_unit == "kg/s":
-        unit_conversion = SCCM_TO_KG
-        unit_label = "(kg/s)"
-    elif flow_unit == "l/s":
-        unit_conversion = SCCM_TO_LITER
-        unit_label = "(l/s)"
-    else:
-        unit_conversion = SCCM_TO_SCCM
-        unit_label = "(sccm)"
+    # 確定單位轉換係數與標籤（換算常數統一定義於 cvd.units）
+    unit_conversion = flow_factor(flow_unit)
+    unit_label = f"({flow_unit})"
 
     # 新增時間選項
     st.sidebar.header("選擇時間維度")
@@ -98,7 +87,7 @@ def main():
     st.sidebar.markdown("### 單位轉換說明")
     st.sidebar.markdown(
         """
-        - **SCCM to KG/S**: \( \text{[NF3_total_Flow]} \times 3.04 / (1000 \times 60) \)
+        - **SCCM to KG/S**: \( \text{[NF3_total_Flow]} \times 3.04 / (10^6 \times 60) \)
         - **SCCM to L/S**: \( \text{[NF3_total_Flow]} / 60000 \)
         - **SCCM to SCCM**: 單位保持不變
         """
@@ -122,49 +111,49 @@ def main():
     layer_filter = st.sidebar.multiselect("選擇 LAYER:", add_all_option(data['LAYER'].dropna().unique().tolist()), default=["全選"])
     step_name_filter = st.sidebar.multiselect("選擇 STEP_NAME:", add_all_option(data['step_name'].dropna().unique().tolist()), default=['CLN1', 'CLN2', 'CLN3'], key="step_name")
 
-    # 篩選數據
-    filtered_data = data.copy()
-    if "全選" not in chamberid_filter:
-        filtered_data = filtered_data[filtered_data['CHAMBERID'].isin(chamberid_filter)]
-    if "全選" not in toolid_filter:
-        filtered_data = filtered_data[filtered_data['TOOLID'].isin(toolid_filter)]
-    if "全選" not in recipeid_filter:
-        filtered_data = filtered_data[filtered_data['RECIPEID'].isin(recipeid_filter)]
-    if "全選" not in operation_filter:
-        filtered_data = filtered_data[filtered_data['OPERATION'].isin(operation_filter)]
-    if "全選" not in product_filter:
-        filtered_data = filtered_data[filtered_data['PRODUCT'].isin(product_filter)]
-    if "全選" not in chamber_code_filter:
-        filtered_data = filtered_data[filtered_data['CHAMBER_CODE'].isin(chamber_code_filter)]
-    if "全選" not in sin_filter:
-        filtered_data = filtered_data[filtered_data['SIN'].isin(sin_filter)]
-    if "全選" not in layer_filter:
-        filtered_data = filtered_data[filtered_data['LAYER'].isin(layer_filter)]
-    if "全選" not in step_name_filter:
-        filtered_data = filtered_data[filtered_data['step_name'].isin(step_name_filter)]
-
-    # 計算每日流量並檢測異常值
-    daily_flow = filtered_data.groupby(filtered_data['TSTAMP'].dt.date)['NF3_total_Flow'].sum().reset_index()
+    # 篩選數據（索引只在資料更新時建立一次，各條件以 bitmap 合併後一次取出）
+    selections = {
+        'CHAMBERID': chamberid_filter,
+        'TOOLID': toolid_filter,
+        'RECIPEID': recipeid_filter,
+        'OPERATION': operation_filter,
+        'PRODUCT': product_filter,
+        'CHAMBER_CODE': chamber_code_filter,
+        'SIN': sin_filter,
+        'LAYER': layer_filter,
+        'step_name': step_name_filter,
+    }
+    active = {col: values for col, values in selections.items() if "全選" not in values}
+    index = filter_index(data, list(selections))
+    filtered_data = index.apply(data, active)
+
+    # 計算每日流量並檢測異常值：篩選條件都是 cube 的維度時由小時粒度 cube 彙總（cvd.cube），
+    # PRODUCT、CHAMBER_CODE 不在 cube 中，選取時改由篩選後的資料計算
+    if set(active) <= set(CUBE_DIMENSIONS):
+        daily_flow = cube_for().query(['Date'], where=active)[['Date', 'NF3_total_Flow']]
+        daily_flow['Date'] = daily_flow['Date'].astype(object)
+    else:
+        daily_flow = filtered_data.groupby(filtered_data['TSTAMP'].dt.date)['NF3_total_Flow'].sum().reset_index()
     daily_flow.columns = ['Date', 'Daily_Flow']
+    # 保留 sccm 的每日合計，其他單位（表格、圖表、成本與排放）一律由 sccm 換算，Daily_Flow 為選擇的顯示單位
+    daily_flow['NF3_total_Flow'] = daily_flow['Daily_Flow']
     daily_flow['Daily_Flow'] *= unit_conversion
 
-    # 計算 7 天和 30 天移動平均線
-    daily_flow['7-Day MA'] = daily_flow['Daily_Flow'].rolling(window=7, min_periods=1).mean()
-    daily_flow['30-Day MA'] = daily_flow['Daily_Flow'].rolling(window=30, min_periods=1).mean()
+    # 計算 7 天和 30 天移動平均線（依篩選條件保存狀態，資料更新時只重算新增或變動的日期，見 cvd.rolling）
+    filter_key = (flow_unit, tuple((col, tuple(values)) for col, values in selections.items()))
+    moving_average = rolling_state(('daily_flow', filter_key), windows=(7, 30)).update(daily_flow.set_index('Date')['Daily_Flow'])
+    daily_flow['7-Day MA'] = moving_average['MA_7'].to_numpy()
+    daily_flow['30-Day MA'] = moving_average['MA_30'].to_numpy()
 
     # 過濾掉異常值的每日流量
-    Q1 = daily_flow['Daily_Flow'].quantile(0.25)
-    Q3 = daily_flow['Daily_Flow'].quantile(0.75)
-    IQR = Q3 - Q1
-    lower_bound = Q1 - 1.5 * IQR
-    upper_bound = Q3 + 1.5 * IQR
-    filtered_daily_flow = daily_flow[(daily_flow['Daily_Flow'] >= lower_bound) & (daily_flow['Daily_Flow'] <= upper_bound)]
+    filtered_daily_flow = daily_flow[~outlier_mask(daily_flow, 'Daily_Flow')]
 
     # 繪製每日用量與移動平均線圖表
     fig, ax1 = plt.subplots(figsize=(12, 8))
     # 使用過濾後的每日流量計算累積流量，每月1號重置
-    filtered_daily_flow['Month'] = pd.to_datetime(filtered_daily_flow['Date']).dt.to_period('M')
-    filtered_daily_flow['Cumulative_Flow'] = filtered_daily_flow.groupby('Month')['Daily_Flow'].cumsum()
+    cumulative = rolling_state(('filtered_daily_flow', filter_key), cumulative=True).update(filtered_daily_flow.set_index('Date')['Daily_Flow'])
+    filtered_daily_flow['Month'] = cumulative['Month'].array
+    filtered_daily_flow['Cumulative_Flow'] = cumulative['Cumulative'].to_numpy()
 
     # 計算 RPSC_GLASSID 數量
     rpsc_glassid_count = calculate_rpsc_glassid(filtered_data)
@@ -199,10 +188,9 @@ def main():
 
     # 提取最近 30 天數據
     recent_30_days = filtered_daily_flow.tail(30).copy()
-    recent_30_days['Daily_Flow_kg'] = (recent_30_days['Daily_Flow'] * SCCM_TO_KG).round(2)
-    recent_30_days['Daily_Flow_l'] = (recent_30_days['Daily_Flow'] * SCCM_TO_LITER).round(2)
-    recent_30_days['Daily_Flow_sccm'] = (recent_30_days['Daily_Flow'] * SCCM_TO_SCCM).round(2)
-    recent_30_days['Cumulative_Flow_converted'] = (recent_30_days['Cumulative_Flow'] * unit_conversion).round(2)
+    recent_30_days = recent_30_days.join(convert_flows(recent_30_days['NF3_total_Flow'].rename('Daily_Flow'), ("kg/s", "l/s", "sccm")).round(2))
+    # 累積流量由 Daily_Flow 累加，已是選擇的單位
+    recent_30_days['Cumulative_Flow_converted'] = recent_30_days['Cumulative_Flow'].round(2)
 
     # 調整表格顯示格式，日期水平排列，最新日期在左
     recent_30_days = recent_30_days[['Date', 'Daily_Flow_kg', 'Daily_Flow_l', 'Daily_Flow_sccm','Cumulative_Flow_converted']]
@@ -229,18 +217,19 @@ def main():
     st.header("每日與累積流量圖表")
     fig, ax1 = plt.subplots(figsize=(12, 8))
 
-    # 顯示數據
-    daily_flow_kg = (filtered_daily_flow['Daily_Flow'] * SCCM_TO_KG).round(2)
+    # 顯示數據（一次換算所有要繪製的欄位）
+    flow_kg = convert_flows(filtered_daily_flow[['Daily_Flow', 'Cumulative_Flow', '7-Day MA', '30-Day MA']] / unit_conversion, ("kg/s",)).round(2)
+    daily_flow_kg = flow_kg['Daily_Flow_kg']
     ax1.plot(filtered_daily_flow['Date'], daily_flow_kg, label=f"每日用量 (kg/s)", color='blue', marker='o')
     ax2 = ax1.twinx()
-    cumulative_flow_kg = (filtered_daily_flow['Cumulative_Flow'] * SCCM_TO_KG).round(2)
+    cumulative_flow_kg = flow_kg['Cumulative_Flow_kg']
     ax2.bar(filtered_daily_flow['Date'], cumulative_flow_kg, label=f"累積流量 (kg/s)", color='red', alpha=0.5)
 
     # 繪製每日用量的趨勢線
-    ax1.plot(filtered_daily_flow['Date'], (filtered_daily_flow['Daily_Flow'] * SCCM_TO_KG).round(2), label=f"每日用量 {unit_label}", color='tab:blue', marker='o')
-    ax1.plot(filtered_daily_flow['Date'], (filtered_daily_flow['7-Day MA'] * SCCM_TO_KG).round(2), label='7 天移動平均', color='orange', linestyle='--')
-    ax1.plot(filtered_daily_flow['Date'], (filtered_daily_flow['30-Day MA'] * SCCM_TO_KG).round(2), label='30 天移動平均', color='green', linestyle='--')
-    for i, v in enumerate((filtered_daily_flow['Daily_Flow'] * SCCM_TO_KG).round(2)):
+    ax1.plot(filtered_daily_flow['Date'], daily_flow_kg, label=f"每日用量 {unit_label}", color='tab:blue', marker='o')
+    ax1.plot(filtered_daily_flow['Date'], flow_kg['7-Day MA_kg'], label='7 天移動平均', color='orange', linestyle='--')
+    ax1.plot(filtered_daily_flow['Date'], flow_kg['30-Day MA_kg'], label='30 天移動平均', color='green', linestyle='--')
+    for i, v in enumerate(daily_flow_kg):
         ax1.text(filtered_daily_flow['Date'].iloc[i], v, f'{v:.2f}', color='tab:blue', ha='center')
     ax1.set_xlabel("日期")
     ax1.set_ylabel(f"每日用量 {unit_label}", color='tab:blue')
@@ -253,8 +242,8 @@ def main():
 
     # 使用直條圖表示累積流量
     ax2 = ax1.twinx()
-    ax2.bar(filtered_daily_flow['Date'], (filtered_daily_flow['Cumulative_Flow'] * SCCM_TO_KG).round(2), label=f"累積流量 {unit_label}", color='tab:red', alpha=0.6)
-    for i, v in enumerate((filtered_daily_flow['Cumulative_Flow'] * SCCM_TO_KG).round(2)):
+    ax2.bar(filtered_daily_flow['Date'], cumulative_flow_kg, label=f"累積流量 {unit_label}", color='tab:red', alpha=0.6)
+    for i, v in enumerate(cumulative_flow_kg):
         ax2.text(filtered_daily_flow['Date'].iloc[i], v, f'{v:.2f}', color='tab:red', ha='center')
     ax2.set_ylabel(f"累積流量 {unit_label}", color='tab:red')
     ax2.tick_params(axis='y', labelcolor='tab:red')
@@ -282,8 +271,9 @@ def main():
     # 顯示使用者輸入的值
     st.write(f"每公斤 NF3 的價格為: ${NF3_price_per_kg:.2f}")
 
-    filtered_daily_flow['Daily_Cost'] = filtered_daily_flow['Daily_Flow'] * NF3_price_per_kg
-    filtered_daily_flow['GHG_Emissions'] = filtered_daily_flow['Daily_Flow'] * 17200  # NF3 GWP 為 17200
+    # 先由 sccm 換算為 kg 再計價；排放量以 NF3 GWP（17200）換算為 kg CO2e
+    filtered_daily_flow['Daily_Cost'] = convert_flow(filtered_daily_flow['NF3_total_Flow'], "kg/day") * NF3_price_per_kg
+    filtered_daily_flow['GHG_Emissions'] = convert_flow(filtered_daily_flow['NF3_total_Flow'], "kg CO2e/day")
 
  # 成本與排放摘要
     st.markdown("### 成本與排放分析")
@@ -293,16 +283,15 @@ def main():
     
  # GLASSID 與 PRODUCT 的分析
     st.header("GLASSID 與 PRODUCT 分析")
-    data['GLASSID_prefix'] = data['GLASSID'].astype(str).str[:4]
-    data['PRODUCT_prefix'] = data['PRODUCT'].astype(str).str[:4]
     
     # 計算 GLASSID 與 PRODUCT 的匹配數量
     filtered_data = data[data['GLASSID_prefix'] == data['PRODUCT_prefix']]
-    glassid_count = filtered_data['GLASSID'].nunique()
+    # 片數由匯入時寫出的 HyperLogLog 摘要估計
+    glassid_count = count_glasses(where={'Product_Match': [True]})
     st.write(f"GLASSID 與 PRODUCT 前四碼匹配的玻璃片數量: {glassid_count}")
     
     # 單片玻璃平均 NF3 消耗
-    average_nf3_per_glass = filtered_data.groupby(['GLASSID', 'TSTAMP'])['NF3_total_Flow'].mean().reset_index()
+    average_nf3_per_glass = filtered_data.groupby(['GLASSID', 'TSTAMP'], observed=True)['NF3_total_Flow'].mean().reset_index()
     average_nf3_per_glass.columns = ['GLASSID', 'Date', 'Average_NF3_Consumption']
     st.subheader("單片玻璃平均 NF3 消耗量（橫向統計）")
     pivot_glass_table = average_nf3_per_glass.pivot(index='GLASSID', columns='Date', values='Average_NF3_Consumption')
@@ -316,13 +305,12 @@ def main():
     
     # GLASSID 與 RPSC 的分析
     st.header("GLASSID 與 RPSC 分析")
-    data['RECIPEID_prefix'] = data['RECIPEID'].astype(str).str[:4]
     filtered_rpsc_data = data[data['GLASSID_prefix'] == data['RECIPEID_prefix']]
-    rpsc_glassid_count = filtered_rpsc_data['GLASSID'].nunique()
+    rpsc_glassid_count = count_glasses(where={'Recipe_Match': [True]})
     st.write(f"GLASSID 與 RECIPEID 前四碼匹配的玻璃片數量 (RPSC Count): {rpsc_glassid_count}")
     
     # 單次 RPSC 平均 NF3 消耗
-    average_nf3_per_rpsc = filtered_rpsc_data.groupby(['GLASSID', 'TSTAMP', 'CHAMBERID'])['NF3_total_Flow'].mean().reset_index()
+    average_nf3_per_rpsc = filtered_rpsc_data.groupby(['GLASSID', 'TSTAMP', 'CHAMBERID'], observed=True)['NF3_total_Flow'].mean().reset_index()
     average_nf3_per_rpsc.columns = ['GLASSID', 'Date', 'CHAMBERID', 'Average_NF3_Consumption']
     
     st.subheader("單次 RPSC 平均 NF3 消耗量（按日期與 CHAMBERID）")
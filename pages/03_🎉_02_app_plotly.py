@@ -5,6 +5,10 @@ import matplotlib.pyplot as plt
 from matplotlib import rcParams
 import matplotlib.dates as mdates
 from matplotlib import font_manager
+from cvd.loader import load_merged_data
+from cvd.outliers import outlier_mask
+from cvd.rollup import daily_ratios
+from cvd.units import flow_factor
 
 # Page configuration
 st.set_page_config(
@@ -28,36 +32,30 @@ except Exception:
 rcParams['axes.unicode_minus'] = False
 
 # 載入資料
-data = pd.read_csv(r"D:\curso\streamlit\09_app_multipage\data\Merged_Data.csv")
+data = load_merged_data()
 data['TSTAMP'] = pd.to_datetime(data['TSTAMP'], format='%Y%m%d%H')
-# 新增 LAYER 欄位
-data['LAYER'] = data['RECIPEID'].str.extract('(BP|PFA|AS)')
-# 定義單位轉換常數
-SCCM_TO_KG = 3.04 / (1000 * 60)
-SCCM_TO_LITER = 1 / 60000
-SCCM_TO_SCCM = 1
-
-# 異常值檢測函數
-def detect_outliers_and_negatives(data, column):
-    if column not in data.columns:
-        raise ValueError(f"Column '{column}' not found in the dataset.")
-    Q1 = data[column].quantile(0.25)
-    Q3 = data[column].quantile(0.75)
-    IQR = Q3 - Q1
-    lower_bound = Q1 - 1.5 * IQR
-    upper_bound = Q3 + 1.5 * IQR
-    outliers = data[(data[column] < lower_bound) | (data[column] > upper_bound) | (data[column] < 0)]
+# LAYER 欄位已於匯入時計算（cvd.enrich）
+
+# 異常值檢測函數（各維度的資料合併後依維度分組，一次計算 IQR 上下界，見 cvd.outliers）
+def detect_outliers_and_negatives(flow_ratios, column):
+    for data in flow_ratios.values():
+        if column not in data.columns:
+            raise ValueError(f"Column '{column}' not found in the dataset.")
+    stacked = pd.concat([data[[column]].assign(Dimension=dim) for dim, data in flow_ratios.items()], ignore_index=True)
+    mask = outlier_mask(stacked, column, by=['Dimension'], negatives=True)
+    outliers, offset = {}, 0
+    for dim, data in flow_ratios.items():
+        outliers[dim] = data[mask[offset:offset + len(data)]]
+        offset += len(data)
     return outliers
 
-# 每日流量比例計算
-def calculate_daily_flow_ratio(data, filter_col):
+# 每日流量比例計算（所有維度一次掃描彙總並快取，見 cvd.rollup）
+def calculate_daily_flow_ratios(data, filter_cols):
     if 'NF3_total_Flow' not in data.columns:
         raise ValueError("Column 'NF3_total_Flow' not found in the dataset.")
-    data['TSTAMP'] = pd.to_datetime(data['TSTAMP'])  # 確保 TSTAMP 是日期時間格式
-    grouped = data.groupby([data['TSTAMP'].dt.date, filter_col])['NF3_total_Flow'].sum().reset_index()
-    total_flow = grouped.groupby('TSTAMP')['NF3_total_Flow'].transform('sum')
-    grouped['Flow_Ratio'] = grouped['NF3_total_Flow'] / total_flow
-    return grouped
+    ratios = daily_ratios(data, filter_cols)
+    # 日期欄位沿用 TSTAMP 的名稱（值為日期）
+    return {col: ratio.rename(columns={'Date': 'TSTAMP'}) for col, ratio in ratios.items()}
 
 # 可視化比例
 def visualize_flow_ratio(flow_ratio_data, filter_col):
@@ -102,13 +100,15 @@ def main():
     flow_unit = st.sidebar.radio("單位:", ("kg/s", "l/s", "sccm"))
     filter_options = ["CHAMBERID", "TOOLID", "RECIPEID", "OPERATION", "SIN", "LAYER"]
 
-    unit_conversion = SCCM_TO_KG if flow_unit == "kg/s" else SCCM_TO_LITER if flow_unit == "l/s" else SCCM_TO_SCCM
+    unit_conversion = flow_factor(flow_unit)
+    flow_ratios = calculate_daily_flow_ratios(data, filter_options)
+    outliers_by_filter = detect_outliers_and_negatives(flow_ratios, 'NF3_total_Flow')
 
     for selected_filter in filter_options:
         st.subheader(f"{selected_filter} 的分析")
-        flow_ratio_data = calculate_daily_flow_ratio(data, selected_filter)
+        flow_ratio_data = flow_ratios[selected_filter]
 
-        outliers = detect_outliers_and_negatives(flow_ratio_data, 'NF3_total_Flow')
+        outliers = outliers_by_filter[selected_filter]
         if not outliers.empty:
             st.subheader(f"{selected_filter} 中的異常值")
             st.dataframe(outliers)
@@ -4,6 +4,8 @@ import pandas as pd
 import matplotlib.pyplot as plt
 from matplotlib import rcParams
 from matplotlib import font_manager
+from cvd.hll import count_glasses
+from cvd.loader import load_merged_window, recent_window
 
 # Page configuration
 st.set_page_config(
@@ -26,21 +28,18 @@ except Exception:
         rcParams['font.sans-serif'] = ['Serif']
 rcParams['axes.unicode_minus'] = False
 
-# 載入資料
-data = pd.read_csv(r"D:\curso\streamlit\09_app_multipage\data\Merged_Data.csv")
-data['TSTAMP'] = pd.to_datetime(data['TSTAMP'], format='%Y%m%d%H')
-
-# 計算最近 30 天的資料範圍
-max_date = data['TSTAMP'].max()
-min_date = max_date - pd.Timedelta(days=30)
-recent_data = data[(data['TSTAMP'] >= min_date) & (data['TSTAMP'] <= max_date)]
+# 載入最近 30 天的資料（只開啟涵蓋時間窗的年月分區）
+# 片數由匯入時寫出、以日期為單位的 HyperLogLog 摘要合併，時間窗起點取整天，表格與片數涵蓋相同的資料列
+min_date, max_date = recent_window(days=30)
+min_date = min_date.normalize()
+recent_data = load_merged_window(min_date, max_date)
 
 # 計算近 30 日各 CHAMBERID 的生產片數
 def calculate_chamberid_stats(recent_data):
     st.header("近 30 日各 CHAMBERID 的生產片數")
 
-    # 計算每個 CHAMBERID 的 GLASSID 數量
-    chamberid_glassid_count = recent_data.groupby('CHAMBERID')['GLASSID'].nunique().reset_index()
+    # 計算每個 CHAMBERID 的 GLASSID 數量（合併匯入時寫出的 HyperLogLog 摘要估計）
+    chamberid_glassid_count = count_glasses(by=['CHAMBERID'], start=min_date, end=max_date)
     chamberid_glassid_count.columns = ['CHAMBERID', 'Unique_GLASSID_Count']
 
     # 顯示表格
@@ -49,24 +48,22 @@ def calculate_chamberid_stats(recent_data):
 # GLASSID 與 PRODUCT 的分析
 def analyze_glassid_and_product(recent_data):
     st.header("GLASSID 與 PRODUCT 分析")
-    recent_data['GLASSID_prefix'] = recent_data['GLASSID'].astype(str).str[:4]
-    recent_data['PRODUCT_prefix'] = recent_data['PRODUCT'].astype(str).str[:4]
 
-    # 過濾匹配 GLASSID 與 PRODUCT 的資料
+    # 過濾匹配 GLASSID 與 PRODUCT 的資料（前四碼欄位已於匯入時計算）
     filtered_data = recent_data[recent_data['GLASSID_prefix'] == recent_data['PRODUCT_prefix']]
 
-    glassid_count = filtered_data['GLASSID'].nunique()
+    glassid_count = count_glasses(start=min_date, end=max_date, where={'Product_Match': [True]})
     st.write(f"GLASSID 與 PRODUCT 前四碼匹配的玻璃片數量: {glassid_count}")
 
     # 表格顯示
     filtered_data['TSTAMP'] = filtered_data['TSTAMP'].dt.date
-    pivot_data = filtered_data.pivot_table(index='CHAMBERID', columns='TSTAMP', values='GLASSID', aggfunc='count').fillna(0)
+    pivot_data = filtered_data.pivot_table(index='CHAMBERID', columns='TSTAMP', values='GLASSID', aggfunc='count', observed=True).fillna(0)
     pivot_data = pivot_data[sorted(pivot_data.columns, reverse=True)]
     st.dataframe(pivot_data.style.format("{:.0f}"))
 
     # 新增每日產品 RecipeID 的表格
     product_recipe_data = filtered_data[(filtered_data['PRODUCT_prefix'] != 'Auto_leak_SEA') & (~filtered_data['RECIPEID'].str.startswith('RPSC'))]
-    product_recipe_data = product_recipe_data.pivot_table(index='CHAMBERID', columns='TSTAMP', values='RECIPEID', aggfunc=lambda x: ', '.join(set(x))).fillna('')
+    product_recipe_data = product_recipe_data.pivot_table(index='CHAMBERID', columns='TSTAMP', values='RECIPEID', aggfunc=lambda x: ', '.join(set(x)), observed=True).fillna('')
     product_recipe_data = product_recipe_data[sorted(product_recipe_data.columns, reverse=True)]
     st.subheader("每日產品 RecipeID")
     st.dataframe(product_recipe_data)
@@ -74,23 +71,22 @@ def analyze_glassid_and_product(recent_data):
 # GLASSID 與 RPSC 的分析
 def analyze_glassid_and_rpsc(recent_data):
     st.header("GLASSID 與 RPSC 分析")
-    recent_data['RECIPEID_prefix'] = recent_data['RECIPEID'].astype(str).str[:4]
 
     # 過濾匹配 GLASSID 與 RPSC 的資料
     filtered_rpsc_data = recent_data[recent_data['GLASSID_prefix'] == recent_data['RECIPEID_prefix']]
 
-    rpsc_glassid_count = filtered_rpsc_data['GLASSID'].nunique()
+    rpsc_glassid_count = count_glasses(start=min_date, end=max_date, where={'Recipe_Match': [True]})
     st.write(f"GLASSID 與 RECIPEID 前四碼匹配的玻璃片數量 (RPSC Count): {rpsc_glassid_count}")
 
     # 表格顯示日期由左往右越久
     filtered_rpsc_data['TSTAMP'] = filtered_rpsc_data['TSTAMP'].dt.date
-    pivot_data = filtered_rpsc_data.pivot_table(index='CHAMBERID', columns='TSTAMP', values='GLASSID', aggfunc='count').fillna(0)
+    pivot_data = filtered_rpsc_data.pivot_table(index='CHAMBERID', columns='TSTAMP', values='GLASSID', aggfunc='count', observed=True).fillna(0)
     pivot_data = pivot_data[sorted(pivot_data.columns, reverse=True)]
     st.dataframe(pivot_data.style.format("{:.0f}"))
 
     # 新增每日 RPSC RecipeID 的表格
     rpsc_name_data = filtered_rpsc_data[filtered_rpsc_data['RECIPEID'] != 'Auto_leak_SEA']
-    rpsc_name_data = rpsc_name_data.pivot_table(index='CHAMBERID', columns='TSTAMP', values='RECIPEID', aggfunc=lambda x: ', '.join(set(x))).fillna('')
+    rpsc_name_data = rpsc_name_data.pivot_table(index='CHAMBERID', columns='TSTAMP', values='RECIPEID', aggfunc=lambda x: ', '.join(set(x)), observed=True).fillna('')
     rpsc_name_data = rpsc_name_data[sorted(rpsc_name_data.columns, reverse=True)]
     st.subheader("每日 RPSC RecipeID")
     st.dataframe(rpsc_name_data)
@@ -6,8 +6,15 @@ import altair as alt
 import plotly.express as px
 import plotly.graph_objects as go
 import streamlit as st
-import os
 import warnings
+from cvd.dates import daily_kpis, date_index
+from cvd.corrstats import corr_stats_for
+from cvd.cube import cube_for
+from cvd.loader import load_merged_data
+from cvd.rolling import rolling_state
+from cvd.schema import parse_tstamp
+from cvd.units import convert_flow
+from cvd.uploads import load_uploaded_data
 
 #######################
 # Page configuration
@@ -73,56 +80,30 @@ fl = st.file_uploader(":file_folder: Upload a file",type=(["csv","txt","xlsx","x
 if fl is not None:
     filename = fl.name
     st.write(filename)
-    df = pd.read_csv(filename, encoding = "utf-8")
+    df = load_uploaded_data(fl, encoding = "utf-8")
 else:
-    os.chdir(r"D:\curso\streamlit\09_app_multipage\data")
-    df = pd.read_csv("Merged_Data.csv", encoding = "utf-8")
-
-# 自定義時間轉換函數
-def convert_timestamp(ts):
-    try:
-        ts = str(ts)
-        if len(ts) >= 10:
-            year = ts[:4]
-            month = ts[4:6]
-            day = ts[6:8]
-            hour = ts[8:10] if len(ts) >= 10 else "00"
-            return f"{year}/{month}/{day} {hour}:00"
-        return None
-    except:
-        return None
-
-# 數據預處理
-df['TSTAMP'] = df['TSTAMP'].apply(convert_timestamp)
-df['TSTAMP'] = pd.to_datetime(df['TSTAMP'], format='%Y/%m/%d %H:%M', errors='coerce')
-df['Date'] = df['TSTAMP'].dt.date
-df['LAYER'] = df['RECIPEID'].str.extract('(BP|PFA|AS)')
-
-# 定義單位轉換常數和函數
-def sccm_to_kg_per_day(flow_sccm):
-    """
-    將 SCCM 轉換為 kg/day
-    SCCM = Standard Cubic Centimeters per Minute
-    1. SCCM → m³/min: × (1/1000000)
-    2. m³/min → m³/day: ÷ 1440 (24小時 * 60分鐘)
-    3. m³ → kg: × 3.04 (NF3 密度在標準狀態下約為 3.04 kg/m³)
-    """
-    m3_per_min = flow_sccm * (1/1000000)  # SCCM → m³/min
-    m3_per_day = m3_per_min / 1440        # m³/min → m³/day
-    kg_per_day = m3_per_day * 3.04        # m³ → kg
-    return kg_per_day
-
-# 轉換流量單位
-df['Daily_Flow_kg'] = df['NF3_total_Flow'].apply(lambda x: sccm_to_kg_per_day(x)).round(2)
+    df = load_merged_data()
+
+# 轉換 TSTAMP 格式（YYYYMMDDHH；Parquet 來源已是 datetime）
+df['TSTAMP'] = parse_tstamp(df['TSTAMP'])
+# Date、LAYER 等衍生欄位已於匯入時計算（cvd.enrich）
+
+# 轉換流量單位（sccm → kg/day，換算常數見 cvd.units）
+df['Daily_Flow_kg'] = convert_flow(df['NF3_total_Flow'], "kg/day").round(2)
+
+# 月度彙總由 NF3 用量 cube 查詢（上傳的檔案由該資料建立，同一份資料只建立一次）
+cube = cube_for(df) if fl is not None else cube_for()
 
 #######################
 # Sidebar
 with st.sidebar:
     st.title('🏂 NF3 氣體流量分析儀表板')
     
-    date_list = sorted(df['Date'].unique(), reverse=True)
+    # 日期 → 列範圍查詢表（同一份資料只建立一次），切換日期只需切片
+    dates = date_index(df)
+    date_list = dates.dates[::-1]
     selected_date = st.selectbox('選擇日期', date_list)
-    df_selected_date = df[df['Date'] == selected_date]
+    df_selected_date = dates.take(df, selected_date)
 
     color_theme_list = ['blues', 'cividis', 'greens', 'inferno', 'magma', 'plasma', 'reds', 'rainbow', 'turbo', 'viridis']
     selected_color_theme = st.selectbox('選擇顏色主題', color_theme_list)
@@ -132,30 +113,17 @@ with st.sidebar:
 
 # 計算流量變化
 def calculate_flow_changes(df, selected_date):
-    # 日變化
-    daily_flow = df.groupby('Date')['Daily_Flow_kg'].sum().reset_index()
-    daily_flow['Previous_Day'] = daily_flow['Daily_Flow_kg'].shift(1)
-    daily_flow['Day_Change'] = ((daily_flow['Daily_Flow_kg'] - daily_flow['Previous_Day']) / daily_flow['Previous_Day'] * 100).round(2)
-    
-    # 月變化
-    daily_flow['Month'] = pd.to_datetime(daily_flow['Date']).dt.to_period('M')
-    monthly_flow = daily_flow.groupby('Month')['Daily_Flow_kg'].sum().reset_index()
-    monthly_flow['Previous_Month'] = monthly_flow['Daily_Flow_kg'].shift(1)
-    monthly_flow['Month_Change'] = ((monthly_flow['Daily_Flow_kg'] - monthly_flow['Previous_Month']) / monthly_flow['Previous_Month'] * 100).round(2)
+    # 每日 / 每月用量與日、月增減已預先計算（cvd.dates.daily_kpis），只需查表
+    current = daily_kpis(df).loc[selected_date]
     
-    # 獲取當前數據
-    current_day_data = daily_flow[daily_flow['Date'] == selected_date].iloc[0]
-    current_month = pd.to_datetime(selected_date).to_period('M')
-    current_month_data = monthly_flow[monthly_flow['Month'] == current_month].iloc[0]
-    
-    return (current_day_data['Daily_Flow_kg'], 
-            current_day_data['Day_Change'],
-            current_month_data['Daily_Flow_kg'],
-            current_month_data['Month_Change'])
+    return (current['Daily_Flow'], 
+            current['Day_Change'],
+            current['Month_Flow'],
+            current['Month_Change'])
 
 # 計算製程分布
 def calculate_layer_distribution(df):
-    layer_data = df.groupby('LAYER')['Daily_Flow_kg'].sum().reset_index()
+    layer_data = df.groupby('LAYER', observed=True)['Daily_Flow_kg'].sum().reset_index()
     total_flow = layer_data['Daily_Flow_kg'].sum()
     layer_data['Usage_Percentage'] = (layer_data['Daily_Flow_kg'] / total_flow * 100).round(2)
     return layer_data
@@ -206,7 +174,7 @@ with tab1:
         layer_data = calculate_layer_distribution(df_selected_date)
         
         # 添加 OPERATION 分布餅圖
-        operation_data = df_selected_date.groupby('OPERATION')['Daily_Flow_kg'].sum().reset_index()
+        operation_data = df_selected_date.groupby('OPERATION', observed=True)['Daily_Flow_kg'].sum().reset_index()
         total_flow_operation = operation_data['Daily_Flow_kg'].sum()
         operation_data['Usage_Percentage'] = (operation_data['Daily_Flow_kg'] / total_flow_operation * 100).round(2)
         
@@ -266,7 +234,7 @@ with tab1:
         st.plotly_chart(fig_pie, use_container_width=True)
 
         # 添加 SIN 分布餅圖
-        sin_data = df_selected_date.groupby('SIN')['Daily_Flow_kg'].sum().reset_index()
+        sin_data = df_selected_date.groupby('SIN', observed=True)['Daily_Flow_kg'].sum().reset_index()
         total_flow_sin = sin_data['Daily_Flow_kg'].sum()
         sin_data['Usage_Percentage'] = (sin_data['Daily_Flow_kg'] / total_flow_sin * 100).round(2)
         
@@ -300,10 +268,9 @@ with tab1:
     with col[1]:
         st.markdown('#### 流量趨勢')
         
-        # 每日流量趨勢圖
-        daily_flow = df.groupby('Date')['Daily_Flow_kg'].sum().reset_index()
+        # 每日流量趨勢圖（每日用量與累積用量取自 KPI 表）
+        daily_flow = daily_kpis(df)[['Daily_Flow', 'Cumulative_Flow']].rename(columns={'Daily_Flow': 'Daily_Flow_kg'}).reset_index()
         daily_flow['Formatted_Date'] = pd.to_datetime(daily_flow['Date']).dt.strftime('%Y/%m/%d')
-        daily_flow['Cumulative_Flow'] = daily_flow['Daily_Flow_kg'].cumsum()
         
         fig = go.Figure()
         
@@ -369,23 +336,17 @@ with tab1:
 
         # 添加異常數據顯示
         with st.expander("每日流量異常數據", expanded=False):
-            # 計算每日總流量
-            daily_total = df.groupby('Date')['Daily_Flow_kg'].sum().reset_index()
-            daily_total = daily_total.sort_values('Date')
-            
-            # 計算5日移動平均
-            daily_total['5D_Average'] = daily_total['Daily_Flow_kg'].rolling(window=5, min_periods=1).mean()
-            
-            # 計算異常倍數
-            daily_total['Abnormal_Times'] = daily_total['Daily_Flow_kg'] / daily_total['5D_Average']
+            # 每日總流量取自 KPI 表；5日移動平均與異常倍數依資料來源保存狀態，只重算新增或變動的日期（cvd.rolling）
+            abnormal_state = rolling_state(('abnormal_times', fl.name if fl is not None else None), ratio_window=5)
+            daily_total = abnormal_state.update(daily_kpis(df)['Daily_Flow']).reset_index()
+            daily_total = daily_total.rename(columns={'Value': 'Daily_Flow_kg', 'MA_5': '5D_Average', 'Ratio': 'Abnormal_Times'})
             
             # 篩選異常數據（當日流量超過5日平均5倍的數據）
             abnormal_dates = daily_total[daily_total['Abnormal_Times'] > 5]['Date']
             
             # 獲取異常日期的詳細數據
-            abnormal_data = df[
-                (df['Date'].isin(abnormal_dates)) &
-                (df['Date'] == selected_date)
+            abnormal_data = df_selected_date[
+                df_selected_date['Date'].isin(abnormal_dates)
             ][['Date', 'TSTAMP', 'CHAMBERID', 'RECIPEID', 'LAYER', 'Daily_Flow_kg']].copy()
             
             if not abnormal_data.empty:
@@ -456,7 +417,7 @@ with tab1:
         # 添加層級樹狀圖
         st.markdown('#### 層級分析')
         tree_data = df_selected_date.groupby(['LAYER', 'OPERATION', 'SIN', 'CHAMBERID'], 
-                                           as_index=False)['Daily_Flow_kg'].sum()
+                                           as_index=False, observed=True)['Daily_Flow_kg'].sum()
         
         fig_tree = px.treemap(tree_data,
                              path=['LAYER', 'OPERATION', 'SIN', 'CHAMBERID'],
@@ -481,7 +442,7 @@ with tab1:
             st.markdown('#### 機台排名 (前十大)')
             
             # 機台排名表格（只顯示前十名）
-            chamber_ranking = df_selected_date.groupby('CHAMBERID')['Daily_Flow_kg'].sum().reset_index()
+            chamber_ranking = df_selected_date.groupby('CHAMBERID', observed=True)['Daily_Flow_kg'].sum().reset_index()
             chamber_ranking = chamber_ranking.sort_values('Daily_Flow_kg', ascending=False).head(10)
             
             st.dataframe(chamber_ranking,
@@ -516,7 +477,7 @@ with tab1:
                     • 原始單位：SCCM<br>
                     • 轉換步驟：<br>
                     &nbsp;&nbsp;1. SCCM → m³/min: × (1/1000000)<br>
-                    &nbsp;&nbsp;2. m³/min → m³/day: ÷ 1440<br>
+                    &nbsp;&nbsp;2. m³/min → m³/day: × 1440<br>
                     &nbsp;&nbsp;3. m³ → kg: × 3.04
                     </div>
                     
@@ -550,11 +511,14 @@ with tab2:
         st.markdown('#### 機台月度用量佔比分析')
         
         # 計算每月總用量
-        df['YearMonth'] = pd.to_datetime(df['Date']).dt.strftime('%Y/%m')
-        monthly_total = df.groupby('YearMonth')['Daily_Flow_kg'].sum().reset_index()
+        monthly_total = cube.query(['YearMonth'])
+        monthly_total['Daily_Flow_kg'] = convert_flow(monthly_total['NF3_total_Flow'], "kg/day")
+        monthly_total = monthly_total[['YearMonth', 'Daily_Flow_kg']]
         
         # 計算每個機台每月的用量
-        chamber_monthly = df.groupby(['YearMonth', 'CHAMBERID'])['Daily_Flow_kg'].sum().reset_index()
+        chamber_monthly = cube.query(['YearMonth', 'CHAMBERID'])
+        chamber_monthly['Daily_Flow_kg'] = convert_flow(chamber_monthly['NF3_total_Flow'], "kg/day")
+        chamber_monthly = chamber_monthly[['YearMonth', 'CHAMBERID', 'Daily_Flow_kg']]
         
         # 計算每個機台每月的用量佔比
         chamber_monthly = chamber_monthly.merge(monthly_total, on='YearMonth', suffixes=('', '_total'))
@@ -649,23 +613,22 @@ with tab2:
         # CLN1 ΔTime 相關係數分析
         st.markdown('#### CLN1 ΔTime 相關係數分析')
         
-        # 篩選符合條件的數據
-        cln1_data = df_selected_date[
-            (df_selected_date['step_name'] == 'CLN1')
-        ].copy()
+        # 相關係數由匯入時依日期 × 步驟 × 機台儲存的充分統計量加總而得（cvd.corrstats），不需掃描原始資料
+        corr_stats = corr_stats_for(df) if fl is not None else corr_stats_for()
+        cln1_step = {'step_name': ['CLN1']}
         
-        if not cln1_data.empty:
+        if corr_stats.count(start=selected_date, end=selected_date, where=cln1_step):
             # 定義要分析的參數列表
             parameters = ['ΔTime', 'pressure', 'load_pwr', 'rfl_pwr', 'mon_vpp', 'vdc',
                          'N2_Flow', 'NH3_Flow', 'SiH4_Flow', 'H2_Flow', 'PH3_Flow',
                          'Ar_Flow', 'NF3_Flow', 'N2O_Flow']
             
             # 過濾出實際存在的列
-            available_columns = [col for col in parameters if col in cln1_data.columns]
+            available_columns = [col for col in parameters if col in corr_stats.parameters]
             
             if available_columns:
                 # 計算相關係數
-                corr_matrix = cln1_data[available_columns].corr()
+                corr_matrix = corr_stats.corr(available_columns, start=selected_date, end=selected_date, where=cln1_step)
                 
                 # 創建熱力圖
                 fig_heatmap = go.Figure(data=go.Heatmap(
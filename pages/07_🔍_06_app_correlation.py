@@ -3,7 +3,14 @@
 import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
-import os
+from cvd.dates import date_index
+from cvd.corrstats import corr_stats_for
+from cvd.cube import cube_for
+from cvd.loader import load_merged_data
+from cvd.schema import parse_tstamp
+from cvd.units import convert_flow
+from cvd.uploads import load_uploaded_data
+from cvd.xcorr import lagged_xcorr
 
 #######################
 # Page configuration
@@ -19,48 +26,30 @@ fl = st.file_uploader(":file_folder: Upload a file",type=(["csv","txt","xlsx","x
 if fl is not None:
     filename = fl.name
     st.write(filename)
-    df = pd.read_csv(filename, encoding = "utf-8")
+    df = load_uploaded_data(fl, encoding = "utf-8")
 else:
-    os.chdir(r"D:\curso\streamlit\09_app_multipage\data")
-    df = pd.read_csv("Merged_Data.csv", encoding = "utf-8")
+    df = load_merged_data()
 
-# 自定義時間轉換函數
-def convert_timestamp(ts):
-    try:
-        ts = str(ts)
-        if len(ts) >= 10:
-            year = ts[:4]
-            month = ts[4:6]
-            day = ts[6:8]
-            hour = ts[8:10] if len(ts) >= 10 else "00"
-            return f"{year}/{month}/{day} {hour}:00"
-        return None
-    except:
-        return None
+# 轉換 TSTAMP 格式（YYYYMMDDHH；Parquet 來源已是 datetime）
+df['TSTAMP'] = parse_tstamp(df['TSTAMP'])
+# Date、YearMonth 等衍生欄位已於匯入時計算（cvd.enrich）
 
-# 數據預處理
-df['TSTAMP'] = df['TSTAMP'].apply(convert_timestamp)
-df['TSTAMP'] = pd.to_datetime(df['TSTAMP'], format='%Y/%m/%d %H:%M', errors='coerce')
-df['Date'] = df['TSTAMP'].dt.date
+# 轉換流量單位（sccm → kg/day，換算常數見 cvd.units）
+df['Daily_Flow_kg'] = convert_flow(df['NF3_total_Flow'], "kg/day").round(2)
 
-# 定義單位轉換常數和函數
-def sccm_to_kg_per_day(flow_sccm):
-    m3_per_min = flow_sccm * (1/1000000)
-    m3_per_day = m3_per_min / 1440
-    kg_per_day = m3_per_day * 3.04
-    return kg_per_day
-
-# 轉換流量單位
-df['Daily_Flow_kg'] = df['NF3_total_Flow'].apply(lambda x: sccm_to_kg_per_day(x)).round(2)
+# 月度彙總由 NF3 用量 cube 查詢（上傳的檔案由該資料建立，同一份資料只建立一次）
+cube = cube_for(df) if fl is not None else cube_for()
 
 #######################
 # Sidebar
 with st.sidebar:
     st.title('🔍 相關性分析')
     
-    date_list = sorted(df['Date'].unique(), reverse=True)
+    # 日期 → 列範圍查詢表（同一份資料只建立一次），切換日期只需切片
+    dates = date_index(df)
+    date_list = dates.dates[::-1]
     selected_date = st.selectbox('選擇日期', date_list)
-    df_selected_date = df[df['Date'] == selected_date]
+    df_selected_date = dates.take(df, selected_date)
 
 #######################
 # Main Panel
@@ -80,11 +69,14 @@ with tab2:
         st.markdown('#### 機台月度用量佔比分析')
         
         # 計算每月總用量
-        df['YearMonth'] = pd.to_datetime(df['Date']).dt.strftime('%Y/%m')
-        monthly_total = df.groupby('YearMonth')['Daily_Flow_kg'].sum().reset_index()
+        monthly_total = cube.query(['YearMonth'])
+        monthly_total['Daily_Flow_kg'] = convert_flow(monthly_total['NF3_total_Flow'], "kg/day")
+        monthly_total = monthly_total[['YearMonth', 'Daily_Flow_kg']]
         
         # 計算每個機台每月的用量
-        chamber_monthly = df.groupby(['YearMonth', 'CHAMBERID'])['Daily_Flow_kg'].sum().reset_index()
+        chamber_monthly = cube.query(['YearMonth', 'CHAMBERID'])
+        chamber_monthly['Daily_Flow_kg'] = convert_flow(chamber_monthly['NF3_total_Flow'], "kg/day")
+        chamber_monthly = chamber_monthly[['YearMonth', 'CHAMBERID', 'Daily_Flow_kg']]
         
         # 計算每個機台每月的用量佔比
         chamber_monthly = chamber_monthly.merge(monthly_total, on='YearMonth', suffixes=('', '_total'))
@@ -179,23 +171,22 @@ with tab2:
         # CLN1 ΔTime 相關係數分析
         st.markdown('#### CLN1 ΔTime 相關係數分析')
         
-        # 篩選符合條件的數據
-        cln1_data = df_selected_date[
-            (df_selected_date['step_name'] == 'CLN1')
-        ].copy()
+        # 相關係數由匯入時依日期 × 步驟 × 機台儲存的充分統計量加總而得（cvd.corrstats），不需掃描原始資料
+        corr_stats = corr_stats_for(df) if fl is not None else corr_stats_for()
+        cln1_step = {'step_name': ['CLN1']}
         
-        if not cln1_data.empty:
+        if corr_stats.count(start=selected_date, end=selected_date, where=cln1_step):
             # 定義要分析的參數列表
             parameters = ['ΔTime', 'pressure', 'load_pwr', 'rfl_pwr', 'mon_vpp', 'vdc',
                          'N2_Flow', 'NH3_Flow', 'SiH4_Flow', 'H2_Flow', 'PH3_Flow',
                          'Ar_Flow', 'NF3_Flow', 'N2O_Flow']
             
             # 過濾出實際存在的列
-            available_columns = [col for col in parameters if col in cln1_data.columns]
+            available_columns = [col for col in parameters if col in corr_stats.parameters]
             
             if available_columns:
                 # 計算相關係數
-                corr_matrix = cln1_data[available_columns].corr()
+                corr_matrix = corr_stats.corr(available_columns, start=selected_date, end=selected_date, where=cln1_step)
                 
                 # 創建熱力圖
                 fig_heatmap = go.Figure(data=go.Heatmap(
@@ -281,4 +272,76 @@ with tab2:
             else:
                 st.info("數據中沒有可用於相關係數分析的列")
         else:
-            st.info("當日無CLN1步驟的數據") 
\ No newline at end of file
+            st.info("當日無CLN1步驟的數據")
+
+    # 各機台 × 清潔步驟 × 日期的 ΔTime 相關係數（所有分組的矩陣一次計算，見 cvd.corrstats），用於找出漂移的機台
+    st.markdown('#### 各機台 ΔTime 相關係數趨勢')
+    profile_col1, profile_col2 = st.columns([1, 1])
+    with profile_col1:
+        profile_step = st.selectbox('清潔步驟', ['CLN1', 'CLN2', 'CLN3'])
+    with profile_col2:
+        profile_parameter = st.selectbox('參數', [col for col in corr_stats.parameters if col != 'ΔTime'])
+
+    if 'ΔTime' in corr_stats.parameters and profile_parameter:
+        profile_keys, profile_matrices = corr_stats.matrices(['ΔTime', profile_parameter], where={'step_name': [profile_step]})
+        if len(profile_keys):
+            profile = profile_keys.assign(Correlation=profile_matrices[:, 0, 1], Date=profile_keys['TSTAMP'].dt.date)
+            pivot_profile = profile.pivot_table(index='CHAMBERID', columns='Date', values='Correlation', observed=True)
+
+            fig_profile = go.Figure(data=go.Heatmap(
+                z=pivot_profile.values,
+                x=pivot_profile.columns,
+                y=pivot_profile.index.astype(str),
+                colorscale='RdBu',
+                zmid=0,
+                zmin=-1,
+                zmax=1,
+                hoverongaps=False,
+                colorbar=dict(
+                    title=dict(text="相關係數", side="right", font=dict(size=12)),
+                    thickness=15,
+                    tickfont=dict(size=10)
+                )
+            ))
+            fig_profile.update_layout(
+                template='plotly_dark',
+                height=450,
+                title=dict(
+                    text=f'{profile_step} 步驟 ΔTime 與 {profile_parameter} 的每日相關係數',
+                    font=dict(size=14),
+                    x=0.5,
+                    y=0.98
+                ),
+                margin=dict(t=30, b=20, l=50, r=50)
+            )
+            st.plotly_chart(fig_profile, use_container_width=True)
+        else:
+            st.info(f"無{profile_step}步驟的數據")
+
+    # NF3_Flow 與電漿訊號的延遲相關（每次清潔以 FFT 計算所有延遲，同一份資料只計算一次，見 cvd.xcorr）
+    st.markdown('#### NF3_Flow 與電漿訊號的延遲相關')
+    xcorr = lagged_xcorr(df)
+    step_xcorr = xcorr[(xcorr['step_name'] == profile_step).to_numpy()].dropna(subset=['Peak_Corr'])
+
+    if not step_xcorr.empty:
+        # 各機台各訊號的延遲與相關係數取各次清潔的中位數
+        xcorr_summary = step_xcorr.groupby(['CHAMBERID', 'Signal'], observed=True).agg(
+            Peak_Lag=('Peak_Lag', 'median'),
+            Peak_Corr=('Peak_Corr', 'median'),
+            Zero_Lag_Corr=('Zero_Lag_Corr', 'median'),
+            Runs=('Peak_Corr', 'count')
+        ).reset_index()
+        st.dataframe(
+            xcorr_summary,
+            column_config={
+                "CHAMBERID": "機台編號",
+                "Signal": "訊號",
+                "Peak_Lag": st.column_config.NumberColumn("最大相關延遲（取樣點）", format="%.1f"),
+                "Peak_Corr": st.column_config.NumberColumn("最大相關係數", format="%.2f"),
+                "Zero_Lag_Corr": st.column_config.NumberColumn("零延遲相關係數", format="%.2f"),
+                "Runs": "清潔次數"
+            },
+            hide_index=True
+        )
+    else:
+        st.info(f"無{profile_step}步驟可計算延遲相關的數據") 
\ No newline at end of file
@@ -6,6 +6,8 @@ from matplotlib import font_manager
 import matplotlib.pyplot as plt
 import altair as alt
 import plotly.figure_factory as ff
+from cvd.cube import cube_for
+from cvd.metrics import distinct, in_units, ratio, total
 
 # Page configuration
 st.set_page_config(
@@ -38,54 +40,33 @@ def setup_chinese_font():
 
 setup_chinese_font()
 
-# 載入資料
-data = pd.read_csv(r"D:\curso\streamlit\09_app_multipage\data\Merged_Data.csv", encoding='utf-8', sep=',')
-
-# 將所有流量數據四捨五入到小數點後兩位
-flow_columns = ['NF3_total_Flow', 'Daily_Flow_sccm', 'Daily_Flow_kg', 'Daily_Flow_l']
-for col in flow_columns:
-    if col in data.columns:
-        data[col] = data[col].round(2)
-
-# 打印列名
-st.write("DataFrame 列名：", data.columns.tolist())
-
-data['LAYER'] = data['RECIPEID'].str.extract('(BP|PFA|AS)')
-
-# 自定義時間轉換函數
-def convert_timestamp(ts):
-    try:
-        ts = str(ts)
-        if len(ts) >= 10:  # 確保字符串長度足夠
-            year = ts[:4]
-            month = ts[4:6]
-            day = ts[6:8]
-            hour = ts[8:10] if len(ts) >= 10 else "00"
-            return f"{year}/{month}/{day} {hour}:00"
-        return None
-    except:
-        return None
-
-# 轉換 TSTAMP 格式
-data['TSTAMP'] = data['TSTAMP'].apply(convert_timestamp)
-data['TSTAMP'] = pd.to_datetime(data['TSTAMP'], format='%Y/%m/%d %H:%M', errors='coerce')
-
-# 過濾 step_name 為 CLN1、CLN2、CLN3 的數據
-filtered_data = data[data['step_name'].isin(['CLN1', 'CLN2', 'CLN3'])].copy()
-
-# 添加每日日期欄位
-filtered_data['Date'] = filtered_data['TSTAMP'].dt.date
-
-# 定義單位轉換常數
-SCCM_TO_KG = 3.04 / (1000 * 60)
-SCCM_TO_LITER = 1 / 60000
-SCCM_TO_SCCM = 1
+# 各圖表的彙總由匯入時建立的小時粒度 cube 查詢（cvd.cube），不再載入原始資料
+# （LAYER、Date 等衍生欄位已於匯入時計算，見 cvd.enrich）
+cube = cube_for()
+cln_steps = {'step_name': ['CLN1', 'CLN2', 'CLN3']}
+
+# 近 30 日的起點
+recent_start = cube.latest - pd.Timedelta(days=30)
+
+# 每日用量表格的指標（cvd.metrics）：合計、換算單位、片數與每片用量
+GLASS_METRICS = [
+    total('NF3_total_Flow'),
+    in_units('Daily_Flow', 'NF3_total_Flow'),
+    distinct('GLASSID', name='Glass_Count'),
+    ratio('Flow_per_Glass', 'Daily_Flow', 'Glass_Count'),
+]
+RPSC_METRICS = [
+    total('NF3_total_Flow'),
+    in_units('Daily_Flow', 'NF3_total_Flow'),
+    distinct('GLASSID', name='RPSC_Glass_Count'),
+    ratio('Flow_per_RPSC', 'Daily_Flow', 'RPSC_Glass_Count'),
+]
 
 # TreeMap 可視化
-def visualize_treemap(data):
+def visualize_treemap(cube):
     st.subheader("Hierarchical view of NF3 Usage (Layer -> RECIPEID -> CHAMBERID)")
     
-    tree_data = filtered_data.groupby(['Date','LAYER', 'RECIPEID', 'CHAMBERID'], as_index=False)['NF3_total_Flow'].sum()
+    tree_data = cube.query(['Date', 'LAYER', 'RECIPEID', 'CHAMBERID'], where=cln_steps)[['Date', 'LAYER', 'RECIPEID', 'CHAMBERID', 'NF3_total_Flow']]
     tree_data['NF3_total_Flow'] = tree_data['NF3_total_Flow'].round(2)
     
     fig3 = px.treemap(tree_data, 
@@ -98,20 +79,12 @@ def visualize_treemap(data):
     st.plotly_chart(fig3, use_container_width=True)
 
 # 計算每日 NF3 用量與單片玻璃耗氣量
-def analyze_layer_chamberid(data):
+def analyze_layer_chamberid(cube, start):
     st.header("LAYER 與 CHAMBERID 分析")
 
-    # 過濾近 30 日資料
-    max_date = data['TSTAMP'].max()
-    min_date = max_date - pd.Timedelta(days=30)
-    recent_data = data[(data['TSTAMP'] >= min_date) & (data['TSTAMP'] <= max_date)]
-
-    # 每日 NF3 用量計算
-    daily_flow = recent_data.groupby(['LAYER', 'CHAMBERID', recent_data['TSTAMP'].dt.date])['NF3_total_Flow'].sum().reset_index()
-    daily_flow['NF3_total_Flow'] = daily_flow['NF3_total_Flow'].round(2)
-    daily_flow['Daily_Flow_sccm'] = (daily_flow['NF3_total_Flow'] * SCCM_TO_SCCM).round(2)
-    daily_flow['Daily_Flow_kg'] = (daily_flow['NF3_total_Flow'] * SCCM_TO_KG).round(2)
-    daily_flow['Daily_Flow_l'] = (daily_flow['NF3_total_Flow'] * SCCM_TO_LITER).round(2)
+    # 每日 NF3 用量、片數與單片玻璃耗氣量一次彙總（日期欄位沿用 TSTAMP 的名稱）
+    glass_flow = cube.aggregate(['LAYER', 'CHAMBERID', 'Date'], GLASS_METRICS, start=start, decimals=2).rename(columns={'Date': 'TSTAMP'})
+    daily_flow = glass_flow[['LAYER', 'CHAMBERID', 'TSTAMP', 'NF3_total_Flow', 'Daily_Flow_sccm', 'Daily_Flow_kg', 'Daily_Flow_l']]
 
     # 顯示每日 NF3 用量
     st.subheader("每日 NF3 用量")
@@ -123,13 +96,6 @@ def analyze_layer_chamberid(data):
     }))
 
     # 單片玻璃耗氣量
-    glassid_count = recent_data.groupby(['CHAMBERID', 'LAYER', recent_data['TSTAMP'].dt.date])['GLASSID'].nunique().reset_index()
-    glassid_count = glassid_count.rename(columns={'GLASSID': 'Glass_Count'})
-    glass_flow = pd.merge(daily_flow, glassid_count, on=['CHAMBERID', 'LAYER', 'TSTAMP'], how='left')
-    glass_flow['Flow_per_Glass_sccm'] = (glass_flow['Daily_Flow_sccm'] / glass_flow['Glass_Count']).round(2)
-    glass_flow['Flow_per_Glass_kg'] = (glass_flow['Daily_Flow_kg'] / glass_flow['Glass_Count']).round(2)
-    glass_flow['Flow_per_Glass_l'] = (glass_flow['Daily_Flow_l'] / glass_flow['Glass_Count']).round(2)
-
     st.subheader("單片玻璃耗氣量")
     st.dataframe(glass_flow.style.format({
         "NF3_total_Flow": "{:.2f}",
@@ -142,31 +108,13 @@ def analyze_layer_chamberid(data):
     }))
 
 # 單次 RPSC 耗氣量分析
-def analyze_rpsc_usage(data):
+def analyze_rpsc_usage(cube, start):
     st.header("單次 RPSC 耗氣量分析")
 
-    # 過濾近 30 日資料
-    max_date = data['TSTAMP'].max()
-    min_date = max_date - pd.Timedelta(days=30)
-    recent_data = data[(data['TSTAMP'] >= min_date) & (data['TSTAMP'] <= max_date)]
-
-    # 過濾 RPSC 資料
-    rpsc_data = recent_data[recent_data['RECIPEID'].str.startswith('RPSC')]
-
-    # 單次 RPSC 耗氣量計算
-    rpsc_daily_flow = rpsc_data.groupby(['CHAMBERID', rpsc_data['TSTAMP'].dt.date])['NF3_total_Flow'].sum().reset_index()
-    rpsc_daily_flow['NF3_total_Flow'] = rpsc_daily_flow['NF3_total_Flow'].round(2)
-    rpsc_daily_flow['Daily_Flow_sccm'] = (rpsc_daily_flow['NF3_total_Flow'] * SCCM_TO_SCCM).round(2)
-    rpsc_daily_flow['Daily_Flow_kg'] = (rpsc_daily_flow['NF3_total_Flow'] * SCCM_TO_KG).round(2)
-    rpsc_daily_flow['Daily_Flow_l'] = (rpsc_daily_flow['NF3_total_Flow'] * SCCM_TO_LITER).round(2)
-
-    rpsc_glassid_count = rpsc_data.groupby(['CHAMBERID', rpsc_data['TSTAMP'].dt.date])['GLASSID'].nunique().reset_index()
-    rpsc_glassid_count = rpsc_glassid_count.rename(columns={'GLASSID': 'RPSC_Glass_Count'})
-
-    rpsc_usage = pd.merge(rpsc_daily_flow, rpsc_glassid_count, on=['CHAMBERID', 'TSTAMP'], how='left')
-    rpsc_usage['Flow_per_RPSC_sccm'] = (rpsc_usage['Daily_Flow_sccm'] / rpsc_usage['RPSC_Glass_Count']).round(2)
-    rpsc_usage['Flow_per_RPSC_kg'] = (rpsc_usage['Daily_Flow_kg'] / rpsc_usage['RPSC_Glass_Count']).round(2)
-    rpsc_usage['Flow_per_RPSC_l'] = (rpsc_usage['Daily_Flow_l'] / rpsc_usage['RPSC_Glass_Count']).round(2)
+    # RPSC 資料的每日用量、片數與單次 RPSC 耗氣量一次彙總
+    rpsc_usage = cube.aggregate(
+        ['CHAMBERID', 'Date'], RPSC_METRICS, where={'RECIPEID': lambda s: s.str.startswith('RPSC', na=False)}, start=start, decimals=2
+    ).rename(columns={'Date': 'TSTAMP'})
 
     st.subheader("單次 RPSC 耗氣量")
     st.dataframe(rpsc_usage.style.format({
@@ -184,13 +132,13 @@ def main():
     st.title("NF3 氣體流量與使用分析儀表板")
 
     # TreeMap 可視化
-    visualize_treemap(data)
+    visualize_treemap(cube)
 
     # LAYER 與 CHAMBERID 分析
-    analyze_layer_chamberid(data)
+    analyze_layer_chamberid(cube, recent_start)
 
     # 單次 RPSC 耗氣量分析
-    analyze_rpsc_usage(data)
+    analyze_rpsc_usage(cube, recent_start)
 
 if __name__ == "__main__":
     main()
@@ -2,9 +2,10 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import altair as alt
-import os
 import warnings
 from datetime import datetime
+from cvd.cube import cube_for
+from cvd.uploads import load_uploaded_data
 
 # Streamlit 設定
 st.set_page_config(page_title="NF3 分析儀表板", page_icon=":bar_chart:", layout="wide")
@@ -15,58 +16,19 @@ st.title(":bar_chart: NF3 氣體使用與製程分析儀表板")
 uploaded_file = st.file_uploader("上傳數據文件", type=["csv"])
 
 if uploaded_file is not None:
-    # 載入數據
-    df = pd.read_csv(uploaded_file, encoding='utf-8')
+    # 載入數據（相同內容的檔案只解析一次）
+    df = load_uploaded_data(uploaded_file, encoding='utf-8')
 else:
-    os.chdir(r"D:\curso\streamlit\09_app_multipage\data")
-    df = pd.read_csv("Merged_Data.csv", encoding='utf-8')
-
-    # 從 RECIPEID 提取 LAYER 信息
-    def extract_layer(recipe_id):
-        if pd.isna(recipe_id):
-            return 'Unknown'
-        recipe_id = str(recipe_id).upper()
-        if 'BP' in recipe_id:
-            return 'BP'
-        elif 'PFA' in recipe_id:
-            return 'PFA'
-        elif 'AS' in recipe_id:
-            return 'AS'
-        else:
-            return 'OTHER'
-
-    # 添加 LAYER 列
-    df['LAYER'] = df['RECIPEID'].apply(extract_layer)
-
-    # 自定義時間轉換函數
-    def convert_timestamp(ts):
-        try:
-            ts = str(ts)
-            if len(ts) >= 10:  # 確保字符串長度足夠
-                year = ts[:4]
-                month = ts[4:6]
-                day = ts[6:8]
-                hour = ts[8:10] if len(ts) >= 10 else "00"
-                return f"{year}/{month}/{day} {hour}:00"
-            return None
-        except:
-            return None
-
-    # 轉換 TSTAMP 格式
-    df['TSTAMP'] = df['TSTAMP'].apply(convert_timestamp)
-    df['TSTAMP'] = pd.to_datetime(df['TSTAMP'], format='%Y/%m/%d %H:%M', errors='coerce')
-    
-    # 過濾 step_name 為 CLN1、CLN2、CLN3 的數據
-    filtered_df = df[df['step_name'].isin(['CLN1', 'CLN2', 'CLN3'])].copy()
-    
-    # 添加每日日期欄位
-    filtered_df['Date'] = filtered_df['TSTAMP'].dt.date
+    # CLN1、CLN2、CLN3 的彙總由匯入時建立的小時粒度 cube 查詢（cvd.cube），不再載入原始資料
+    # （LAYER、Date 等衍生欄位已於匯入時計算，規則與其他頁面相同，見 cvd.enrich）
+    cube = cube_for()
+    cln_steps = {'step_name': ['CLN1', 'CLN2', 'CLN3']}
 
     # **1. Hierarchical TreeMap**
     st.subheader("Hierarchical view of NF3 Usage (Layer ->OPERATION-> SIN -> CHAMBERID)")
     
     # 按日期、LAYER、RECIPEID、CHAMBERID 匯總 NF3_total_Flow
-    tree_data = filtered_df.groupby(['Date','LAYER', 'OPERATION', 'SIN', 'CHAMBERID'], as_index=False)['NF3_total_Flow'].sum()
+    tree_data = cube.query(['Date', 'LAYER', 'OPERATION', 'SIN', 'CHAMBERID'], where=cln_steps)
     fig3 = px.treemap(tree_data, 
                       path=['OPERATION','LAYER',  'SIN', 'CHAMBERID'], 
                       values='NF3_total_Flow', 
@@ -80,7 +42,7 @@ else:
     st.subheader("Pie Charts: Daily NF3 Usage Analysis")
 
     # 每日機台層級分析
-    chamber_daily = filtered_df.groupby(['Date', 'CHAMBERID'], as_index=False)['NF3_total_Flow'].sum()
+    chamber_daily = cube.query(['Date', 'CHAMBERID'], where=cln_steps)
     
     # 將日期轉換為字符串用於顯示
     date_options = [(date, date.strftime('%Y/%m/%d')) for date in sorted(chamber_daily['Date'].unique())]
@@ -92,7 +54,7 @@ else:
     daily_date = [date[0] for date in date_options if date[1] == selected_date_str][0]
     
     chamber_daily_filtered = chamber_daily[chamber_daily['Date'] == daily_date]
-    recipe_daily = filtered_df.groupby(['Date', 'LAYER'], as_index=False)['NF3_total_Flow'].sum()
+    recipe_daily = cube.query(['Date', 'LAYER'], where=cln_steps)
     recipe_daily_filtered = recipe_daily[recipe_daily['Date'] == daily_date]
 
     col1, col2 = st.columns(2)
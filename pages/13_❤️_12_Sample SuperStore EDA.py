@@ -1,8 +1,10 @@
 import streamlit as st
 import plotly.express as px
 import pandas as pd
-import os
 import warnings
+from cvd.hierarchy import hierarchy_index
+from cvd.loader import DATA_DIR, load_csv_data
+from cvd.uploads import load_uploaded_data
 warnings.filterwarnings('ignore')
 
 st.set_page_config(page_title="Superstore!!!", page_icon=":bar_chart:",layout="wide")
@@ -14,17 +16,19 @@ fl = st.file_uploader(":file_folder: Upload a file",type=(["csv","txt","xlsx","x
 if fl is not None:
     filename = fl.name
     st.write(filename)
-    df = pd.read_csv(filename, encoding = "ISO-8859-1")
+    df = load_uploaded_data(fl, encoding = "ISO-8859-1")
 else:
-    os.chdir(r"D:\curso\streamlit\09_app_multipage\data")
-    df = pd.read_csv("Superstore.csv", encoding = "ISO-8859-1")
+    df = load_csv_data(DATA_DIR / "Superstore.csv", encoding = "ISO-8859-1")
+
+# Region → State → City 階層索引，同一份資料只建立一次（須在改寫欄位之前取得）
+index = hierarchy_index(df, ["Region", "State", "City"], time_column = "Order Date")
 
 col1, col2 = st.columns((2))
-df["Order Date"] = pd.to_datetime(df["Order Date"])
+df["Order Date"] = index.times
 
 # Getting the min and max date 
-startDate = pd.to_datetime(df["Order Date"]).min()
-endDate = pd.to_datetime(df["Order Date"]).max()
+startDate = df["Order Date"].min()
+endDate = df["Order Date"].max()
 
 with col1:
     date1 = pd.to_datetime(st.date_input("Start Date", startDate))
@@ -32,44 +36,24 @@ with col1:
 with col2:
     date2 = pd.to_datetime(st.date_input("End Date", endDate))
 
-df = df[(df["Order Date"] >= date1) & (df["Order Date"] <= date2)].copy()
+# 日期區間內的列號（None 表示全部）
+rows = index.rows_between(date1, date2)
 
 st.sidebar.header("Choose your filter: ")
+# 各層選項只列出日期區間與上層選取範圍內出現的值
 # Create for Region
-region = st.sidebar.multiselect("Pick your Region", df["Region"].unique())
-if not region:
-    df2 = df.copy()
-else:
-    df2 = df[df["Region"].isin(region)]
+region = st.sidebar.multiselect("Pick your Region", index.options("Region", rows = rows))
 
 # Create for State
-state = st.sidebar.multiselect("Pick the State", df2["State"].unique())
-if not state:
-    df3 = df2.copy()
-else:
-    df3 = df2[df2["State"].isin(state)]
+state = st.sidebar.multiselect("Pick the State", index.options("State", {"Region": region}, rows = rows))
 
 # Create for City
-city = st.sidebar.multiselect("Pick the City",df3["City"].unique())
-
-# Filter the data based on Region, State and City
-
-if not region and not state and not city:
-    filtered_df = df
-elif not state and not city:
-    filtered_df = df[df["Region"].isin(region)]
-elif not region and not city:
-    filtered_df = df[df["State"].isin(state)]
-elif state and city:
-    filtered_df = df3[df["State"].isin(state) & df3["City"].isin(city)]
-elif region and city:
-    filtered_df = df3[df["Region"].isin(region) & df3["City"].isin(city)]
-elif region and state:
-    filtered_df = df3[df["Region"].isin(region) & df3["State"].isin(state)]
-elif city:
-    filtered_df = df3[df3["City"].isin(city)]
-else:
-    filtered_df = df3[df3["Region"].isin(region) & df3["State"].isin(state) & df3["City"].isin(city)]
+city = st.sidebar.multiselect("Pick the City", index.options("City", {"Region": region, "State": state}, rows = rows))
+
+# Filter the data based on Region, State and City（未選取的層不篩選）
+selected = index.select({"Region": region, "State": state, "City": city}, rows = rows)
+filtered_df = index.take(df, selected)
+df = index.take(df, rows)
 
 category_df = filtered_df.groupby(by = ["Category"], as_index = False)["Sales"].sum()
 
@@ -0,0 +1,74 @@
+"""測試共用的合成資料與資料目錄。"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import cvd.cube  # noqa: E402
+import cvd.ingest  # noqa: E402
+import cvd.loader  # noqa: E402
+import cvd.store  # noqa: E402
+from cvd.enrich import enrich  # noqa: E402
+from cvd.schema import apply_schema  # noqa: E402
+from cvd.vendors import AKT_COLUMNS, to_canonical  # noqa: E402
+
+CHAMBERS = [f"2ACV{i:02d}00-{c}" for i in range(1, 4) for c in "AB"]
+RECIPES = ["BP_STD1", "PFA_X2", "AS_03", "RPSC_CLN", "Auto_leak_SEA"]
+
+
+def make_raw(n=3000, days=40, seed=0, start="2024-10-01"):
+    """AKT 欄位的合成資料，TSTAMP 為 YYYYMMDDHH 整數（與 ETL 輸出的 Merged_Data.csv 相同）。"""
+    rng = np.random.default_rng(seed)
+    tstamp = pd.Timestamp(start) + pd.to_timedelta(rng.integers(0, days * 24, n), unit="h")
+    data = {
+        "CHAMBERID": rng.choice(CHAMBERS, n),
+        "GLASSID": rng.choice([f"{p}{i:04d}" for p in ["TA12", "RPSC", "TB34"] for i in range(300)], n),
+        "TSTAMP": tstamp.strftime("%Y%m%d%H").astype(np.int64),
+        "RECIPEID": rng.choice(RECIPES, n),
+        "OPERATION": rng.choice(["1100", "1200"], n),
+        "PRODUCT": rng.choice(["TA12XX", "TB34YY", "RPSCZZ"], n),
+        "step_name": rng.choice(["CLN1", "CLN2", "CLN3", "DEP1"], n),
+        "CHAMBER_CODE": rng.choice(["A", "B"], n),
+        "SIN": rng.choice(["SIN1", "SIN2"], n),
+        "Sample_Time": rng.random(n) * 100,
+    }
+    data["TOOLID"] = [chamber[:8] for chamber in data["CHAMBERID"]]
+    for col in AKT_COLUMNS:
+        if col not in data:
+            data[col] = rng.random(n) * 100
+    return pd.DataFrame(data)[AKT_COLUMNS]
+
+
+def canonical(raw):
+    """套用 schema 並補上衍生欄位（與匯入後的資料相同）。"""
+    return enrich(apply_schema(to_canonical(raw, "AKT")))
+
+
+@pytest.fixture
+def raw():
+    return make_raw()
+
+
+@pytest.fixture
+def frame(raw):
+    return canonical(raw)
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """將預設的資料目錄（Merged_Data.csv / .parquet / 分區資料集）指向暫存目錄。"""
+    paths = {
+        "DATA_DIR": tmp_path,
+        "MERGED_CSV": tmp_path / "Merged_Data.csv",
+        "MERGED_PARQUET": tmp_path / "Merged_Data.parquet",
+        "MERGED_DATASET": tmp_path / "Merged_Data",
+    }
+    for module in (cvd.loader, cvd.store, cvd.ingest, cvd.cube):
+        for name, path in paths.items():
+            if hasattr(module, name):
+                monkeypatch.setattr(module, name, path)
+    return tmp_path
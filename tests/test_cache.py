@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+
+from cvd.cache import ArrayCache, array_identity
+from cvd.loader import load_merged_data
+
+
+def _counting_cache():
+    cache, calls = ArrayCache(4), []
+
+    def build(frame, columns):
+        return cache.get(frame, columns, None, lambda: calls.append(1) or len(calls))
+
+    return build, calls
+
+
+def test_second_loaded_copy_hits_cache(data_dir, raw):
+    raw.to_csv(data_dir / "Merged_Data.csv", index=False)
+    build, calls = _counting_cache()
+    columns = ["TSTAMP", "CHAMBERID", "NF3_total_Flow"]
+    first = build(load_merged_data(), columns)
+    second = build(load_merged_data(), columns)
+    assert first == second == 1
+    assert len(calls) == 1
+
+
+def test_datetime_column_hits_across_shallow_copies(frame):
+    build, calls = _counting_cache()
+    build(frame, ["TSTAMP"])
+    build(frame.copy(deep=False), ["TSTAMP"])
+    build(frame.copy(deep=False), ["TSTAMP", "Date"])
+    build(frame.copy(deep=False), ["TSTAMP", "Date"])
+    assert len(calls) == 2
+
+
+def test_slices_of_same_array_do_not_collide():
+    frame = pd.DataFrame({"a": np.arange(10.0), "t": pd.date_range("2024-01-01", periods=10, freq="H")})
+    cache = ArrayCache(4)
+    for columns in (["a"], ["t"]):
+        head = cache.get(frame.iloc[0:5], columns, None, lambda: "head")
+        tail = cache.get(frame.iloc[5:10], columns, None, lambda: "tail")
+        assert (head, tail) == ("head", "tail")
+
+
+def test_deep_copy_misses_cache(frame):
+    build, calls = _counting_cache()
+    build(frame, ["TSTAMP", "NF3_total_Flow"])
+    build(frame.copy(), ["TSTAMP", "NF3_total_Flow"])
+    assert len(calls) == 2
+
+
+def test_array_identity_separates_category_sets():
+    values = pd.Categorical(["a", "b", "a"])
+    renamed = values.rename_categories(["x", "y"])
+    assert array_identity(values)[1] != array_identity(renamed)[1]
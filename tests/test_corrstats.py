@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+
+import cvd.corrstats
+from cvd.corrstats import CorrStats, build_corr_stats, corr_stats_for, load_corr_stats
+from cvd.cube import CUBE_DIR
+from cvd.loader import load_merged_data
+from cvd.store import write_merged_partitions
+
+PARAMETERS = ["pressure", "load_pwr", "NF3_Flow", "N2_Flow"]
+
+
+def _with_missing(frame):
+    return frame.assign(pressure=frame["pressure"].where(frame.index % 7 != 0))
+
+
+def test_corr_matches_dataframe_corr(frame):
+    frame = _with_missing(frame)
+    stats = build_corr_stats(frame)
+    start, end = pd.Timestamp("2024-10-05"), pd.Timestamp("2024-10-20")
+    rows = frame[frame["step_name"].isin(["CLN1", "CLN2"]) & frame["TSTAMP"].between(start, end + pd.Timedelta(hours=23))]
+    result = stats.corr(PARAMETERS, start=start, end=end, where={"step_name": ["CLN1", "CLN2"]})
+    np.testing.assert_allclose(result.to_numpy(), rows[PARAMETERS].corr().to_numpy(), atol=1e-9)
+    assert stats.count(start=start, end=end, where={"step_name": ["CLN1", "CLN2"]}) == len(rows)
+
+
+def test_matrices_by_chamber(frame):
+    stats = build_corr_stats(frame)
+    keys, matrices = stats.matrices(PARAMETERS, by=["CHAMBERID"])
+    rows = frame[frame["step_name"].isin(["CLN1", "CLN2", "CLN3"])]
+    for key, matrix in zip(keys.itertuples(), matrices):
+        chamber = rows[rows["CHAMBERID"] == key.CHAMBERID]
+        assert key.Rows == len(chamber)
+        np.testing.assert_allclose(matrix, chamber[PARAMETERS].corr().to_numpy(), atol=1e-9)
+
+
+def test_table_round_trip(frame):
+    stats = build_corr_stats(frame)
+    restored = CorrStats.from_table(stats.to_table())
+    assert restored.parameters == stats.parameters
+    np.testing.assert_array_equal(restored.stats, stats.stats)
+
+
+def test_load_corr_stats_requires_every_month(data_dir, frame):
+    write_merged_partitions(frame)
+    assert load_corr_stats().count() == int(frame["step_name"].isin(["CLN1", "CLN2", "CLN3"]).sum())
+    for path in (data_dir / "Merged_Data" / CUBE_DIR).glob("year=*/month=10/corr-*.parquet"):
+        path.unlink()
+    assert load_corr_stats() is None
+    # 回退為由原始資料建立
+    assert corr_stats_for().count() == int(frame["step_name"].isin(["CLN1", "CLN2", "CLN3"]).sum())
+
+
+def test_corr_stats_for_hits_cache_across_loads(data_dir, raw, monkeypatch):
+    raw.to_csv(data_dir / "Merged_Data.csv", index=False)
+    calls = []
+    build = cvd.corrstats.build_corr_stats
+    monkeypatch.setattr(cvd.corrstats, "build_corr_stats", lambda frame: calls.append(1) or build(frame))
+    assert corr_stats_for(load_merged_data()) is corr_stats_for(load_merged_data())
+    assert len(calls) == 1
@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+
+from cvd.cube import CUBE_DIR, NF3Cube, build_cube, cube_for, load_cube
+from cvd.ingest import incremental_ingest
+from cvd.loader import load_merged_data
+from cvd.store import write_merged_partitions
+from conftest import make_raw
+
+
+def _sorted(table, by):
+    return table.astype({col: str for col in by}).sort_values(by).reset_index(drop=True)
+
+
+def test_query_matches_groupby(frame):
+    cube = NF3Cube(*build_cube(frame))
+    by = ["Date", "LAYER", "CHAMBERID"]
+    where = {"step_name": ["CLN1", "CLN2"]}
+    result = cube.query(by, where=where, glass_count=True)
+    rows = frame[frame["step_name"].isin(["CLN1", "CLN2"])]
+    expected = rows.groupby(by, observed=True).agg(
+        NF3_total_Flow=("NF3_total_Flow", "sum"), rows=("GLASSID", "size"), GLASSID=("GLASSID", "nunique")
+    ).reset_index()
+    result, expected = _sorted(result, by), _sorted(expected, by)
+    np.testing.assert_allclose(result["NF3_total_Flow"], expected["NF3_total_Flow"], rtol=1e-5)
+    np.testing.assert_array_equal(result["rows"], expected["rows"])
+    np.testing.assert_array_equal(result["GLASSID"], expected["GLASSID"])
+
+
+def test_query_time_range(frame):
+    cube = NF3Cube(*build_cube(frame))
+    start = pd.Timestamp("2024-10-25")
+    result = cube.query(["CHAMBERID"], start=start)
+    assert result["rows"].sum() == int((frame["TSTAMP"] >= start).sum())
+
+
+def test_cube_for_hits_cache_across_loads(data_dir, raw):
+    raw.to_csv(data_dir / "Merged_Data.csv", index=False)
+    assert cube_for() is cube_for()
+    assert cube_for(load_merged_data()) is cube_for(load_merged_data())
+
+
+def test_load_cube_matches_built_cube(data_dir, frame):
+    write_merged_partitions(frame)
+    stored = load_cube()
+    assert stored is not None
+    built = NF3Cube(*build_cube(frame))
+    for cube in (stored, built):
+        assert cube.flow["rows"].sum() == len(frame)
+    np.testing.assert_allclose(stored.flow[["NF3_total_Flow"]].sum(), built.flow[["NF3_total_Flow"]].sum(), rtol=1e-6)
+
+
+def test_load_cube_requires_every_month(data_dir, frame):
+    write_merged_partitions(frame)
+    for path in (data_dir / "Merged_Data" / CUBE_DIR).glob("year=*/month=11/*.parquet"):
+        path.unlink()
+    assert load_cube() is None
+    # 回退為由原始資料建立
+    assert cube_for().flow["rows"].sum() == len(frame)
+
+
+def test_appended_cube_keeps_totals(data_dir):
+    raw = make_raw(n=2000, days=50, seed=2)
+    tstamp = pd.to_datetime(raw["TSTAMP"].astype(str), format="%Y%m%d%H")
+    write_merged_partitions(raw[(tstamp < "2024-11-10").to_numpy()])
+    incremental_ingest(raw)
+    cube = load_cube()
+    assert cube is not None
+    assert cube.flow["rows"].sum() == len(raw)
+    assert cube.query(["Date"], glass_count=True)["GLASSID"].sum() == sum(
+        group["GLASSID"].nunique() for _, group in raw.groupby(tstamp.dt.date)
+    )
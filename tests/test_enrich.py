@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+
+from cvd.enrich import enrich, layer_of, prefix_columns
+
+
+def _expected_layer(recipe_id):
+    if pd.isna(recipe_id):
+        return "Unknown"
+    recipe_id = str(recipe_id).upper()
+    if "BP" in recipe_id:
+        return "BP"
+    elif "PFA" in recipe_id:
+        return "PFA"
+    elif "AS" in recipe_id:
+        return "AS"
+    return "OTHER"
+
+
+def test_layer_of_matches_row_rule():
+    ids = pd.Series(["BP_STD1", "pfa_x2", "AS_BP", "as_pfa", "RPSC_CLN", None, "Auto_leak_SEA", "BP_STD1"])
+    layers = layer_of(ids)
+    assert isinstance(layers.dtype, pd.CategoricalDtype)
+    assert layers.name == "LAYER"
+    assert layers.astype(object).tolist() == [_expected_layer(x) for x in ids]
+
+
+def test_layer_of_categorical_input():
+    ids = pd.Series(pd.Categorical(["RPSC_CLN", None, "Bp_1"]), index=[5, 6, 7])
+    layers = layer_of(ids)
+    assert layers.index.tolist() == [5, 6, 7]
+    assert layers.astype(object).tolist() == ["OTHER", "Unknown", "BP"]
+
+
+def test_enrich_recomputes_stale_layer(frame):
+    stale = frame.assign(LAYER=frame["LAYER"].cat.set_categories(["BP", "PFA", "AS"]))
+    assert stale["LAYER"].hasnans
+    pd.testing.assert_series_equal(enrich(stale)["LAYER"], frame["LAYER"])
+    assert not frame["LAYER"].hasnans
+
+
+def test_prefix_columns_match_string_prefixes():
+    frame = pd.DataFrame({
+        "GLASSID": ["TA12XX", "TA12YY", "TB34ZZ", np.nan],
+        "PRODUCT": pd.Categorical(["TA12AA", "TC56BB", "TB34CC", "nan"]),
+        "RECIPEID": ["RPSC_1", "BP_STD", "TB3", np.nan],
+    })
+    prefixes = prefix_columns(frame)
+    for source, target in [("GLASSID", "GLASSID_prefix"), ("PRODUCT", "PRODUCT_prefix"), ("RECIPEID", "RECIPEID_prefix")]:
+        assert prefixes[target].astype(object).tolist() == frame[source].astype(str).str[:4].tolist()
+    assert (prefixes["GLASSID_prefix"] == prefixes["PRODUCT_prefix"]).tolist() == [True, False, True, True]
+    assert (prefixes["PRODUCT_prefix"] != "Auto_leak_SEA").all()
+
+
+def test_enrich_shares_prefix_categories(frame):
+    assert frame["GLASSID_prefix"].cat.categories.equals(frame["PRODUCT_prefix"].cat.categories)
+    expected = frame["GLASSID"].astype(str).str[:4] == frame["PRODUCT"].astype(str).str[:4]
+    assert ((frame["GLASSID_prefix"] == frame["PRODUCT_prefix"]) == expected).all()
+    # 舊版資料的整數雜湊欄位會重算
+    stale = frame.assign(GLASSID_prefix=frame["GLASSID_prefix"].cat.codes.astype("uint64"))
+    pd.testing.assert_series_equal(enrich(stale)["GLASSID_prefix"], frame["GLASSID_prefix"])
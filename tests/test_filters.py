@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from cvd.filters import SPARSE_RATIO, FilterIndex, filter_index
+
+
+def _frame(n=6400, seed=5):
+    rng = np.random.default_rng(seed)
+    tool = rng.choice(["T1", "T2", "T3", None], n, p=[0.5, 0.3, 0.15, 0.05])
+    return pd.DataFrame({
+        "TOOLID": tool,
+        "CHAMBERID": pd.Categorical(
+            rng.choice(["A", "B", "C", "D"], n), categories=["A", "B", "C", "D", "UNUSED"]
+        ),
+        "SIN": pd.Series(rng.choice(["S1", "S2", ""], n, p=[0.6, 0.35, 0.05])).replace("", np.nan).astype("category"),
+        "STEP": rng.integers(0, 200, n),
+    })
+
+
+def _expected(frame, selections):
+    mask = np.ones(len(frame), dtype=bool)
+    for col, values in selections.items():
+        mask &= frame[col].isin(values).to_numpy()
+    return np.flatnonzero(mask)
+
+
+@pytest.mark.parametrize("selections", [
+    {"TOOLID": ["T1", "T2"], "CHAMBERID": ["A", "C"]},
+    {"TOOLID": ["T3"], "SIN": ["S2"], "STEP": [7]},
+    {"STEP": [3, 4], "CHAMBERID": ["B"]},
+    {"SIN": ["S1", "S2"]},
+])
+def test_select_matches_isin(selections):
+    frame = _frame()
+    index = FilterIndex(frame, ["TOOLID", "CHAMBERID", "SIN", "STEP"])
+    np.testing.assert_array_equal(index.select(selections), _expected(frame, selections))
+    pd.testing.assert_frame_equal(index.apply(frame, selections), frame.iloc[_expected(frame, selections)])
+
+
+def test_sparse_and_dense_paths_agree():
+    frame = _frame()
+    index = FilterIndex(frame, ["STEP", "TOOLID"])
+    # 一個 STEP 值約佔 1/200（倒排列表），100 個值約佔 1/2（bitmap）
+    sparse = {"STEP": [11], "TOOLID": ["T1"]}
+    dense = {"STEP": list(range(100)), "TOOLID": ["T1"]}
+    assert index._counts["STEP"][index._codes_of("STEP", [11])].sum() * SPARSE_RATIO <= len(frame)
+    assert index._counts["STEP"][index._codes_of("STEP", range(100))].sum() * SPARSE_RATIO > len(frame)
+    for selections in (sparse, dense):
+        np.testing.assert_array_equal(index.select(selections), _expected(frame, selections))
+
+
+def test_empty_and_unknown_selections():
+    frame = _frame()
+    index = FilterIndex(frame, ["TOOLID", "CHAMBERID"])
+    assert index.select({}) is None
+    assert len(index.apply(frame, {})) == len(frame)
+    assert len(index.select({"TOOLID": []})) == 0
+    assert len(index.select({"TOOLID": ["T9"], "CHAMBERID": ["A"]})) == 0
+    assert len(index.select({"CHAMBERID": ["UNUSED"]})) == 0
+    np.testing.assert_array_equal(
+        index.select({"TOOLID": ["T1", "T9"]}), _expected(frame, {"TOOLID": ["T1"]})
+    )
+
+
+def test_missing_values_are_never_selected():
+    frame = _frame()
+    index = FilterIndex(frame, ["TOOLID", "SIN"])
+    rows = index.select({"TOOLID": ["T1", "T2", "T3", None], "SIN": ["S1", "S2", np.nan]})
+    assert frame["TOOLID"].iloc[rows].notna().all() and frame["SIN"].iloc[rows].notna().all()
+    assert len(rows) == int((frame["TOOLID"].notna() & frame["SIN"].notna()).sum())
+
+
+def test_filter_index_is_reused_across_shallow_copies():
+    frame = _frame()
+    assert filter_index(frame, ["TOOLID"]) is filter_index(frame.copy(deep=False), ["TOOLID"])
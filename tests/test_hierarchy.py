@@ -0,0 +1,83 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from cvd.hierarchy import HierarchyIndex, hierarchy_index
+
+SUPERSTORE = Path(__file__).resolve().parent.parent / "data" / "Superstore.csv"
+LEVELS = ["Region", "State", "City"]
+
+
+@pytest.fixture(scope="module")
+def superstore():
+    return pd.read_csv(SUPERSTORE, encoding="ISO-8859-1")
+
+
+def _original(df, date1, date2, region, state, city):
+    """原本頁面的篩選：日期區間、逐層 unique() 產生選項與 if/elif 組合。"""
+    df = df.assign(**{"Order Date": pd.to_datetime(df["Order Date"])})
+    df = df[(df["Order Date"] >= date1) & (df["Order Date"] <= date2)].copy()
+    df2 = df[df["Region"].isin(region)] if region else df.copy()
+    df3 = df2[df2["State"].isin(state)] if state else df2.copy()
+    options = (list(df["Region"].unique()), list(df2["State"].unique()), list(df3["City"].unique()))
+    if not region and not state and not city:
+        filtered_df = df
+    elif not state and not city:
+        filtered_df = df[df["Region"].isin(region)]
+    elif not region and not city:
+        filtered_df = df[df["State"].isin(state)]
+    elif state and city:
+        filtered_df = df3[df["State"].isin(state) & df3["City"].isin(city)]
+    elif region and city:
+        filtered_df = df3[df["Region"].isin(region) & df3["City"].isin(city)]
+    elif region and state:
+        filtered_df = df3[df["Region"].isin(region) & df3["State"].isin(state)]
+    elif city:
+        filtered_df = df3[df3["City"].isin(city)]
+    else:
+        filtered_df = df3[df3["Region"].isin(region) & df3["State"].isin(state) & df3["City"].isin(city)]
+    return options, filtered_df
+
+
+def test_matches_original_filter_chain(superstore):
+    index = HierarchyIndex(superstore, LEVELS, time_column="Order Date")
+    rng = np.random.default_rng(0)
+    dates = index.times.sort_values().to_numpy()
+    for _ in range(60):
+        date1, date2 = pd.Timestamp(dates[rng.integers(0, len(dates) // 2)]), pd.Timestamp(dates[rng.integers(len(dates) // 2, len(dates))])
+        rows = index.rows_between(date1, date2)
+        region = list(rng.choice(index.options("Region", rows=rows), rng.integers(0, 3), replace=False))
+        states = index.options("State", {"Region": region}, rows=rows)
+        state = list(rng.choice(states, min(len(states), rng.integers(0, 4)), replace=False))
+        cities = index.options("City", {"Region": region, "State": state}, rows=rows)
+        city = list(rng.choice(cities, min(len(cities), rng.integers(0, 4)), replace=False))
+
+        (regions, expected_states, expected_cities), expected = _original(superstore, date1, date2, region, state, city)
+        assert index.options("Region", rows=rows) == regions
+        assert states == expected_states
+        assert cities == expected_cities
+        selected = index.select({"Region": region, "State": state, "City": city}, rows=rows)
+        result = index.take(superstore, selected)
+        assert result.index.tolist() == expected.index.tolist()
+
+
+def test_full_range_and_missing_values():
+    frame = pd.DataFrame({
+        "Region": ["East", "East", None, "West"],
+        "State": ["NY", "NJ", "NY", None],
+        "City": ["A", "B", "C", "D"],
+        "Order Date": ["2024-01-03", "2024-01-01", "2024-01-02", None],
+    })
+    index = HierarchyIndex(frame, LEVELS, time_column="Order Date")
+    assert index.rows_between("2024-01-01", "2024-01-03").tolist() == [0, 1, 2]
+    assert index.select({"Region": [], "State": [], "City": []}) is None
+    assert index.options("Region") == ["East", "West"]
+    assert index.options("State", {"Region": ["West"]}) == []
+    assert index.select({"State": ["NY"]}).tolist() == [0, 2]
+    assert len(index.take(frame, None)) == 4
+
+
+def test_hierarchy_index_is_reused_across_shallow_copies(superstore):
+    assert hierarchy_index(superstore, LEVELS) is hierarchy_index(superstore.copy(deep=False), LEVELS)
@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import cvd.hll
+from cvd.cube import CUBE_DIR
+from cvd.hll import build_glass_sketches, count_glasses, glass_keys, glass_sketches_for, load_glass_sketches
+from cvd.loader import load_merged_data, load_merged_window, recent_window
+from cvd.store import write_merged_partitions
+from conftest import make_raw
+
+
+def _frame(n=50_000, glasses=20_000, seed=3):
+    rng = np.random.default_rng(seed)
+    ids = np.array([f"TA12{i:06d}" for i in range(glasses)])
+    return pd.DataFrame({
+        "TSTAMP": pd.Timestamp("2024-10-01") + pd.to_timedelta(rng.integers(0, 20 * 24, n), unit="h"),
+        "CHAMBERID": pd.Categorical(rng.choice(["A", "B", "C"], n)),
+        "GLASSID": pd.Categorical(rng.choice(ids, n)),
+        "PRODUCT": pd.Categorical(rng.choice(["TA12XX", "TB34YY"], n)),
+        "RECIPEID": pd.Categorical(rng.choice(["BP_STD1", "RPSC_CLN"], n)),
+    })
+
+
+def test_estimate_is_within_a_few_percent():
+    frame = _frame()
+    sketches = build_glass_sketches(frame)
+    exact = frame["GLASSID"].nunique()
+    assert abs(sketches.count() - exact) / exact < 0.05
+    by_chamber = sketches.count(by=["CHAMBERID"]).set_index("CHAMBERID")["GLASSID"]
+    expected = frame.groupby("CHAMBERID", observed=True)["GLASSID"].nunique()
+    np.testing.assert_allclose(by_chamber.sort_index(), expected.sort_index(), rtol=0.05)
+
+
+def test_small_counts_use_linear_counting():
+    frame = _frame(n=500, glasses=120)
+    assert abs(build_glass_sketches(frame).count() - frame["GLASSID"].nunique()) <= 3
+
+
+def test_exact_mode_matches_nunique():
+    frame = _frame(n=5_000)
+    keys = glass_keys(frame)
+    start, end = pd.Timestamp("2024-10-05"), pd.Timestamp("2024-10-10")
+    rows = frame[frame["TSTAMP"].between(start, end) & keys["Recipe_Match"].to_numpy()]
+    assert count_glasses(frame, start=start, end=end, where={"Recipe_Match": [True]}, exact=True) == rows["GLASSID"].nunique()
+
+
+def test_table_round_trip():
+    sketches = build_glass_sketches(_frame(n=2_000))
+    restored = cvd.hll.GlassSketches.from_table(sketches.to_table())
+    np.testing.assert_array_equal(restored.registers, sketches.registers)
+    assert restored.count() == sketches.count()
+
+
+def test_missing_month_falls_back_to_exact_count(data_dir, frame, monkeypatch):
+    write_merged_partitions(frame)
+    assert load_glass_sketches() is not None
+    for path in (data_dir / "Merged_Data" / CUBE_DIR).glob("year=*/month=11/hll-*.parquet"):
+        path.unlink()
+    assert load_glass_sketches() is None
+    # 不由資料列建立近似摘要，改為精確計算
+    monkeypatch.setattr(cvd.hll, "build_glass_sketches", lambda frame: pytest.fail("sketches built from rows"))
+    assert count_glasses() == frame["GLASSID"].nunique()
+    by_chamber = count_glasses(by=["CHAMBERID"]).set_index("CHAMBERID")["GLASSID"]
+    assert by_chamber.to_dict() == frame.groupby("CHAMBERID", observed=True)["GLASSID"].nunique().to_dict()
+
+
+def test_recent_window_merges_stored_sketches(data_dir, monkeypatch):
+    write_merged_partitions(make_raw(n=20_000, days=40, seed=4))
+    min_date, max_date = recent_window(days=7)
+    assert min_date != min_date.normalize()
+    # 與頁面相同：起點取整天，表格與片數涵蓋相同的資料列
+    min_date = min_date.normalize()
+    recent = load_merged_window(min_date, max_date)
+    monkeypatch.setattr(cvd.hll, "build_glass_sketches", lambda frame: pytest.fail("sketches built from rows"))
+    exact = recent["GLASSID"].nunique()
+    assert count_glasses(start=min_date, end=max_date, exact=True) == exact
+    assert abs(count_glasses(start=min_date, end=max_date) - exact) <= 0.05 * exact
+    by_chamber = count_glasses(by=["CHAMBERID"], start=min_date, end=max_date).set_index("CHAMBERID")["GLASSID"]
+    expected = recent.groupby("CHAMBERID", observed=True)["GLASSID"].nunique()
+    np.testing.assert_allclose(by_chamber.sort_index(), expected.sort_index(), rtol=0.05)
+
+
+def test_glass_sketches_for_hits_cache_across_loads(data_dir, raw, monkeypatch):
+    raw.to_csv(data_dir / "Merged_Data.csv", index=False)
+    calls = []
+    build = cvd.hll.build_glass_sketches
+    monkeypatch.setattr(cvd.hll, "build_glass_sketches", lambda frame: calls.append(1) or build(frame))
+    assert glass_sketches_for(load_merged_data()) is glass_sketches_for(load_merged_data())
+    assert len(calls) == 1
@@ -0,0 +1,45 @@
+import pandas as pd
+
+from cvd.ingest import filter_new_rows, incremental_ingest
+from cvd.loader import load_merged_data
+from cvd.store import read_watermarks, write_merged_partitions
+from conftest import make_raw
+
+
+def _split(raw, hours):
+    tstamp = pd.to_datetime(raw["TSTAMP"].astype(str), format="%Y%m%d%H")
+    cut = tstamp.min() + pd.Timedelta(hours=hours)
+    return raw[(tstamp < cut).to_numpy()], raw[(tstamp >= cut).to_numpy()]
+
+
+def test_filter_new_rows_keeps_unknown_chambers(raw):
+    assert len(filter_new_rows(raw, {})) == len(raw)
+
+
+def test_incremental_ingest_appends_only_new_rows(data_dir, raw):
+    old, new = _split(raw, 24 * 20)
+    write_merged_partitions(old)
+    appended = incremental_ingest(raw)
+    assert len(appended) == len(new)
+    assert len(load_merged_data()) == len(raw)
+    # 再匯入同一份資料不會重複追加
+    assert incremental_ingest(raw).empty
+    assert len(load_merged_data()) == len(raw)
+
+
+def test_late_rows_in_watermark_hour_are_kept(data_dir):
+    raw = make_raw(n=400, days=3, seed=1)
+    chamber = raw["CHAMBERID"].iloc[0]
+    last_hour = raw.loc[raw["CHAMBERID"] == chamber, "TSTAMP"].max()
+    stored = raw.iloc[:-1]
+    late = raw.iloc[[0]].assign(TSTAMP=last_hour, CHAMBERID=chamber, Sample_Time=-1.0)
+    write_merged_partitions(stored)
+    watermark = read_watermarks()[chamber]
+    assert watermark == pd.to_datetime(str(last_hour), format="%Y%m%d%H")
+
+    # 與已儲存資料相同的列去除，同一小時晚到的新列保留
+    batch = pd.concat([stored[stored["TSTAMP"] == last_hour], late], ignore_index=True)
+    appended = incremental_ingest(batch)
+    assert len(appended) == 1
+    assert appended["Sample_Time"].iloc[0] == -1.0
+    assert len(load_merged_data()) == len(stored) + 1
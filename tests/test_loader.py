@@ -0,0 +1,43 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from cvd.loader import load_merged_data
+
+
+def test_load_merged_data_parses_once(data_dir, raw):
+    raw.to_csv(data_dir / "Merged_Data.csv", index=False)
+    first, second = load_merged_data(), load_merged_data()
+    assert first is not second
+    assert np.shares_memory(first["NF3_total_Flow"].to_numpy(), second["NF3_total_Flow"].to_numpy())
+    assert len(first) == len(raw)
+    assert first["TSTAMP"].is_monotonic_increasing
+
+
+def test_load_merged_data_is_read_only(data_dir, raw):
+    raw.to_csv(data_dir / "Merged_Data.csv", index=False)
+    frame = load_merged_data()
+    with pytest.raises(ValueError):
+        frame["NF3_total_Flow"].to_numpy()[0] = -1
+    # 新增欄位不影響快取
+    frame["Extra"] = 1
+    assert "Extra" not in load_merged_data().columns
+
+
+def test_load_merged_data_reloads_changed_file(data_dir, raw):
+    path = data_dir / "Merged_Data.csv"
+    raw.to_csv(path, index=False)
+    assert len(load_merged_data()) == len(raw)
+    raw.iloc[:100].to_csv(path, index=False)
+    os.utime(path, ns=(path.stat().st_atime_ns, path.stat().st_mtime_ns + 1_000_000))
+    assert len(load_merged_data()) == 100
+
+
+def test_load_merged_data_projects_columns(data_dir, raw):
+    raw.to_csv(data_dir / "Merged_Data.csv", index=False)
+    frame = load_merged_data(columns=["CHAMBERID", "TSTAMP", "NF3_total_Flow"])
+    assert {"CHAMBERID", "TSTAMP", "NF3_total_Flow"} <= set(frame.columns)
+    assert "pressure" not in frame.columns
+    assert pd.api.types.is_datetime64_any_dtype(frame["TSTAMP"])
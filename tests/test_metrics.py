@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from cvd.cube import NF3Cube, build_cube
+from cvd.metrics import aggregate, derive, distinct, in_units, ratio, total
+from cvd.units import flow_factor
+
+GLASS_METRICS = [
+    total("NF3_total_Flow"),
+    in_units("Daily_Flow", "NF3_total_Flow"),
+    distinct("GLASSID", name="Glass_Count"),
+    ratio("Flow_per_Glass", "Daily_Flow", "Glass_Count"),
+]
+
+
+def _expected(frame, by):
+    flow = frame.groupby(by, observed=True)["NF3_total_Flow"].sum()
+    glasses = frame.groupby(by, observed=True)["GLASSID"].nunique()
+    expected = pd.DataFrame({"NF3_total_Flow": flow, "Glass_Count": glasses})
+    for unit, suffix in [("sccm", "sccm"), ("kg/s", "kg"), ("l/s", "l")]:
+        expected[f"Daily_Flow_{suffix}"] = flow * flow_factor(unit)
+        expected[f"Flow_per_Glass_{suffix}"] = flow * flow_factor(unit) / glasses
+    return expected.reset_index()
+
+
+def test_aggregate_matches_groupby_and_merge(frame):
+    by = ["CHAMBERID", "Date"]
+    result = aggregate(frame, by, GLASS_METRICS)
+    assert list(result.columns) == [
+        *by, "NF3_total_Flow", "Daily_Flow_sccm", "Daily_Flow_kg", "Daily_Flow_l",
+        "Glass_Count", "Flow_per_Glass_sccm", "Flow_per_Glass_kg", "Flow_per_Glass_l",
+    ]
+    expected = _expected(frame, by)[list(result.columns)]
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False, check_categorical=False)
+
+
+def test_decimals_round_once(frame):
+    result = aggregate(frame, ["CHAMBERID"], GLASS_METRICS, decimals=2)
+    unrounded = aggregate(frame, ["CHAMBERID"], GLASS_METRICS)
+    np.testing.assert_allclose(result["Flow_per_Glass_kg"], unrounded["Flow_per_Glass_kg"].round(2))
+
+
+def test_cube_aggregate_matches_frame(frame):
+    by = ["LAYER", "CHAMBERID", "Date"]
+    where = {"RECIPEID": lambda s: s.str.startswith("RPSC", na=False)}
+    start = pd.Timestamp("2024-10-15")
+    result = NF3Cube(*build_cube(frame)).aggregate(by, GLASS_METRICS, where=where, start=start)
+    rows = frame[frame["RECIPEID"].str.startswith("RPSC", na=False) & (frame["TSTAMP"] >= start)]
+    expected = aggregate(rows, by, GLASS_METRICS)
+    sort = lambda table: table.astype({col: str for col in by}).sort_values(by).reset_index(drop=True)
+    pd.testing.assert_frame_equal(sort(result), sort(expected), check_dtype=False, rtol=1e-5)
+
+
+def test_ratio_keeps_plain_name_without_units():
+    table = pd.DataFrame({"Flow": [4.0, 9.0], "Count": [2, 0]}, index=pd.Index(["a", "b"], name="k"))
+    result = derive(table, [total("Flow", "Flow"), distinct("x", "Count"), ratio("Per", "Flow", "Count")])
+    assert list(result.columns) == ["k", "Flow", "Count", "Per"]
+    assert result["Per"].iloc[0] == 2.0 and np.isinf(result["Per"].iloc[1])
+
+
+def test_converting_twice_is_rejected():
+    table = pd.DataFrame({"Flow": [1.0]})
+    metrics = [total("Flow"), in_units("A", "Flow"), in_units("B", "A")]
+    with pytest.raises(ValueError):
+        derive(table, metrics)
+
+
+def test_cube_rejects_metrics_it_cannot_compute(frame):
+    cube = NF3Cube(*build_cube(frame))
+    with pytest.raises(ValueError):
+        cube.aggregate(["CHAMBERID"], [total("pressure")])
@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+
+from cvd.outliers import MAD_SCALE, fleet_outliers, outlier_bounds, outlier_mask
+
+
+def _iqr_mask(values):
+    q1, q3 = values.quantile(0.25), values.quantile(0.75)
+    return ((values < q1 - 1.5 * (q3 - q1)) | (values > q3 + 1.5 * (q3 - q1))).to_numpy()
+
+
+def test_outlier_mask_matches_quantile_iqr(frame):
+    frame = frame.assign(NF3_total_Flow=frame["NF3_total_Flow"].where(frame.index % 97 != 0, 1e4))
+    np.testing.assert_array_equal(outlier_mask(frame, "NF3_total_Flow"), _iqr_mask(frame["NF3_total_Flow"]))
+
+
+def test_grouped_mask_matches_per_group_iqr(frame):
+    by = ["CHAMBERID", "RECIPEID"]
+    mask = outlier_mask(frame, "NF3_total_Flow", by)
+    expected = frame.groupby(by, observed=True)["NF3_total_Flow"].transform(
+        lambda s: pd.Series(_iqr_mask(s), index=s.index)
+    )
+    np.testing.assert_array_equal(mask, expected.to_numpy(dtype=bool))
+    assert not mask.flags.writeable
+
+
+def test_mad_bounds_match_pandas(frame):
+    table = outlier_bounds(frame, "NF3_total_Flow", ["CHAMBERID"], method="mad")
+    for chamber, values in frame.groupby("CHAMBERID", observed=True)["NF3_total_Flow"]:
+        median = values.median()
+        mad = (values - median).abs().median()
+        row = table.loc[chamber]
+        assert np.isclose(row["Median"], median) and np.isclose(row["MAD"], mad)
+        assert np.isclose(row["Upper"], median + 3.5 * MAD_SCALE * mad)
+
+
+def test_missing_values_and_negatives():
+    frame = pd.DataFrame({"v": [1.0, 2.0, np.nan, 3.0, -0.5, 2.5]})
+    assert not outlier_mask(frame, "v")[2]
+    assert outlier_mask(frame, "v", negatives=True)[4]
+
+
+def test_fleet_outliers_is_cached(frame):
+    assert fleet_outliers(frame) is fleet_outliers(frame.copy(deep=False))
@@ -0,0 +1,40 @@
+import pandas as pd
+
+from cvd.loader import list_partitions, load_merged_data, load_merged_window, load_recent_data
+from cvd.store import write_merged_partitions
+
+
+def test_write_merged_partitions_uses_loader_default(data_dir, raw):
+    written = write_merged_partitions(raw)
+    assert written
+    assert all(path.is_relative_to(data_dir / "Merged_Data") for path in written)
+    assert [path for _, _, path in list_partitions()] == sorted(written)
+    assert len(load_merged_data()) == len(raw)
+
+
+def test_load_merged_window_matches_boolean_filter(data_dir, frame):
+    write_merged_partitions(frame)
+    start, end = pd.Timestamp("2024-10-20 05:00"), pd.Timestamp("2024-11-02 17:00")
+    window = load_merged_window(start, end, columns=["CHAMBERID", "NF3_total_Flow"])
+    expected = frame[(frame["TSTAMP"] >= start) & (frame["TSTAMP"] <= end)]
+    assert list(window.columns) == ["CHAMBERID", "NF3_total_Flow"]
+    assert len(window) == len(expected)
+    assert abs(window["NF3_total_Flow"].sum() - expected["NF3_total_Flow"].sum()) < 1e-3 * len(expected)
+
+
+def test_load_recent_data_covers_last_days(data_dir, frame):
+    write_merged_partitions(frame)
+    recent = load_recent_data(days=7)
+    latest = frame["TSTAMP"].max()
+    assert recent["TSTAMP"].max() == latest
+    assert recent["TSTAMP"].min() >= latest - pd.Timedelta(days=7)
+    assert len(recent) == int((frame["TSTAMP"] >= latest - pd.Timedelta(days=7)).sum())
+
+
+def test_rewrite_replaces_month_partition(data_dir, frame):
+    write_merged_partitions(frame)
+    october = frame[frame["TSTAMP"].dt.month == 10]
+    write_merged_partitions(october.iloc[:50])
+    reloaded = load_merged_data()
+    assert int((reloaded["TSTAMP"].dt.month == 10).sum()) == 50
+    assert int((reloaded["TSTAMP"].dt.month == 11).sum()) == int((frame["TSTAMP"].dt.month == 11).sum())
@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from cvd.rolling import RollingState, _first_change, rolling_state
+
+
+def _series(values, start="2024-01-20"):
+    dates = pd.date_range(start, periods=len(values), freq="D").date
+    return pd.Series(np.asarray(values, dtype=np.float64), index=pd.Index(dates, name="Date"))
+
+
+def _expected(daily, windows, ratio_window):
+    expected = pd.DataFrame({"Value": daily.to_numpy()}, index=daily.index)
+    for window in windows:
+        expected[f"MA_{window}"] = daily.rolling(window=window, min_periods=1).mean().to_numpy()
+    month = pd.PeriodIndex(pd.to_datetime(daily.index), freq="M")
+    expected["Cumulative"] = daily.groupby(month).cumsum().to_numpy()
+    expected["Ratio"] = expected["Value"] / expected[f"MA_{ratio_window}"]
+    return expected
+
+
+def _check(state, daily):
+    result = state.update(daily)
+    expected = _expected(daily, state.windows, state.ratio_window)
+    assert result.index.tolist() == daily.index.tolist()
+    assert result["Month"].astype(str).tolist() == [d.strftime("%Y-%m") for d in daily.index]
+    for col in expected.columns:
+        np.testing.assert_allclose(result[col].to_numpy(dtype=float), expected[col].to_numpy(), err_msg=col)
+
+
+def _state():
+    return RollingState(windows=(7, 30), cumulative=True, ratio_window=5)
+
+
+def test_append_across_month_boundary():
+    values = np.arange(1.0, 61.0)
+    state = _state()
+    _check(state, _series(values[:10]))
+    # 新增的日期跨越月份，月累積須從同月份前面的值接續
+    _check(state, _series(values[:25]))
+    _check(state, _series(values))
+
+
+def test_mid_series_edit_and_truncation():
+    values = np.linspace(5, 50, 45)
+    state = _state()
+    _check(state, _series(values))
+    edited = values.copy()
+    edited[20] = 500.0
+    _check(state, _series(edited))
+    _check(state, _series(edited[:30]))
+    _check(state, _series(values))
+
+
+def test_missing_values_do_not_break_carry():
+    values = np.arange(1.0, 41.0)
+    values[[10, 11, 12, 25]] = np.nan
+    state = _state()
+    _check(state, _series(values[:11]))
+    _check(state, _series(values[:13]))
+    _check(state, _series(values))
+
+
+def test_dropped_and_shifted_dates():
+    state = _state()
+    daily = _series(np.arange(1.0, 31.0))
+    _check(state, daily)
+    _check(state, daily.drop(daily.index[[3, 17]]))
+    _check(state, _series(np.arange(1.0, 31.0), start="2024-01-22"))
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_random_sequences_match_full_recompute(seed):
+    rng = np.random.default_rng(seed)
+    values = list(rng.random(40) * 100)
+    state = _state()
+    _check(state, _series(values))
+    for _ in range(15):
+        op = rng.integers(0, 5)
+        if op == 0:
+            values += list(rng.random(rng.integers(1, 10)) * 100)
+        elif op == 1 and values:
+            values[rng.integers(0, len(values))] = rng.random() * 100
+        elif op == 2 and len(values) > 5:
+            values = values[:rng.integers(1, len(values))]
+        elif op == 3 and values:
+            values[rng.integers(0, len(values))] = np.nan
+        else:
+            values = values[:-1]
+        _check(state, _series(values))
+
+
+def test_unchanged_series_reuses_table():
+    state = _state()
+    daily = _series(np.arange(1.0, 20.0))
+    first = state.update(daily)
+    second = state.update(daily.copy())
+    assert np.shares_memory(first["MA_7"].to_numpy(), second["MA_7"].to_numpy())
+    assert _first_change(daily, daily.iloc[:5]) == 5
+    assert _first_change(daily, daily.drop(daily.index[2])) == 2
+
+
+def test_rolling_state_is_keyed():
+    assert rolling_state("a", windows=(7,)) is rolling_state("a", windows=(7,))
+    assert rolling_state("a", windows=(7,)) is not rolling_state("b", windows=(7,))
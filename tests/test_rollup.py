@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+
+from cvd.rollup import daily_ratios, grouping_sets
+
+DIMENSIONS = ["CHAMBERID", "TOOLID", "RECIPEID", "OPERATION", "SIN", "LAYER"]
+
+
+def _original_ratio(data, filter_col):
+    """原本頁面的 calculate_daily_flow_ratio。"""
+    grouped = data.groupby([data["TSTAMP"].dt.date, filter_col])["NF3_total_Flow"].sum().reset_index()
+    total_flow = grouped.groupby("TSTAMP")["NF3_total_Flow"].transform("sum")
+    grouped["Flow_Ratio"] = grouped["NF3_total_Flow"] / total_flow
+    return grouped
+
+
+def test_daily_ratios_match_original_groupbys(frame):
+    frame = frame.assign(NF3_total_Flow=frame["NF3_total_Flow"].where(frame.index % 11 != 0))
+    ratios = daily_ratios(frame, DIMENSIONS)
+    plain = frame.assign(**{col: frame[col].astype(object) for col in DIMENSIONS})
+    for dim in DIMENSIONS:
+        expected = _original_ratio(plain, dim)
+        result = ratios[dim]
+        assert list(result.columns) == ["Date", dim, "NF3_total_Flow", "Flow_Ratio"]
+        assert [d.date() for d in pd.to_datetime(result["Date"].astype(object))] == expected["TSTAMP"].tolist()
+        assert result[dim].astype(object).tolist() == expected[dim].tolist()
+        np.testing.assert_allclose(result["NF3_total_Flow"], expected["NF3_total_Flow"], rtol=1e-5)
+        np.testing.assert_allclose(result["Flow_Ratio"], expected["Flow_Ratio"], rtol=1e-5)
+
+
+def test_grouping_sets_match_groupby_with_missing_keys():
+    rng = np.random.default_rng(7)
+    n = 2000
+    frame = pd.DataFrame({
+        "a": rng.choice(["x", "y", None], n),
+        "b": pd.Categorical(rng.choice(["p", "q", "r"], n), categories=["r", "q", "p", "unused"]),
+        "c": rng.integers(0, 5, n),
+        "v": np.where(rng.random(n) < 0.1, np.nan, rng.random(n)),
+    })
+    sets = [("a",), ("a", "b"), ("b", "c"), ("c", "a", "b")]
+    result = grouping_sets(frame, sets, "v")
+    for grouping in sets:
+        expected = frame.groupby(list(grouping), observed=True)["v"].sum().reset_index()
+        table = result[grouping]
+        assert list(table.columns) == [*grouping, "v"]
+        # 部分 pandas 版本在多個分組欄位含 categorical 時不依類別順序排序，比較前統一排序
+        keys = {col: str for col in grouping}
+        table = table.astype(keys).sort_values(list(grouping)).reset_index(drop=True)
+        expected = expected.astype(keys).sort_values(list(grouping)).reset_index(drop=True)
+        for col in grouping:
+            assert table[col].astype(object).tolist() == expected[col].astype(object).tolist()
+        np.testing.assert_allclose(table["v"], expected["v"])
+
+
+def test_grouping_sets_are_cached_and_copied(frame):
+    first = grouping_sets(frame, [("Date", "SIN")], "NF3_total_Flow")[("Date", "SIN")]
+    second = grouping_sets(frame.copy(deep=False), [("Date", "SIN")], "NF3_total_Flow")[("Date", "SIN")]
+    assert first is not second
+    assert np.shares_memory(first["NF3_total_Flow"].to_numpy(), second["NF3_total_Flow"].to_numpy())
+    first["Extra"] = 1
+    assert "Extra" not in second.columns
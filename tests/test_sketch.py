@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+
+import cvd.sketch
+
+from cvd.cube import CUBE_DIR
+from cvd.loader import load_merged_data
+from cvd.sketch import build_sketches, sketch_bounds, sketch_quantiles, sketches_for
+from cvd.store import write_merged_partitions
+
+
+def test_uncompressed_quantiles_match_pandas():
+    frame = pd.DataFrame({
+        "TSTAMP": pd.Timestamp("2024-10-01") + pd.to_timedelta(np.arange(40), unit="h"),
+        "CHAMBERID": pd.Categorical(["A", "B"] * 20),
+        "NF3_total_Flow": np.random.default_rng(0).random(40),
+    })
+    table = sketch_quantiles(build_sketches(frame), [0.25, 0.5, 0.75], by=["CHAMBERID"])
+    expected = frame.groupby("CHAMBERID", observed=True)["NF3_total_Flow"].quantile([0.25, 0.5, 0.75]).unstack()
+    np.testing.assert_allclose(table.to_numpy(), expected.to_numpy())
+
+
+def test_merged_daily_sketches_are_close():
+    rng = np.random.default_rng(1)
+    n = 100_000
+    frame = pd.DataFrame({
+        "TSTAMP": pd.Timestamp("2024-10-01") + pd.to_timedelta(rng.integers(0, 30 * 24, n), unit="h"),
+        "CHAMBERID": pd.Categorical(["A"] * n),
+        "NF3_total_Flow": rng.normal(100, 10, n),
+    })
+    sketches = build_sketches(frame)
+    assert len(sketches) < n / 10
+    estimate = sketch_quantiles(sketches, [0.01, 0.5, 0.99]).iloc[0]
+    values = np.sort(frame["NF3_total_Flow"].to_numpy())
+    for q, value in estimate.items():
+        assert abs(np.searchsorted(values, value) / n - q) < 0.002
+    bounds = sketch_bounds(sketches).iloc[0]
+    assert bounds["Lower"] < bounds["Q1"] < bounds["Q3"] < bounds["Upper"]
+
+
+def test_sketches_for_window(frame):
+    start, end = pd.Timestamp("2024-10-20"), pd.Timestamp("2024-10-25")
+    sketches = sketches_for(frame, start, end)
+    assert sketches["TSTAMP"].between(start, end).all()
+    in_window = frame["TSTAMP"].between(start, end + pd.Timedelta(hours=23))
+    assert sketches["Weight"].sum() == int(in_window.sum())
+
+
+def test_ingest_does_not_write_sketches(data_dir, frame):
+    write_merged_partitions(frame)
+    assert not list((data_dir / "Merged_Data" / CUBE_DIR).glob("year=*/month=*/sketch-*.parquet"))
+    assert sketches_for()["Weight"].sum() == len(frame)
+
+
+def test_sketches_for_hits_cache_across_loads(data_dir, raw, monkeypatch):
+    raw.to_csv(data_dir / "Merged_Data.csv", index=False)
+    calls = []
+    monkeypatch.setattr(cvd.sketch, "build_sketches", lambda frame: calls.append(1) or build_sketches(frame))
+    first, second = sketches_for(load_merged_data()), sketches_for(load_merged_data())
+    assert len(calls) == 1
+    assert len(first) == len(second)
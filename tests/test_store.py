@@ -0,0 +1,28 @@
+import pandas as pd
+
+from cvd.loader import default_merged_path, load_merged_data
+from cvd.store import write_merged_parquet
+
+
+def test_write_merged_parquet_uses_loader_default(data_dir, raw):
+    raw.to_csv(data_dir / "Merged_Data.csv", index=False)
+    assert default_merged_path() == data_dir / "Merged_Data.csv"
+    path = write_merged_parquet(raw)
+    assert path == data_dir / "Merged_Data.parquet"
+    assert default_merged_path() == path
+
+
+def test_parquet_round_trip_matches_csv(data_dir, raw):
+    raw.to_csv(data_dir / "Merged_Data.csv", index=False)
+    from_csv = load_merged_data(data_dir / "Merged_Data.csv")
+    write_merged_parquet(raw)
+    from_parquet = load_merged_data()
+    assert isinstance(from_parquet["CHAMBERID"].dtype, pd.CategoricalDtype)
+    assert pd.api.types.is_datetime64_any_dtype(from_parquet["TSTAMP"])
+    assert len(from_parquet) == len(from_csv)
+    pd.testing.assert_series_equal(
+        from_parquet["NF3_total_Flow"].astype(float).reset_index(drop=True),
+        from_csv["NF3_total_Flow"].astype(float).reset_index(drop=True),
+        rtol=1e-6,
+    )
+
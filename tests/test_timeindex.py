@@ -0,0 +1,81 @@
+import gc
+
+import numpy as np
+import pandas as pd
+
+import cvd.timeindex
+from cvd.loader import _freeze
+from cvd.timeindex import _is_sorted, sort_by_time, time_bounds, time_slice
+
+
+def _frame(times):
+    return pd.DataFrame({"TSTAMP": pd.to_datetime(times), "v": np.arange(len(times), dtype=float)})
+
+
+def _mask(frame, start, end):
+    return frame[(frame["TSTAMP"] >= start) & (frame["TSTAMP"] <= end)]
+
+
+def test_time_slice_bounds_are_inclusive():
+    frame = _freeze(_frame(["2024-01-01 00:00", "2024-01-01 05:00", "2024-01-01 05:00", "2024-01-02 00:00", "2024-01-03 00:00"]))
+    start, end = pd.Timestamp("2024-01-01 05:00"), pd.Timestamp("2024-01-02 00:00")
+    result = time_slice(frame, start, end)
+    assert result["v"].tolist() == [1.0, 2.0, 3.0]
+    assert np.shares_memory(result["v"].to_numpy(), frame["v"].to_numpy())
+    assert time_bounds(frame, start, end) == (1, 4)
+    assert len(time_slice(frame)) == len(frame)
+    assert len(time_slice(frame, "2024-02-01", "2024-01-01")) == 0
+
+
+def test_nat_rows_sort_last_and_are_excluded():
+    frame = _frame(["2024-01-02", None, "2024-01-01", "2024-01-03", None])
+    ordered = sort_by_time(frame)
+    assert ordered["TSTAMP"].iloc[-2:].isna().all()
+    assert _is_sorted(ordered["TSTAMP"])
+    assert not _is_sorted(_frame(["2024-01-01", None, "2024-01-02"])["TSTAMP"])
+    result = time_slice(ordered, "2024-01-01", "2024-01-03")
+    pd.testing.assert_frame_equal(result, _mask(ordered, "2024-01-01", "2024-01-03"))
+    assert len(time_slice(ordered)) == 3
+
+
+def test_unsorted_frame_falls_back_to_mask():
+    rng = np.random.default_rng(0)
+    frame = _frame(pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 500, 200), unit="h"))
+    assert not _is_sorted(frame["TSTAMP"])
+    start, end = pd.Timestamp("2024-01-05"), pd.Timestamp("2024-01-12 07:00")
+    pd.testing.assert_frame_equal(time_slice(frame, start, end), _mask(frame, start, end))
+    pd.testing.assert_frame_equal(
+        time_slice(sort_by_time(frame), start, end).reset_index(drop=True),
+        _mask(frame, start, end).sort_values("TSTAMP", kind="stable").reset_index(drop=True),
+    )
+
+
+def test_sorted_cache_follows_the_array():
+    cvd.timeindex._sorted_cache.clear()
+    frame = _freeze(_frame(pd.date_range("2024-01-01", periods=50, freq="H")))
+    assert _is_sorted(frame["TSTAMP"])
+    assert _is_sorted(frame.copy(deep=False)["TSTAMP"])
+    assert len(cvd.timeindex._sorted_cache) == 1
+
+    # 以未排序的新陣列取代欄位後不沿用舊結果
+    replaced = _freeze(frame.assign(TSTAMP=frame["TSTAMP"].iloc[::-1].to_numpy()))
+    assert not _is_sorted(replaced["TSTAMP"])
+    start, end = pd.Timestamp("2024-01-01 10:00"), pd.Timestamp("2024-01-01 20:00")
+    pd.testing.assert_frame_equal(time_slice(replaced, start, end), _mask(replaced, start, end))
+
+    # 被回收的陣列在下一次記錄時清除
+    del frame, replaced
+    gc.collect()
+    fresh = _freeze(_frame(pd.date_range("2024-02-01", periods=5, freq="H")))
+    assert _is_sorted(fresh["TSTAMP"])
+    assert [ref() is not None for ref, _ in cvd.timeindex._sorted_cache.values()] == [True]
+
+
+def test_writable_arrays_are_not_cached():
+    cvd.timeindex._sorted_cache.clear()
+    frame = _frame(pd.date_range("2024-01-01", periods=10, freq="H"))
+    assert _is_sorted(frame["TSTAMP"])
+    assert not cvd.timeindex._sorted_cache
+    # 就地修改後重新檢查
+    frame.loc[3, "TSTAMP"] = pd.Timestamp("2023-01-01")
+    assert not _is_sorted(frame["TSTAMP"])
@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from cvd.units import FLOW_UNITS, NF3_GWP, convert_flow, convert_flows, flow_factor
+
+
+def test_factors_follow_from_one_set_of_constants():
+    kg_per_minute = flow_factor("kg/s") * 60
+    assert flow_factor("kg/day") == pytest.approx(kg_per_minute * 24 * 60)
+    assert flow_factor("kg CO2e/day") == pytest.approx(flow_factor("kg/day") * NF3_GWP)
+    assert flow_factor("l/s") == pytest.approx(1 / 60000)
+    assert flow_factor("sccm") == 1.0
+
+
+def test_unknown_unit_raises():
+    with pytest.raises(ValueError):
+        flow_factor("kg/h")
+
+
+def test_convert_flows_matches_convert_flow():
+    flow = pd.Series([0.0, 1.5, 1e6], name="Daily_Flow")
+    converted = convert_flows(flow, ("sccm", "kg/s", "l/s"))
+    assert list(converted.columns) == ["Daily_Flow_sccm", "Daily_Flow_kg", "Daily_Flow_l"]
+    for unit, column in zip(("sccm", "kg/s", "l/s"), converted.columns):
+        np.testing.assert_allclose(converted[column], convert_flow(flow, unit))
+
+
+def test_convert_flows_on_frame_expands_every_column():
+    frame = pd.DataFrame({"A": [1.0, 2.0], "B": [3.0, 4.0]})
+    converted = convert_flows(frame)
+    assert converted.shape == (2, 2 * len(FLOW_UNITS))
+    np.testing.assert_allclose(converted["B_CO2e"], frame["B"] * flow_factor("kg CO2e/day"))
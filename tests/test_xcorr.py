@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+
+import cvd.xcorr
+from cvd.loader import load_merged_data
+from cvd.xcorr import lagged_xcorr
+
+
+def _runs(seed=0, shift=3):
+    rng = np.random.default_rng(seed)
+    rows = []
+    for run, length in enumerate([5, 12, 30, 64, 100]):
+        x = rng.normal(size=length + shift)
+        rows.append(pd.DataFrame({
+            "CHAMBERID": "2ACV0100-A",
+            "GLASSID": f"TA12{run:04d}",
+            "step_name": "CLN1",
+            "TSTAMP": pd.Timestamp("2024-10-01") + pd.Timedelta(hours=run),
+            "Sample_Time": np.arange(length, dtype=float),
+            "NF3_Flow": x[shift:],
+            "pressure": x[:length] + rng.normal(scale=0.1, size=length),
+        }))
+    frame = pd.concat(rows, ignore_index=True)
+    # 打亂列順序，結果應依 TSTAMP、Sample_Time 排序
+    return frame.sample(frac=1, random_state=seed).reset_index(drop=True)
+
+
+def _reference(x, y, max_lag):
+    x = (x - x.mean()) / x.std()
+    y = (y - y.mean()) / y.std()
+    full = np.correlate(y, x, mode="full") / len(x)
+    center = len(x) - 1
+    return np.array([full[center + lag] if abs(lag) < len(x) else np.nan for lag in range(-max_lag, max_lag + 1)])
+
+
+def test_lagged_xcorr_matches_np_correlate():
+    frame = _runs()
+    result = lagged_xcorr(frame, signals=["pressure"], max_lag=6)
+    for row in result.itertuples():
+        run = frame[frame["GLASSID"] == row.GLASSID].sort_values("Sample_Time")
+        expected = _reference(run["NF3_Flow"].to_numpy(), run["pressure"].to_numpy(), 6)
+        assert row.Samples == len(run)
+        assert np.isclose(row.Zero_Lag_Corr, expected[6])
+        assert np.isclose(row.Peak_Corr, expected[np.nanargmax(np.abs(expected))])
+    # pressure 落後 NF3_Flow 3 個取樣點
+    assert (result.loc[result["Samples"] >= 30, "Peak_Lag"] == 3).all()
+
+
+def test_constant_signal_is_nan():
+    frame = _runs().assign(pressure=1.0)
+    result = lagged_xcorr(frame, signals=["pressure"])
+    assert result["Peak_Corr"].isna().all() and result["Peak_Lag"].isna().all()
+
+
+def test_lagged_xcorr_hits_cache_across_loads(data_dir, raw, monkeypatch):
+    raw.to_csv(data_dir / "Merged_Data.csv", index=False)
+    calls = []
+    compute = cvd.xcorr._lagged_xcorr
+    monkeypatch.setattr(cvd.xcorr, "_lagged_xcorr", lambda *args: calls.append(1) or compute(*args))
+    first, second = lagged_xcorr(load_merged_data()), lagged_xcorr(load_merged_data())
+    assert len(calls) == 1
+    pd.testing.assert_frame_equal(first, second)